@@ -0,0 +1,92 @@
+import asyncio
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+BACKUP_PREFIX = "backup_db_"
+BACKUP_SUFFIX = ".sqlite.gz"
+
+
+class BackupResult(NamedTuple):
+    path: str
+    filename: str
+    size: int
+    raw_size: int
+    duration: float
+
+
+def format_size(size: int) -> str:
+    for unit in ("o", "Ko", "Mo"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "o" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} Go"
+
+
+def _online_copy(source: str, target: str):
+    src = sqlite3.connect(source)
+    try:
+        # Une seule lecture cohérente (snapshot WAL) : les écritures du bot continuent pendant la copie
+        src.execute("VACUUM INTO ?", (target,))
+    finally:
+        src.close()
+
+
+def rotate(directory: str, keep: int) -> list[str]:
+    backups = sorted(
+        name for name in os.listdir(directory)
+        if name.startswith(BACKUP_PREFIX) and name.endswith(BACKUP_SUFFIX)
+    )
+    removed = backups[:-keep] if keep > 0 else []
+    for name in removed:
+        os.remove(os.path.join(directory, name))
+    return removed
+
+
+def _backup_filename(directory: str) -> str:
+    # Microsecondes + compteur : deux sauvegardes de la même seconde ne s'écrasent pas
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S_%f")
+    filename = f"{BACKUP_PREFIX}{timestamp}{BACKUP_SUFFIX}"
+    counter = 1
+    while os.path.exists(os.path.join(directory, filename)):
+        filename = f"{BACKUP_PREFIX}{timestamp}_{counter}{BACKUP_SUFFIX}"
+        counter += 1
+    return filename
+
+
+def create_backup(source: str, directory: str, keep: int) -> BackupResult:
+    """
+    Takes a consistent snapshot of a live database with VACUUM INTO, which
+    reads a single WAL snapshot and never waits on (or restarts because of)
+    the bot's writes, gzips it into the backup directory and prunes the
+    oldest archives beyond `keep`.
+    Blocking: run it through run_backup() from the event loop.
+    """
+    start = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    filename = _backup_filename(directory)
+    path = os.path.join(directory, filename)
+    snapshot = f"{path}.snapshot"
+    partial = f"{path}.part"
+
+    try:
+        _online_copy(source, snapshot)
+        raw_size = os.path.getsize(snapshot)
+        with open(snapshot, "rb") as src, gzip.open(partial, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(partial, path)
+    finally:
+        for leftover in (snapshot, partial):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    rotate(directory, keep)
+    return BackupResult(path, filename, os.path.getsize(path), raw_size, time.perf_counter() - start)
+
+
+async def run_backup(source: str, directory: str, keep: int) -> BackupResult:
+    return await asyncio.to_thread(create_backup, source, directory, keep)
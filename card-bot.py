@@ -1,16 +1,45 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import aiosqlite
+from discord.utils import MISSING
 from datetime import datetime, timedelta, timezone
+import asyncio
+import time
 import random
+import heapq
+from operator import itemgetter
 import platform
 import psutil
 import os
 import io
-import base64
-import aiohttp
+import csv
+import re
+import textwrap
 from dotenv import load_dotenv
+from storage import Storage
+from loot import LootEngine
+from cooldowns import CooldownLedger
+from writer import WriteQueue
+from locks import UserLocks
+from metrics import Metrics
+from schema import card_key, migrate
+from backup import format_size, run_backup
+from inventory import InventoryCache
+from search import CatalogSearch
+from identities import UserResolver
+from rankings import CATEGORIES, Leaderboards
+from paginator import Paginator
+from render_cache import RenderCache
+from images import ImagePipeline
+from github import GitHubUploader
+import image_audit
+from ingest import ImageIngestor, IngestError
+import importer
+from matchups import Matchups
+import duels
+import tournament
+from catalog import SET_IMAGE_QUERY, SET_IMAGE_URLS_QUERY, SET_THUMB_QUERY, Card, CardCatalog, rarity_rank
+import stats
 
 load_dotenv()
 
@@ -22,7 +51,14 @@ TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_REPO = os.getenv("GITHUB_REPO")
 GITHUB_BRANCH = os.getenv("GITHUB_BRANCH", "main")
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
 COOLDOWN_HOURS = 2
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "image_cache")
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", 8 * 1024 * 1024))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 : pas d'endpoint /metrics
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
 
 if TOKEN is None:
     raise ValueError("Le token Discord n'est pas défini !")
@@ -34,9 +70,95 @@ if GITHUB_REPO is None:
 intents = discord.Intents.default()
 intents.message_content = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
-
-cards_cache = []
+store = Storage("db.sqlite")
+writes = WriteQueue(store)
+inventories = InventoryCache(store)
+user_locks = UserLocks()
+metrics = Metrics()
+store.observer = writes.observer = metrics.observe_db
+
+class TimedCommand(app_commands.Command):
+    """Slash command whose callback and autocompletes are timed as they are defined."""
+
+    def __init__(self, *, name, callback, **kwargs):
+        super().__init__(name=name, callback=metrics.timed(str(name))(callback), **kwargs)
+
+    def autocomplete(self, name: str):
+        register = super().autocomplete(name)
+
+        def decorator(coro):
+            register(metrics.timed(f"{self.qualified_name}.{name}", "autocomplete")(coro))
+            return coro
+        return decorator
+
+class TimedTree(app_commands.CommandTree):
+    """Same command decorator as CommandTree, building TimedCommand objects."""
+
+    def command(self, *, name=MISSING, description=MISSING, nsfw: bool = False, guild=MISSING, guilds=MISSING,
+                auto_locale_strings: bool = True, extras=MISSING):
+        def decorator(func):
+            if not asyncio.iscoroutinefunction(func):
+                raise TypeError("command function must be a coroutine function")
+            if description is not MISSING:
+                desc = description
+            elif func.__doc__ is None:
+                desc = "…"
+            else:
+                # Comme discord.py : premier paragraphe de la docstring, 100 caractères au plus
+                desc = textwrap.shorten(re.split(r"\n\s*\n", func.__doc__.strip(), maxsplit=1)[0], 100, placeholder="…")
+            command = TimedCommand(
+                name=name if name is not MISSING else func.__name__,
+                description=desc,
+                callback=func,
+                nsfw=nsfw,
+                parent=None,
+                auto_locale_strings=auto_locale_strings,
+                extras=extras,
+            )
+            self.add_command(command, guild=guild, guilds=guilds)
+            return command
+        return decorator
+
+class CardBot(commands.Bot):
+    async def setup_hook(self):
+        await store.open()
+        async with store.write() as db:
+            applied = await migrate(db)
+        if applied:
+            print(f"Migrations appliquées : {', '.join(map(str, applied))}")
+        async with store.read() as db:
+            await catalog.load(db)
+            await leaderboards.load(db)
+        writes.start()
+        self.metrics_runner = await metrics.serve(METRICS_PORT, METRICS_HOST) if METRICS_PORT else None
+        if self.metrics_runner:
+            print(f"Métriques exposées sur http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+    async def close(self):
+        await super().close()
+        if getattr(self, "metrics_runner", None):
+            await self.metrics_runner.cleanup()
+        images.close()
+        await uploader.close()
+        await ingestor.close()
+        await writes.close()
+        await store.close()
+
+bot = CardBot(command_prefix="!", intents=intents, tree_cls=TimedTree, http_trace=metrics.trace_config())
+
+catalog = CardCatalog()
+loot_engine = LootEngine()
+card_search = CatalogSearch()
+catalog.subscribe(loot_engine)
+catalog.subscribe(card_search)
+cooldowns = CooldownLedger(COOLDOWN_HOURS)
+users = UserResolver(bot)
+leaderboards = Leaderboards()
+renders = RenderCache()
+matchups = Matchups(catalog)
+images = ImagePipeline(IMAGE_CACHE_DIR)
+uploader = GitHubUploader(GITHUB_TOKEN, GITHUB_REPO, GITHUB_BRANCH, base_url=GITHUB_API_URL)
+ingestor = ImageIngestor(IMAGE_MAX_BYTES)
 
 RARITY_COLORS = {
     "C": 0x95a5a6,
@@ -48,187 +170,36 @@ RARITY_COLORS = {
     "???": 0x00e8ff
 }
 
-async def upload_image_to_github(image_data: bytes, filename: str) -> str | None:
-    """
-    Upload an image to the /cards/ folder of the GitHub repo.
-    Returns the permanent githubusercontent.com CDN URL, or None on failure.
-    """
-    safe_name = filename.replace(" ", "_")
-    path = f"cards/{safe_name}"
-    
-    api_url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{path}"
-    headers = {
-        "Authorization": f"Bearer {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github+json",
-        "X-GitHub-Api-Version": "2022-11-28"
-    }
-    
-    async with aiohttp.ClientSession() as session:
-        sha = None
-        async with session.get(api_url, headers=headers) as resp:
-            if resp.status == 200:
-                existing = await resp.json()
-                sha = existing.get("sha")
-        
-        payload = {
-            "message": f"Add card image: {safe_name}",
-            "content": base64.b64encode(image_data).decode("utf-8"),
-            "branch": GITHUB_BRANCH
-        }
-        if sha:
-            payload["sha"] = sha
-        
-        async with session.put(api_url, headers=headers, json=payload) as resp:
-            if resp.status in (200, 201):
-                result = await resp.json()
-                download_url = result.get("content", {}).get("download_url")
-                if download_url:
-                    return download_url
-                return f"https://raw.githubusercontent.com/{GITHUB_REPO}/{GITHUB_BRANCH}/{path}"
-            else:
-                error = await resp.text()
-                print(f"[GitHub Upload Error] {resp.status}: {error}")
-                return None
-
-def get_loot(cards):
-    rates = {
-        "C": 0.35,
-        "R": 0.30,
-        "SR": 0.20,
-        "SSR": 0.10,
-        "UR": 0.04,
-        "LR": 0.009,
-        "???": 0.001
-    }
-
-    r = random.random()
-    cumulative = 0
-    rarity_selected = "C"
-    for rarity, rate in rates.items():
-        cumulative += rate
-        if r <= cumulative:
-            rarity_selected = rarity
-            break
-
-    candidates = [card for card in cards if card["rarity"] == rarity_selected]
-    if not candidates:
-        return random.choice(cards)
-    
-    random.shuffle(candidates)
-    return candidates[0]
-
-def calculate_duel_winner(card1, card2):
-    rounds = []
-    card1_wins = 0
-    card2_wins = 0
-    
-    if card1['power'] > card2['power']:
-        rounds.append({'round': 1, 'type': 'Power', 'winner': 1, 'card1_stat': card1['power'], 'card2_stat': card2['power']})
-        card1_wins += 1
-    elif card2['power'] > card1['power']:
-        rounds.append({'round': 1, 'type': 'Power', 'winner': 2, 'card1_stat': card1['power'], 'card2_stat': card2['power']})
-        card2_wins += 1
-    else:
-        rounds.append({'round': 1, 'type': 'Power', 'winner': 0, 'card1_stat': card1['power'], 'card2_stat': card2['power']})
-    
-    if card1['protection'] > card2['protection']:
-        rounds.append({'round': 2, 'type': 'Protection', 'winner': 1, 'card1_stat': card1['protection'], 'card2_stat': card2['protection']})
-        card1_wins += 1
-    elif card2['protection'] > card1['protection']:
-        rounds.append({'round': 2, 'type': 'Protection', 'winner': 2, 'card1_stat': card1['protection'], 'card2_stat': card2['protection']})
-        card2_wins += 1
-    else:
-        rounds.append({'round': 2, 'type': 'Protection', 'winner': 0, 'card1_stat': card1['protection'], 'card2_stat': card2['protection']})
-    
-    total1 = card1['power'] + card1['protection']
-    total2 = card2['power'] + card2['protection']
-    
-    if total1 > total2:
-        rounds.append({'round': 3, 'type': 'Total', 'winner': 1, 'card1_stat': total1, 'card2_stat': total2})
-        card1_wins += 1
-    elif total2 > total1:
-        rounds.append({'round': 3, 'type': 'Total', 'winner': 2, 'card1_stat': total1, 'card2_stat': total2})
-        card2_wins += 1
-    else:
-        tiebreaker = random.choice([1, 2])
-        rounds.append({'round': 3, 'type': 'Total (Égalité - Tirage au sort)', 'winner': tiebreaker, 'card1_stat': total1, 'card2_stat': total2})
-        if tiebreaker == 1:
-            card1_wins += 1
-        else:
-            card2_wins += 1
-    
-    if card1_wins > card2_wins:
-        overall_winner = 1
-    elif card2_wins > card1_wins:
-        overall_winner = 2
-    else:
-        overall_winner = random.choice([1, 2])
-    
-    return overall_winner, rounds, card1_wins, card2_wins
+RARITY_TITLES = {"???": "♾️ **SECRET**", "LR": "🟨 **LR**", "UR": "🟥 **UR**", "SSR": "🟪 **SSR**", "SR": "🟦 **SR**", "R": "🟩 **R**", "C": "⬜ **C**"}
+RARITY_EMOJIS = {"???": "♾️", "LR": "🟨", "UR": "🟥", "SSR": "🟪", "SR": "🟦", "R": "🟩", "C": "⬜"}
+
+def card_paginator(interaction: discord.Interaction, title: str, rows: list, **kwargs) -> Paginator:
+    """Paginated card list from pre-formatted (rarity, line) rows, grouped by rarity."""
+    return Paginator(
+        interaction.user.id, title, rows,
+        render=itemgetter(1),
+        group=itemgetter(0),
+        section=lambda rarity: RARITY_TITLES.get(rarity, "❓ **AUTRES**"),
+        group_label=lambda rarity: "SECRET" if rarity == "???" else rarity,
+        **kwargs
+    )
+
+async def publish_thumbnail(image_data: bytes) -> tuple[str | None, str]:
+    """Builds the card thumbnail and uploads it next to the full image (see ImagePipeline.publish)."""
+    return await images.publish(image_data, uploader.upload)
 
 @bot.event
 async def on_ready():
-    global cards_cache
     await bot.tree.sync()
     print(f"Slash commands Synchronisées | {bot.user}")
-    async with aiosqlite.connect("db.sqlite") as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INT PRIMARY KEY,
-                last_loot TEXT,
-                loot_count INT DEFAULT 0,
-                favorite_card INT
-            )
-        """)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS cards (
-                id INT PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                rarity TEXT,
-                image_url TEXT,
-                power INT DEFAULT 1,
-                protection INT DEFAULT 1
-            )
-        """)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS user_cards (
-                user_id INT,
-                card_id INT,
-                quantity INT,
-                PRIMARY KEY (user_id, card_id)
-            )
-        """)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS duel_history (
-                player1_id INT,
-                player2_id INT,
-                player1_wins INT DEFAULT 0,
-                player2_wins INT DEFAULT 0,
-                total_duels INT DEFAULT 0,
-                last_duel TEXT,
-                PRIMARY KEY (player1_id, player2_id)
-            )
-        """)
-        
-        for alter in [
-            "ALTER TABLE users ADD COLUMN loot_count INT DEFAULT 0",
-            "ALTER TABLE users ADD COLUMN favorite_card INT",
-            "ALTER TABLE cards ADD COLUMN power INT DEFAULT 1",
-            "ALTER TABLE cards ADD COLUMN protection INT DEFAULT 1",
-        ]:
-            try:
-                await db.execute(alter)
-            except:
-                pass
-        
-        await db.commit()
-
-        async with db.execute("SELECT id, name, rarity, image_url, power, protection FROM cards") as cursor:
-            rows = await cursor.fetchall()
-        cards_cache = [{"id": r[0], "name": r[1], "rarity": r[2], "image_url": r[3], "power": r[4], "protection": r[5]} for r in rows]
-
     print(f"Bot prêt ! Connecté en tant que {bot.user}")
 
+async def owned_cards(user_id: int) -> list[tuple[Card, int]]:
+    inventory = await inventories.get(user_id)
+    owned = [(catalog.by_id[card_id], quantity) for card_id, quantity in inventory.items() if card_id in catalog.by_id]
+    owned.sort(key=lambda item: item[0].name)
+    return owned
+
 async def admin_error(interaction: discord.Interaction, error):
     if isinstance(error, app_commands.MissingPermissions):
         await interaction.response.send_message(
@@ -243,7 +214,7 @@ async def help(interaction: discord.Interaction):
     player_commands = []
     admin_commands = []
 
-    ADMIN_COMMANDS = {"db", "refresh", "addcard", "delcard", "givecard", "status", "backup", "fixcardimage", "refreshallimages"}
+    ADMIN_COMMANDS = {"db", "refresh", "addcard", "delcard", "givecard", "status", "backup", "fixcardimage", "refreshallimages", "syncstats", "backfillthumbs", "importcards", "balance", "compactduels"}
 
     for cmd in bot.tree.get_commands():
         cmd_name = cmd.name
@@ -271,86 +242,64 @@ async def loot(interaction: discord.Interaction):
     user_id = interaction.user.id
     now = datetime.now(timezone.utc)
 
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute("SELECT last_loot FROM users WHERE user_id = ?", (user_id,)) as cursor:
-            row = await cursor.fetchone()
-
-        if row:
-            last_loot = datetime.fromisoformat(row[0])
-            if now - last_loot < timedelta(hours=COOLDOWN_HOURS):
-                remaining = timedelta(hours=COOLDOWN_HOURS) - (now - last_loot)
-                h, rem = divmod(int(remaining.total_seconds()), 3600)
-                m, s = divmod(rem, 60)
-                await interaction.response.send_message(f"⏳ Attends encore **{h}h {m}m {s}s**", ephemeral=True)
-                return
-
-        card = get_loot(cards_cache)
-
-        await db.execute(
-            "INSERT OR REPLACE INTO users(user_id, last_loot, loot_count) VALUES (?, ?, COALESCE((SELECT loot_count FROM users WHERE user_id = ?), 0) + 1)",
-            (user_id, now.isoformat(), user_id)
-        )
-        await db.execute("""
-            INSERT INTO user_cards(user_id, card_id, quantity)
-            VALUES (?, ?, 1)
-            ON CONFLICT(user_id, card_id)
-            DO UPDATE SET quantity = quantity + 1
-        """, (user_id, card["id"]))
-        await db.commit()
+    async with user_locks.hold(user_id):
+        remaining = await cooldowns.claim(store, user_id, now.timestamp())
+        card = None if remaining else loot_engine.draw()
+        if card is not None:
+            try:
+                new_card = await writes.submit("loot", user_id, card.id, now.isoformat())
+            except Exception:
+                cooldowns.forget(user_id)
+                raise
+            inventories.add(user_id, card.id, 1)
+            leaderboards.record_loot(user_id, new_card)
+        elif not remaining:
+            cooldowns.forget(user_id)
+
+    if remaining:
+        h, rem = divmod(int(remaining), 3600)
+        m, s = divmod(rem, 60)
+        await interaction.response.send_message(f"⏳ Attends encore **{h}h {m}m {s}s**", ephemeral=True)
+        return
+    if card is None:
+        await interaction.response.send_message("📭 Aucune carte dans la base de données.", ephemeral=True)
+        return
 
     embed = discord.Embed(
-        title=card["name"],
-        description=f"**Rareté :** {card['rarity']}\n⚔️ **Power :** {card['power']}/6\n🛡️ **Protection :** {card['protection']}/6",
-        color=RARITY_COLORS.get(card["rarity"])
+        title=card.name,
+        description=f"**Rareté :** {card.rarity}\n⚔️ **Power :** {card.power}/6\n🛡️ **Protection :** {card.protection}/6",
+        color=RARITY_COLORS.get(card.rarity)
     )
-    if card["image_url"]:
-        embed.set_image(url=card["image_url"])
+    if card.image_url:
+        embed.set_image(url=card.display_url)
     await interaction.response.send_message(embed=embed)
 
 
 @bot.tree.command(name="show", description="Afficher une carte de ton inventaire")
 @app_commands.describe(name="Affiche la carte demandée (utilise l'autocomplétion)")
 async def show(interaction: discord.Interaction, name: str):
-    user_id = interaction.user.id
+    card = catalog.find(name)
+    quantity = (await inventories.get(interaction.user.id)).get(card.id, 0) if card else 0
 
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute(
-            """
-            SELECT c.name, c.rarity, c.image_url, uc.quantity, c.power, c.protection
-            FROM user_cards uc
-            JOIN cards c ON uc.card_id = c.id
-            WHERE uc.user_id = ? AND LOWER(c.name) = LOWER(?)
-            """, (user_id, name)
-        ) as cursor:
-            row = await cursor.fetchone()
-
-    if not row:
+    if not quantity:
         await interaction.response.send_message(
             f"❌ {interaction.user.mention} tu ne possèdes pas la carte **{name}**", ephemeral=True
         )
         return
-    
-    card_name, rarity, image_url, quantity, power, protection = row
 
     embed = discord.Embed(
-        title=card_name,
-        description=f"**Rareté :** {rarity}\n**Quantité :** {quantity}\n⚔️ **Power :** {power}/6\n🛡️ **Protection :** {protection}/6",
-        color=RARITY_COLORS.get(rarity, 0x95a5a6)
+        title=card.name,
+        description=f"**Rareté :** {card.rarity}\n**Quantité :** {quantity}\n⚔️ **Power :** {card.power}/6\n🛡️ **Protection :** {card.protection}/6",
+        color=RARITY_COLORS.get(card.rarity, 0x95a5a6)
     )
-    if image_url:
-        embed.set_image(url=image_url)
+    if card.image_url:
+        embed.set_image(url=card.display_url)
     embed.set_footer(text=f"Inventaire de {interaction.user.display_name}")
     await interaction.response.send_message(embed=embed)
 
 @show.autocomplete('name')
 async def show_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
-    user_id = interaction.user.id
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute(
-            "SELECT c.name, c.rarity, uc.quantity FROM user_cards uc JOIN cards c ON uc.card_id = c.id WHERE uc.user_id = ? AND uc.quantity > 0 ORDER BY c.name ASC",
-            (user_id,)
-        ) as cursor:
-            rows = await cursor.fetchall()
+    rows = [(card.name, card.rarity, quantity) for card, quantity in await owned_cards(interaction.user.id)]
     matches = [(n, r, q) for n, r, q in rows if current.lower() in n.lower()]
     return [app_commands.Choice(name=f"{n} ({r}) × {q}", value=n) for n, r, q in matches[:25]]
 
@@ -358,90 +307,54 @@ async def show_autocomplete(interaction: discord.Interaction, current: str) -> l
 @bot.tree.command(name="inv", description="Afficher ton inventaire complet")
 async def inv(interaction: discord.Interaction):
     user_id = interaction.user.id
+    inventory = await inventories.get(user_id)
 
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute("""
-            SELECT c.name, uc.quantity, c.rarity
-            FROM user_cards uc
-            JOIN cards c ON uc.card_id = c.id
-            WHERE uc.user_id = ?
-            ORDER BY CASE c.rarity WHEN '???' THEN 1 WHEN 'LR' THEN 2 WHEN 'UR' THEN 3 WHEN 'SSR' THEN 4 WHEN 'SR' THEN 5 WHEN 'R' THEN 6 WHEN 'C' THEN 7 ELSE 8 END, c.name ASC
-        """, (user_id,)) as cursor:
-            rows = await cursor.fetchall()
+    def build():
+        return [
+            (card.rarity, f"{RARITY_EMOJIS.get(card.rarity, '❓')} {card.name} × {inventory[card.id]}")
+            for card in catalog if card.id in inventory
+        ]
 
+    rows = renders.get(("inv", user_id, catalog.version, inventories.version(user_id)), build)
     if not rows:
         await interaction.response.send_message(f"{interaction.user.mention} ton inventaire est vide... 😢", ephemeral=True)
         return
 
-    rarity_titles = {"???": "​♾️​ **SECRET**", "LR": "🟨 **LR**", "UR": "🟥 **UR**", "SSR": "🟪 **SSR**", "SR": "🟦 **SR**", "R": "🟩​ **R**", "C": "⬜ **C**"}
-    rarity_emojis = {"???": "​♾️​", "LR": "🟨", "UR": "🟥​", "SSR": "🟪", "SR": "🟦", "R": "🟩​", "C": "⬜"}
-
-    lines = []
-    last_rarity = None
-
-    for name, qty, rarity in rows:
-        if rarity != last_rarity:
-            if last_rarity is not None:
-                lines.append("")
-            lines.append(rarity_titles.get(rarity, "❓ **AUTRES**"))
-            lines.append("═══════════════════╢")
-            last_rarity = rarity
-        lines.append(f"{rarity_emojis.get(rarity, '❓')} {name} × {qty}")
-
-    embed = discord.Embed(title=f"🎒 Inventaire de {interaction.user.display_name}", description="\n".join(lines), color=0x2ecc71)
-    await interaction.response.send_message(embed=embed)
+    view = card_paginator(
+        interaction, f"🎒 Inventaire de {interaction.user.display_name}", rows,
+        footer=f"{len(rows)} cartes différentes",
+        color=0x2ecc71
+    )
+    await view.send(interaction)
 
 
 @bot.tree.command(name="list", description="Afficher toutes les cartes du jeu avec ta progression")
 async def list_cards(interaction: discord.Interaction):
     user_id = interaction.user.id
+    owned = await inventories.get(user_id)
 
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute("""
-            SELECT c.id, c.name, c.rarity FROM cards c
-            ORDER BY CASE c.rarity WHEN '???' THEN 1 WHEN 'LR' THEN 2 WHEN 'UR' THEN 3 WHEN 'SSR' THEN 4 WHEN 'SR' THEN 5 WHEN 'R' THEN 6 WHEN 'C' THEN 7 ELSE 8 END, c.name ASC
-        """) as cursor:
-            all_cards = await cursor.fetchall()
-
-        async with db.execute("SELECT card_id, quantity FROM user_cards WHERE user_id = ?", (user_id,)) as cursor:
-            owned_cards = {row[0]: row[1] for row in await cursor.fetchall()}
-
-    if not all_cards:
+    if not catalog:
         await interaction.response.send_message("📭 Aucune carte dans la base de données.", ephemeral=True)
         return
 
-    rarity_titles = {"???": "​♾️​ **SECRET**", "LR": "🟨 **LR**", "UR": "🟥 **UR**", "SSR": "🟪 **SSR**", "SR": "🟦 **SR**", "R": "🟩​ **R**", "C": "⬜ **C**"}
-    rarity_emojis = {"???": "​♾️​", "LR": "🟨", "UR": "🟥​", "SSR": "🟪", "SR": "🟦", "R": "🟩​", "C": "⬜"}
-
-    lines = []
-    last_rarity = None
-    rarity_stats = {}
-
-    for card_id, name, rarity in all_cards:
-        if rarity not in rarity_stats:
-            rarity_stats[rarity] = {"total": 0, "owned": 0}
-        rarity_stats[rarity]["total"] += 1
-
-        if rarity != last_rarity:
-            if last_rarity is not None:
-                lines.append("")
-            lines.append(rarity_titles.get(rarity, "❓ **AUTRES**"))
-            lines.append("═══════════════════╢")
-            last_rarity = rarity
-
-        if card_id in owned_cards:
-            lines.append(f"{rarity_emojis.get(rarity, '❓')} {name} × {owned_cards[card_id]}")
-            rarity_stats[rarity]["owned"] += 1
-        else:
-            lines.append(f"{rarity_emojis.get(rarity, '❓')} ??? (Non possédée)")
-
-    total_cards = sum(s["total"] for s in rarity_stats.values())
-    owned_total = sum(s["owned"] for s in rarity_stats.values())
-    overall_completion = (owned_total / total_cards * 100) if total_cards > 0 else 0
-
-    embed = discord.Embed(title=f"📋 Collection complète - {interaction.user.display_name}", description="\n".join(lines), color=0xe67e22)
-    embed.set_footer(text=f"Collection totale: {owned_total}/{total_cards} cartes ({overall_completion:.1f}%)")
-    await interaction.response.send_message(embed=embed)
+    def build():
+        rows = [
+            (card.rarity, f"{RARITY_EMOJIS.get(card.rarity, '❓')} {card.name} × {owned[card.id]}" if card.id in owned
+             else f"{RARITY_EMOJIS.get(card.rarity, '❓')} ??? (Non possédée)")
+            for card in catalog
+        ]
+        total_cards = len(catalog)
+        owned_total = sum(1 for card_id in owned if card_id in catalog.by_id)
+        overall_completion = (owned_total / total_cards * 100) if total_cards > 0 else 0
+        return rows, f"Collection totale: {owned_total}/{total_cards} cartes ({overall_completion:.1f}%)"
+
+    rows, footer = renders.get(("list", user_id, catalog.version, inventories.version(user_id)), build)
+    view = card_paginator(
+        interaction, f"📋 Collection complète - {interaction.user.display_name}", rows,
+        footer=footer,
+        color=0xe67e22
+    )
+    await view.send(interaction)
 
 
 @bot.tree.command(name="profile", description="Afficher ton profil de collectionneur ou celui d'un autre joueur")
@@ -451,36 +364,18 @@ async def profile(interaction: discord.Interaction, member: discord.Member = Non
     target = member or interaction.user
     user_id = target.id
 
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute("SELECT loot_count, favorite_card FROM users WHERE user_id = ?", (user_id,)) as cursor:
-            user_row = await cursor.fetchone()
-        loot_count = user_row[0] if user_row and user_row[0] else 0
-        favorite_card_id = user_row[1] if user_row and user_row[1] else None
-
-        async with db.execute("SELECT SUM(quantity) FROM user_cards WHERE user_id = ?", (user_id,)) as cursor:
-            total_cards = (await cursor.fetchone())[0] or 0
-
-        async with db.execute("SELECT COUNT(DISTINCT card_id) FROM user_cards WHERE user_id = ?", (user_id,)) as cursor:
-            unique_cards = (await cursor.fetchone())[0] or 0
-
-        async with db.execute("SELECT COUNT(*) FROM cards") as cursor:
-            total_db_cards = (await cursor.fetchone())[0] or 1
-
-        completion = (unique_cards / total_db_cards * 100) if total_db_cards > 0 else 0
+    async with store.read() as db:
+        async with db.execute(stats.PROFILE_QUERY, (user_id,)) as cursor:
+            row = await cursor.fetchone()
+    total_cards, unique_cards, best_card_id, loot_count, favorite_card_id = row or (0, 0, None, 0, None)
+    favorite_card = catalog.get(favorite_card_id)
 
-        async with db.execute("""
-            SELECT c.name, c.rarity FROM user_cards uc JOIN cards c ON uc.card_id = c.id WHERE uc.user_id = ?
-            ORDER BY CASE c.rarity WHEN '???' THEN 1 WHEN 'LR' THEN 2 WHEN 'UR' THEN 3 WHEN 'SSR' THEN 4 WHEN 'SR' THEN 5 WHEN 'R' THEN 6 WHEN 'C' THEN 7 ELSE 8 END LIMIT 1
-        """, (user_id,)) as cursor:
-            rarest_row = await cursor.fetchone()
-        rarest_card = f"{rarest_row[0]} ({rarest_row[1]})" if rarest_row else "Aucune"
+    total_db_cards = len(catalog) or 1
+    completion = (unique_cards / total_db_cards * 100) if total_db_cards > 0 else 0
 
-        favorite_card_name = "Aucune"
-        if favorite_card_id:
-            async with db.execute("SELECT name, rarity FROM cards WHERE id = ?", (favorite_card_id,)) as cursor:
-                fav_row = await cursor.fetchone()
-            if fav_row:
-                favorite_card_name = f"{fav_row[0]} ({fav_row[1]})"
+    rarest = catalog.get(best_card_id)
+    rarest_card = f"{rarest.name} ({rarest.rarity})" if rarest else "Aucune"
+    favorite_card_name = f"{favorite_card.name} ({favorite_card.rarity})" if favorite_card else "Aucune"
 
     embed = discord.Embed(title=f"📊 Profil de {target.display_name}", color=0xe74c3c)
     embed.add_field(name="📦 Total de cartes", value=f"{total_cards} cartes", inline=True)
@@ -497,30 +392,19 @@ async def profile(interaction: discord.Interaction, member: discord.Member = Non
 @app_commands.describe(card_name="Nom de la carte (utilise l'autocomplétion)")
 async def fav(interaction: discord.Interaction, card_name: str):
     user_id = interaction.user.id
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute(
-            "SELECT c.id, c.name, c.rarity FROM cards c JOIN user_cards uc ON c.id = uc.card_id WHERE uc.user_id = ? AND LOWER(c.name) = LOWER(?)",
-            (user_id, card_name)
-        ) as cursor:
-            card_row = await cursor.fetchone()
-        if not card_row:
-            await interaction.response.send_message("❌ Tu ne possèdes pas cette carte", ephemeral=True)
-            return
-        card_id, actual_name, rarity = card_row
+    card = catalog.find(card_name)
+    if not card or card.id not in await inventories.get(user_id):
+        await interaction.response.send_message("❌ Tu ne possèdes pas cette carte", ephemeral=True)
+        return
+    card_id, actual_name, rarity = card.id, card.name, card.rarity
+    async with store.write() as db:
         await db.execute("UPDATE users SET favorite_card = ? WHERE user_id = ?", (card_id, user_id))
         await db.execute("INSERT OR IGNORE INTO users(user_id, favorite_card) VALUES (?, ?)", (user_id, card_id))
-        await db.commit()
     await interaction.response.send_message(f"⭐ **{actual_name}** ({rarity}) est maintenant ta carte favorite !")
 
 @fav.autocomplete('card_name')
 async def fav_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
-    user_id = interaction.user.id
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute(
-            "SELECT c.name, c.rarity FROM user_cards uc JOIN cards c ON uc.card_id = c.id WHERE uc.user_id = ? AND uc.quantity > 0 ORDER BY c.name ASC",
-            (user_id,)
-        ) as cursor:
-            rows = await cursor.fetchall()
+    rows = [(card.name, card.rarity) for card, _ in await owned_cards(interaction.user.id)]
     matches = [(n, r) for n, r in rows if current.lower() in n.lower()]
     return [app_commands.Choice(name=f"{n} ({r})", value=n) for n, r in matches[:25]]
 
@@ -542,71 +426,40 @@ async def duel(interaction: discord.Interaction, opponent: discord.Member, your_
         await interaction.response.send_message("❌ Tu ne peux pas défier un bot !", ephemeral=True)
         return
 
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute(
-            "SELECT c.id, c.name, c.rarity, c.power, c.protection, c.image_url FROM cards c JOIN user_cards uc ON c.id = uc.card_id WHERE uc.user_id = ? AND LOWER(c.name) = LOWER(?)",
-            (challenger_id, your_card)
-        ) as cursor:
-            card1_data = await cursor.fetchone()
-        if not card1_data:
-            await interaction.response.send_message(f"❌ Tu ne possèdes pas la carte **{your_card}**", ephemeral=True)
-            return
-        card1 = {'id': card1_data[0], 'name': card1_data[1], 'rarity': card1_data[2], 'power': card1_data[3], 'protection': card1_data[4], 'image_url': card1_data[5]}
-
-        if opponent_card:
-            async with db.execute(
-                "SELECT c.id, c.name, c.rarity, c.power, c.protection, c.image_url FROM cards c JOIN user_cards uc ON c.id = uc.card_id WHERE uc.user_id = ? AND LOWER(c.name) = LOWER(?)",
-                (opponent_id, opponent_card)
-            ) as cursor:
-                card2_data = await cursor.fetchone()
-            if not card2_data:
-                await interaction.response.send_message(f"❌ {opponent.mention} ne possède pas la carte **{opponent_card}**", ephemeral=True)
-                return
+    # Les deux inventaires restent figés entre la vérification des cartes et l'enregistrement du duel
+    async with user_locks.hold(challenger_id, opponent_id):
+        error = None
+        card1 = catalog.find(your_card)
+        card2 = catalog.find(opponent_card) if opponent_card else None
+        if not card1 or card1.id not in await inventories.get(challenger_id):
+            error = f"❌ Tu ne possèdes pas la carte **{your_card}**"
+        elif opponent_card:
+            if not card2 or card2.id not in await inventories.get(opponent_id):
+                error = f"❌ {opponent.mention} ne possède pas la carte **{opponent_card}**"
         else:
-            async with db.execute(
-                "SELECT c.id, c.name, c.rarity, c.power, c.protection, c.image_url FROM cards c JOIN user_cards uc ON c.id = uc.card_id WHERE uc.user_id = ? ORDER BY RANDOM() LIMIT 1",
-                (opponent_id,)
-            ) as cursor:
-                card2_data = await cursor.fetchone()
-            if not card2_data:
-                await interaction.response.send_message(f"❌ {opponent.mention} n'a aucune carte dans son inventaire !", ephemeral=True)
-                return
-        card2 = {'id': card2_data[0], 'name': card2_data[1], 'rarity': card2_data[2], 'power': card2_data[3], 'protection': card2_data[4], 'image_url': card2_data[5]}
+            opponent_cards = await owned_cards(opponent_id)
+            if opponent_cards:
+                card2 = random.choice(opponent_cards)[0]
+            else:
+                error = f"❌ {opponent.mention} n'a aucune carte dans son inventaire !"
 
-    winner, rounds, card1_wins, card2_wins = calculate_duel_winner(card1, card2)
+        if error is None:
+            winner, rounds, card1_wins, card2_wins = duels.calculate_duel_winner(card1, card2)
 
-    async with aiosqlite.connect("db.sqlite") as db:
-        if challenger_id < opponent_id:
-            p1_id, p2_id = challenger_id, opponent_id
-            p1_won = (winner == 1)
-        else:
-            p1_id, p2_id = opponent_id, challenger_id
-            p1_won = (winner == 2)
-
-        async with db.execute("SELECT player1_wins, player2_wins, total_duels FROM duel_history WHERE player1_id = ? AND player2_id = ?", (p1_id, p2_id)) as cursor:
-            history = await cursor.fetchone()
-
-        if history:
-            p1_wins, p2_wins, total = history
-            if p1_won: p1_wins += 1
-            else: p2_wins += 1
-            total += 1
-            await db.execute("UPDATE duel_history SET player1_wins = ?, player2_wins = ?, total_duels = ?, last_duel = ? WHERE player1_id = ? AND player2_id = ?",
-                (p1_wins, p2_wins, total, datetime.now(timezone.utc).isoformat(), p1_id, p2_id))
-        else:
-            p1_wins = 1 if p1_won else 0
-            p2_wins = 0 if p1_won else 1
-            total = 1
-            await db.execute("INSERT INTO duel_history (player1_id, player2_id, player1_wins, player2_wins, total_duels, last_duel) VALUES (?, ?, ?, ?, ?, ?)",
-                (p1_id, p2_id, p1_wins, p2_wins, total, datetime.now(timezone.utc).isoformat()))
-        await db.commit()
+            packed = duels.pack_result(rounds, card1_wins, card2_wins)
+            await writes.submit("duel", challenger_id, opponent_id, card1.id, card2.id, packed, winner, int(datetime.now(timezone.utc).timestamp()))
+            leaderboards.record_duel(*((challenger_id, opponent_id) if winner == 1 else (opponent_id, challenger_id)))
+
+    if error:
+        await interaction.response.send_message(error, ephemeral=True)
+        return
 
-        challenger_total_wins = p1_wins if challenger_id < opponent_id else p2_wins
-        opponent_total_wins = p2_wins if challenger_id < opponent_id else p1_wins
+    async with store.read() as db:
+        challenger_total_wins, opponent_total_wins, total = await duels.head_to_head(db, challenger_id, opponent_id)
 
     embed = discord.Embed(title="⚔️ DUEL DE CARTES ⚔️", color=0xe74c3c if winner == 1 else 0x3498db)
-    embed.add_field(name=f"🔴 {interaction.user.display_name}", value=f"**{card1['name']}** ({card1['rarity']})\n⚔️ Power: {card1['power']}/6\n🛡️ Protection: {card1['protection']}/6", inline=True)
-    embed.add_field(name=f"🔵 {opponent.display_name}", value=f"**{card2['name']}** ({card2['rarity']})\n⚔️ Power: {card2['power']}/6\n🛡️ Protection: {card2['protection']}/6", inline=True)
+    embed.add_field(name=f"🔴 {interaction.user.display_name}", value=f"**{card1.name}** ({card1.rarity})\n⚔️ Power: {card1.power}/6\n🛡️ Protection: {card1.protection}/6", inline=True)
+    embed.add_field(name=f"🔵 {opponent.display_name}", value=f"**{card2.name}** ({card2.rarity})\n⚔️ Power: {card2.power}/6\n🛡️ Protection: {card2.protection}/6", inline=True)
     embed.add_field(name="\u200b", value="\u200b", inline=False)
 
     round_emojis = {1: "🥇", 2: "🥈", 3: "🥉"}
@@ -629,13 +482,7 @@ async def duel(interaction: discord.Interaction, opponent: discord.Member, your_
 
 @duel.autocomplete('your_card')
 async def duel_your_card_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
-    user_id = interaction.user.id
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute(
-            "SELECT c.name, c.rarity, c.power, c.protection FROM user_cards uc JOIN cards c ON uc.card_id = c.id WHERE uc.user_id = ? AND uc.quantity > 0 ORDER BY c.name ASC",
-            (user_id,)
-        ) as cursor:
-            rows = await cursor.fetchall()
+    rows = [(card.name, card.rarity, card.power, card.protection) for card, _ in await owned_cards(interaction.user.id)]
     matches = [(n, r, p, pr) for n, r, p, pr in rows if current.lower() in n.lower()]
     return [app_commands.Choice(name=f"{n} ({r}) - ⚔️{p} 🛡️{pr}", value=n) for n, r, p, pr in matches[:25]]
 
@@ -645,12 +492,7 @@ async def duel_opponent_card_autocomplete(interaction: discord.Interaction, curr
     opponent = namespace.opponent if hasattr(namespace, 'opponent') else None
     if not opponent:
         return [app_commands.Choice(name="Sélectionne d'abord un adversaire", value="")]
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute(
-            "SELECT c.name, c.rarity, c.power, c.protection FROM user_cards uc JOIN cards c ON uc.card_id = c.id WHERE uc.user_id = ? AND uc.quantity > 0 ORDER BY c.name ASC",
-            (opponent.id,)
-        ) as cursor:
-            rows = await cursor.fetchall()
+    rows = [(card.name, card.rarity, card.power, card.protection) for card, _ in await owned_cards(opponent.id)]
     matches = [(n, r, p, pr) for n, r, p, pr in rows if current.lower() in n.lower()]
     return [app_commands.Choice(name=f"{n} ({r}) - ⚔️{p} 🛡️{pr}", value=n) for n, r, p, pr in matches[:25]]
 
@@ -660,13 +502,9 @@ async def duel_opponent_card_autocomplete(interaction: discord.Interaction, curr
 async def duelstats(interaction: discord.Interaction, member: discord.Member = None):
     target = member or interaction.user
     user_id = target.id
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute("SELECT player2_id, player1_wins, player2_wins, total_duels FROM duel_history WHERE player1_id = ?", (user_id,)) as cursor:
-            as_player1 = await cursor.fetchall()
-        async with db.execute("SELECT player1_id, player2_wins, player1_wins, total_duels FROM duel_history WHERE player2_id = ?", (user_id,)) as cursor:
-            as_player2 = await cursor.fetchall()
+    async with store.read() as db:
+        all_duels = await duels.opponents(db, user_id)
 
-    all_duels = as_player1 + as_player2
     if not all_duels:
         await interaction.response.send_message(f"📊 **{target.display_name}** n'a encore participé à aucun duel !", ephemeral=True)
         return
@@ -679,17 +517,11 @@ async def duelstats(interaction: discord.Interaction, member: discord.Member = N
     embed = discord.Embed(title=f"⚔️ Statistiques de Duels - {target.display_name}", color=0xf39c12)
     embed.add_field(name="📊 Statistiques Globales", value=f"**Total de duels :** {total_duels}\n**Victoires :** {total_wins} 🏆\n**Défaites :** {total_losses} 💀\n**Taux de victoire :** {win_rate:.1f}%", inline=False)
 
-    rivalries = []
-    for opponent_id, wins, losses, total in all_duels:
-        try:
-            opponent = await bot.fetch_user(opponent_id)
-            rivalries.append({'name': opponent.display_name, 'wins': wins, 'losses': losses, 'total': total})
-        except:
-            continue
+    rivalries = heapq.nlargest(5, all_duels, key=lambda d: d[3])
+    names = await users.resolve([d[0] for d in rivalries], interaction.guild)
 
     if rivalries:
-        rivalries.sort(key=lambda x: x['total'], reverse=True)
-        rivalry_text = [f"**{i}. {r['name']}**\n   {r['wins']}W - {r['losses']}L ({r['total']} duels)" for i, r in enumerate(rivalries[:5], 1)]
+        rivalry_text = [f"**{i}. {names[opponent_id] or 'Compte supprimé'}**\n   {wins}W - {losses}L ({total} duels)" for i, (opponent_id, wins, losses, total) in enumerate(rivalries, 1)]
         embed.add_field(name="🎯 Top Rivalités", value="\n".join(rivalry_text), inline=False)
 
     embed.set_thumbnail(url=target.display_avatar.url)
@@ -697,6 +529,196 @@ async def duelstats(interaction: discord.Interaction, member: discord.Member = N
     await interaction.response.send_message(embed=embed)
 
 
+DUEL_LOG_LIMIT = 500
+
+@bot.tree.command(name="duellog", description="Voir l'historique détaillé des derniers duels")
+@app_commands.describe(
+    member="Le joueur dont tu veux voir l'historique (optionnel)",
+    card="Seulement les duels joués avec cette carte (optionnel)"
+)
+async def duellog(interaction: discord.Interaction, member: discord.Member = None, card: str = None):
+    target = member or interaction.user
+    selected = None
+    if card:
+        selected = catalog.find(card)
+        if selected is None:
+            await interaction.response.send_message(f"❌ Carte **{card}** introuvable", ephemeral=True)
+            return
+
+    async with store.read() as db:
+        rows = await duels.history(db, target.id, DUEL_LOG_LIMIT, selected.id if selected else None)
+        card_wins, card_total = await duels.card_record(db, selected.id) if selected else (0, 0)
+        week = await duels.count_since(db, target.id, int(datetime.now(timezone.utc).timestamp()) - 7 * 86400, selected.id if selected else None)
+    if not rows:
+        await interaction.response.send_message(f"📊 Aucun duel récent pour **{target.display_name}**{f' avec **{selected.name}**' if selected else ''}.", ephemeral=True)
+        return
+
+    names = await users.resolve(list({row[0] for row in rows}), interaction.guild)
+
+    def card_name(card_id: int) -> str:
+        found = catalog.get(card_id)
+        return found.name if found else "Carte supprimée"
+
+    def render(row) -> str:
+        opponent_id, won, own_card, other_card, packed, at, side = row
+        winners, total_coin, overall_coin = duels.unpack_rounds(packed)
+        score = f"{winners.count(side)}-{winners.count(3 - side)}"
+        coin = " 🪙" if total_coin or overall_coin else ""
+        return f"{'🏆' if won else '💀'} vs **{names[opponent_id] or 'Compte supprimé'}** — {card_name(own_card)} contre {card_name(other_card)} ({score}{coin}) • <t:{at}:R>"
+
+    wins = sum(row[1] for row in rows)
+    footer = f"{len(rows)} duels • {wins / len(rows):.0%} de victoires • {week} cette semaine"
+    if selected and card_total:
+        footer += f" • {selected.name} : {card_wins / card_total:.0%} de victoires tous joueurs confondus ({card_total} duels)"
+
+    view = Paginator(
+        interaction.user.id, f"📜 Derniers duels de {target.display_name}", rows,
+        render=render, footer=footer, color=0xf39c12, page_size=10
+    )
+    await view.send(interaction)
+
+@duellog.autocomplete('card')
+async def duellog_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+    return [app_commands.Choice(name=f"{card.name} ({card.rarity})", value=card.name) for card in card_search.search(current)]
+
+
+async def owned_card(user_id: int, card_name: str) -> Card | None:
+    card = catalog.find(card_name)
+    return card if card and card.id in await inventories.get(user_id) else None
+
+async def run_tournament(interaction: discord.Interaction, format: str, entries: list[tournament.Entry]):
+    async with user_locks.hold(*(entry.user_id for entry in entries)):
+        # Une carte donnée entre l'inscription et le lancement ne peut plus être jouée
+        entries = [entry for entry in entries if entry.card.id in await inventories.get(entry.user_id)]
+        matches = tournament.run(format, entries) if len(entries) >= 2 else []
+        if matches:
+            await writes.submit("duels", tournament.events(matches, int(datetime.now(timezone.utc).timestamp())))
+            for match in matches:
+                leaderboards.record_duel(match.winner_entry.user_id, match.loser_entry.user_id)
+    if not matches:
+        await interaction.followup.send("❌ Moins de 2 joueurs ont encore leur carte, tournoi annulé.")
+        return
+
+    table = tournament.standings(matches)
+    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+    ranking_title = "🏆 Classement" if format == "roundrobin" else "🏆 Parcours"
+    items = [
+        (ranking_title, f"{medals.get(rank, f'`{rank}.`')} **{entry.name}** — {entry.card.name} • {wins}V {losses}D ({diff:+d} manches)")
+        for rank, (entry, wins, losses, diff) in enumerate(table, start=1)
+    ]
+    last_round = matches[-1].round
+    for match in matches:
+        score = f"{max(match.score)}-{min(match.score)}"
+        items.append((
+            tournament.round_label(format, match.round, last_round),
+            f"**{match.winner_entry.name}** ({match.winner_entry.card.name}) bat {match.loser_entry.name} ({match.loser_entry.card.name}) {score}"
+        ))
+
+    champion = table[0][0] if format == "roundrobin" else matches[-1].winner_entry
+    view = Paginator(
+        interaction.user.id, f"🏟️ Tournoi — {tournament.FORMATS[format]}", items,
+        render=itemgetter(1), group=itemgetter(0), section=lambda label: f"**{label}**",
+        footer=f"Champion : {champion.name} avec {champion.card.name} • {len(entries)} joueurs, {len(matches)} duels",
+        color=0xe67e22, page_size=15
+    )
+    await view.send(interaction)
+
+@bot.tree.command(name="tournament", description="Organiser un tournoi de duels entre plusieurs joueurs")
+@app_commands.describe(format="Format du tournoi", max_players="Nombre maximum de joueurs (par défaut : 64)")
+@app_commands.choices(format=[app_commands.Choice(name=label, value=key) for key, label in tournament.FORMATS.items()])
+async def tournament_command(interaction: discord.Interaction, format: app_commands.Choice[str], max_players: app_commands.Range[int, 2, 64] = 64):
+    lobby = tournament.TournamentLobby(
+        interaction.user.id, format.value,
+        find_card=owned_card,
+        start=lambda button_interaction, entries: run_tournament(button_interaction, format.value, entries),
+        max_players=max_players
+    )
+    await interaction.response.send_message(embed=lobby.render(), view=lobby)
+    lobby.message = await interaction.original_response()
+
+
+LEADERBOARD_PAGE_SIZE = 10
+
+def leaderboard_score(category: str, user_id: int, score: tuple) -> str:
+    if category == "collection":
+        return f"{score[0]}/{len(catalog)} cartes ({score[0] / max(len(catalog), 1) * 100:.1f}%)"
+    if category == "loots":
+        return f"{score[0]} loots"
+    wins, total = leaderboards.duel_record(user_id)
+    return f"{score[0] * 100:.1f}% ({wins}V / {total} duels)"
+
+@bot.tree.command(name="leaderboard", description="Afficher le classement des joueurs")
+@app_commands.describe(category="Classement à afficher", page="Page du classement (par défaut : 1)")
+@app_commands.choices(category=[app_commands.Choice(name=label, value=key) for key, label in CATEGORIES.items()])
+async def leaderboard(interaction: discord.Interaction, category: app_commands.Choice[str], page: int = 1):
+    ranking = leaderboards.rankings[category.value]
+    if not len(ranking):
+        await interaction.response.send_message("📭 Personne n'est encore classé dans cette catégorie.", ephemeral=True)
+        return
+
+    pages = (len(ranking) - 1) // LEADERBOARD_PAGE_SIZE + 1
+    page = min(max(page, 1), pages)
+    rows = ranking.page((page - 1) * LEADERBOARD_PAGE_SIZE, LEADERBOARD_PAGE_SIZE)
+    names = await users.resolve([user_id for _, user_id, _ in rows], interaction.guild)
+
+    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+    lines = [
+        f"{medals.get(rank, f'**{rank}.**')} {names[user_id] or 'Compte supprimé'} — {leaderboard_score(category.value, user_id, score)}"
+        for rank, user_id, score in rows
+    ]
+    embed = discord.Embed(title=f"🏆 Classement — {category.name}", description="\n".join(lines), color=0xf1c40f)
+
+    own_rank = ranking.rank(interaction.user.id)
+    if own_rank is not None:
+        own_score = leaderboard_score(category.value, interaction.user.id, ranking.score(interaction.user.id))
+        embed.add_field(name="📍 Ton rang", value=f"#{own_rank} sur {len(ranking)} — {own_score}", inline=False)
+    elif category.value == "duels":
+        embed.add_field(name="📍 Ton rang", value=f"Non classé (il faut au moins {leaderboards.min_duels} duels)", inline=False)
+    else:
+        embed.add_field(name="📍 Ton rang", value="Non classé", inline=False)
+    embed.set_footer(text=f"Page {page}/{pages} • {len(ranking)} joueurs classés")
+    await interaction.response.send_message(embed=embed)
+
+
+@bot.tree.command(name="duelodds", description="Voir les chances de victoire entre deux cartes")
+@app_commands.describe(card_a="Première carte (utilise l'autocomplétion)", card_b="Seconde carte (utilise l'autocomplétion)")
+async def duelodds(interaction: discord.Interaction, card_a: str, card_b: str):
+    first, second = catalog.find(card_a), catalog.find(card_b)
+    missing = card_a if first is None else card_b if second is None else None
+    if missing is not None:
+        await interaction.response.send_message(f"❌ Carte **{missing}** introuvable", ephemeral=True)
+        return
+
+    table = matchups.table()
+    win, coin = table.odds(first, second)
+    rounds = [
+        ("⚔️ Power", first.power, second.power),
+        ("🛡️ Protection", first.protection, second.protection),
+        ("📊 Total", first.power + first.protection, second.power + second.protection),
+    ]
+    lines = []
+    for label, stat1, stat2 in rounds:
+        outcome = first.name if stat1 > stat2 else second.name if stat2 > stat1 else "égalité"
+        lines.append(f"{label} : {stat1} vs {stat2} → {outcome}")
+
+    embed = discord.Embed(
+        title=f"🎲 {first.name} vs {second.name}",
+        description="\n".join(lines),
+        color=0x9b59b6
+    )
+    embed.add_field(name=first.name, value=f"**{win:.0%}** de victoires", inline=True)
+    embed.add_field(name=second.name, value=f"**{1 - win:.0%}** de victoires", inline=True)
+    embed.add_field(name="🪙 Tirage au sort", value=f"{coin:.0%} des duels", inline=True)
+    expected_first, expected_second = table.expected[table.index[first.id]], table.expected[table.index[second.id]]
+    embed.set_footer(text=f"Contre tout le catalogue : {first.name} {expected_first:.0%} • {second.name} {expected_second:.0%}")
+    await interaction.response.send_message(embed=embed)
+
+@duelodds.autocomplete('card_a')
+@duelodds.autocomplete('card_b')
+async def duelodds_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+    return [app_commands.Choice(name=f"{card.name} ({card.rarity})", value=card.name) for card in card_search.search(current)]
+
+
 @bot.tree.command(name="give", description="Donner une carte à un joueur")
 @app_commands.describe(member="Le joueur qui reçoit la carte", card_name="Nom de la carte (utilise l'autocomplétion)")
 async def give(interaction: discord.Interaction, member: discord.Member, card_name: str):
@@ -707,40 +729,30 @@ async def give(interaction: discord.Interaction, member: discord.Member, card_na
         await interaction.response.send_message("❌ Tu ne peux pas te donner une carte", ephemeral=True)
         return
 
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute("SELECT id, name, rarity FROM cards WHERE LOWER(name) = LOWER(?)", (card_name,)) as cursor:
-            card = await cursor.fetchone()
-        if not card:
-            await interaction.response.send_message("❌ Carte inconnue", ephemeral=True)
-            return
-        card_id, actual_name, rarity = card
-
-        async with db.execute("SELECT quantity FROM user_cards WHERE user_id = ? AND card_id = ?", (giver_id, card_id)) as cursor:
-            row = await cursor.fetchone()
-        if not row or row[0] <= 0:
-            await interaction.response.send_message("❌ Tu ne possèdes pas cette carte", ephemeral=True)
-            return
-
-        new_quantity = row[0] - 1
-        if new_quantity == 0:
-            await db.execute("DELETE FROM user_cards WHERE user_id = ? AND card_id = ?", (giver_id, card_id))
-        else:
-            await db.execute("UPDATE user_cards SET quantity = ? WHERE user_id = ? AND card_id = ?", (new_quantity, giver_id, card_id))
-
-        await db.execute("INSERT INTO user_cards (user_id, card_id, quantity) VALUES (?, ?, 1) ON CONFLICT(user_id, card_id) DO UPDATE SET quantity = quantity + 1", (receiver_id, card_id))
-        await db.commit()
+    card = catalog.find(card_name)
+    if not card:
+        await interaction.response.send_message("❌ Carte inconnue", ephemeral=True)
+        return
+    card_id, actual_name, rarity = card.id, card.name, card.rarity
+
+    async with user_locks.hold(giver_id, receiver_id):
+        # Sous verrou, le cache du donneur ne peut pas changer avant l'écriture : inutile de solliciter la file
+        moved = await writes.submit("give", giver_id, receiver_id, card_id) if card_id in await inventories.get(giver_id) else None
+        if moved is not None:
+            giver_lost_card, receiver_new_card = moved
+            inventories.add(giver_id, card_id, -1)
+            inventories.add(receiver_id, card_id, 1)
+            leaderboards.record_cards(giver_id, -int(giver_lost_card))
+            leaderboards.record_cards(receiver_id, int(receiver_new_card))
+    if moved is None:
+        await interaction.response.send_message("❌ Tu ne possèdes pas cette carte", ephemeral=True)
+        return
 
     await interaction.response.send_message(f"🎁 **{interaction.user.display_name}** a donné **{actual_name}** ({rarity}) à **{member.display_name}**")
 
 @give.autocomplete('card_name')
 async def give_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
-    user_id = interaction.user.id
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute(
-            "SELECT c.name, c.rarity, uc.quantity FROM user_cards uc JOIN cards c ON uc.card_id = c.id WHERE uc.user_id = ? AND uc.quantity > 0 ORDER BY c.name ASC",
-            (user_id,)
-        ) as cursor:
-            rows = await cursor.fetchall()
+    rows = [(card.name, card.rarity, quantity) for card, quantity in await owned_cards(interaction.user.id)]
     matches = [(n, r, q) for n, r, q in rows if current.lower() in n.lower()]
     return [app_commands.Choice(name=f"{n} ({r}) × {q}", value=n) for n, r, q in matches[:25]]
 
@@ -748,42 +760,55 @@ async def give_autocomplete(interaction: discord.Interaction, current: str) -> l
 @bot.tree.command(name="db", description="Afficher toutes les cartes disponibles du jeu")
 @app_commands.checks.has_permissions(administrator=True)
 async def db_cmd(interaction: discord.Interaction):
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute("""
-            SELECT name, rarity FROM cards
-            ORDER BY CASE rarity WHEN '???' THEN 1 WHEN 'LR' THEN 2 WHEN 'UR' THEN 3 WHEN 'SSR' THEN 4 WHEN 'SR' THEN 5 WHEN 'R' THEN 6 WHEN 'C' THEN 7 ELSE 8 END, name ASC
-        """) as cursor:
-            rows = await cursor.fetchall()
-
-    if not rows:
+    if not catalog:
         await interaction.response.send_message("📭 Aucune carte enregistrée dans la base de données.", ephemeral=True)
         return
 
-    rarity_titles = {"???": "♾️ **SECRET**", "LR": "🟨 **LR**", "UR": "🟥 **UR**", "SSR": "🟪 **SSR**", "SR": "🟦 **SR**", "R": "🟩 **R**", "C": "⬜ **C**"}
-    rarity_emojis = {"???": "♾️", "LR": "🟨", "UR": "🟥", "SSR": "🟪", "SR": "🟦", "R": "🟩", "C": "⬜"}
+    def build():
+        rows = [(card.rarity, f"{RARITY_EMOJIS.get(card.rarity, '❓')} {card.name}") for card in catalog]
+        footer_stats = " • ".join(f"{r}: {len(cards)}" for r, cards in catalog.by_rarity.items() if cards)
+        return rows, f"{len(catalog)} cartes au total • {footer_stats}"
 
-    lines = []
-    last_rarity = None
-    rarity_count = {}
-
-    for name, rarity in rows:
-        rarity_count[rarity] = rarity_count.get(rarity, 0) + 1
-        if rarity != last_rarity:
-            if last_rarity is not None:
-                lines.append("")
-            lines.append(rarity_titles.get(rarity, "❓ **AUTRES**"))
-            lines.append("═══════════════════╢")
-            last_rarity = rarity
-        lines.append(f"{rarity_emojis.get(rarity, '❓')} {name}")
-
-    footer_stats = " • ".join(f"{r}: {c}" for r, c in rarity_count.items())
-    embed = discord.Embed(title="📚 Base de données des cartes", description="\n".join(lines), color=0x7289da)
-    embed.set_footer(text=f"{len(rows)} cartes au total • {footer_stats}")
-    await interaction.response.send_message(embed=embed)
+    rows, footer = renders.get(("db", catalog.version), build)
+    view = card_paginator(
+        interaction, "📚 Base de données des cartes", rows,
+        footer=footer,
+        color=0x7289da
+    )
+    await view.send(interaction)
 
 db_cmd.error(admin_error)
 
 
+@bot.tree.command(name="balance", description="Rapport d'équilibrage des duels : victoires attendues et cartes dominées")
+@app_commands.checks.has_permissions(administrator=True)
+async def balance(interaction: discord.Interaction):
+    if len(catalog) < 2:
+        await interaction.response.send_message("📭 Il faut au moins deux cartes pour comparer les duels.", ephemeral=True)
+        return
+
+    def build():
+        start = time.perf_counter()
+        table = matchups.table()
+        dominated = dict(table.dominated())
+        elapsed = (time.perf_counter() - start) * 1000
+        order = sorted(range(len(table)), key=lambda i: (rarity_rank(table.cards[i].rarity), -table.expected[i], table.cards[i].key))
+        rows = []
+        for i in order:
+            card = table.cards[i]
+            line = f"{RARITY_EMOJIS.get(card.rarity, '❓')} {card.name} — **{table.expected[i]:.0%}** ({card.power}/{card.protection})"
+            if i in dominated:
+                line += f" 🔻 dominée par {table.cards[dominated[i]].name}"
+            rows.append((card.rarity, line))
+        return rows, f"{len(dominated)} cartes dominées • {len(table.profiles)} profils • calculé en {elapsed:.1f} ms"
+
+    rows, footer = renders.get(("balance", catalog.version), build)
+    view = card_paginator(interaction, "⚖️ Équilibrage des duels", rows, footer=footer, color=0x9b59b6)
+    await view.send(interaction, ephemeral=True)
+
+balance.error(admin_error)
+
+
 @bot.tree.command(name="status", description="Afficher le statut et les performances du bot")
 @app_commands.checks.has_permissions(administrator=True)
 async def status(interaction: discord.Interaction):
@@ -800,6 +825,34 @@ async def status(interaction: discord.Interaction):
     embed.add_field(name="Serveurs", value=len(bot.guilds), inline=True)
     embed.add_field(name="CPU", value=f"{psutil.cpu_percent(interval=0.5)} %", inline=True)
     embed.add_field(name="RAM", value=f"{psutil.virtual_memory().percent} %", inline=True)
+    embed.add_field(name="Cache inventaires", value=f"{len(inventories)} joueurs • {inventories.hits} hits / {inventories.misses} miss ({inventories.hit_rate:.1f}%)", inline=False)
+    embed.add_field(name="Cache affichages", value=f"{len(renders)} listes • {renders.hits} hits / {renders.misses} miss ({renders.hit_rate:.1f}%)", inline=False)
+    embed.add_field(name="Verrous joueurs", value=f"{user_locks.acquired} prises • {user_locks.contended} attentes", inline=False)
+
+    def latency(histogram) -> str:
+        return f"p50 {histogram.quantile(0.5) * 1000:.0f} ms • p99 {histogram.quantile(0.99) * 1000:.0f} ms"
+
+    all_commands = metrics.merged(h for (_, kind), h in metrics.commands.items() if kind == "command")
+    if all_commands.count:
+        db_time = sum(t for (_, kind), t in metrics.command_db.items() if kind == "command")
+        discord_time = sum(t for (_, kind), t in metrics.command_discord.items() if kind == "command")
+        embed.add_field(
+            name="Commandes",
+            value=f"{all_commands.count} appels • {latency(all_commands)} • {sum(metrics.errors.values())} erreurs\n"
+                  f"Temps passé : {db_time / all_commands.total:.0%} base de données, {discord_time / all_commands.total:.0%} API Discord",
+            inline=False
+        )
+        slowest = "\n".join(
+            f"`/{name}` × {h.count} — {latency(h)}{f' • ❌ {errors}' if errors else ''}"
+            for name, h, errors, _, _ in metrics.slowest()
+        )
+        embed.add_field(name="Plus lentes (p99)", value=slowest, inline=False)
+    for label, histograms in (("Base de données", metrics.db), ("API Discord", metrics.discord)):
+        merged = metrics.merged(histograms.values())
+        if merged.count:
+            embed.add_field(name=label, value=f"{merged.count} appels • {latency(merged)}", inline=True)
+    if METRICS_PORT:
+        embed.add_field(name="Prometheus", value=f"`http://{METRICS_HOST}:{METRICS_PORT}/metrics`", inline=True)
     embed.set_footer(text=f"Demandé par {interaction.user.display_name}")
     await interaction.response.send_message(embed=embed)
 
@@ -812,16 +865,18 @@ status.error(admin_error)
 async def refresh(interaction: discord.Interaction, member: discord.Member | None = None):
     target = member or interaction.user
     user_id = target.id
-    reset_time = (datetime.now(timezone.utc) - timedelta(hours=COOLDOWN_HOURS + 1)).isoformat()
-
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)) as cursor:
-            row = await cursor.fetchone()
-        if row:
-            await db.execute("UPDATE users SET last_loot = ? WHERE user_id = ?", (reset_time, user_id))
-        else:
-            await db.execute("INSERT INTO users(user_id, last_loot) VALUES (?, ?)", (user_id, reset_time))
-        await db.commit()
+    reset_time = datetime.now(timezone.utc) - timedelta(hours=COOLDOWN_HOURS + 1)
+
+    # Un /loot en cours écrirait son last_loot après la réinitialisation
+    async with user_locks.hold(user_id):
+        async with store.write() as db:
+            async with db.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)) as cursor:
+                row = await cursor.fetchone()
+            if row:
+                await db.execute("UPDATE users SET last_loot = ? WHERE user_id = ?", (reset_time.isoformat(), user_id))
+            else:
+                await db.execute("INSERT INTO users(user_id, last_loot) VALUES (?, ?)", (user_id, reset_time.isoformat()))
+        cooldowns.set(user_id, reset_time.timestamp())
 
     await interaction.response.send_message(f"✅ Cooldown de loot réinitialisé pour **{target.display_name}**")
 
@@ -867,47 +922,35 @@ async def addcard(
 
     await interaction.response.defer(ephemeral=True)
 
+    if catalog.find(name):
+        await interaction.followup.send(f"❌ Une carte nommée **{name}** existe déjà", ephemeral=True)
+        return
+
     image_url_final = ""
+    image = None
 
     try:
-        if image_file is not None:
-            image_data = await image_file.read()
-            ext = image_file.filename.split('.')[-1]
-            filename = f"{name}.{ext}"
-            github_url = await upload_image_to_github(image_data, filename)
-            if not github_url:
-                await interaction.followup.send("❌ Échec de l'upload de l'image sur GitHub.", ephemeral=True)
+        if image_file is not None or image_url is not None:
+            try:
+                image = await (ingestor.attachment(image_file) if image_file is not None else ingestor.fetch(image_url))
+            except IngestError as e:
+                await interaction.followup.send(f"❌ Image refusée : {e}", ephemeral=True)
                 return
-            image_url_final = github_url
-
-        elif image_url is not None:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(image_url) as resp:
-                    if resp.status != 200:
-                        await interaction.followup.send(f"❌ Impossible de télécharger l'image (Status: {resp.status})", ephemeral=True)
-                        return
-                    image_data = await resp.read()
-            ext = image_url.split('.')[-1].split('?')[0]
-            if ext not in ['png', 'jpg', 'jpeg', 'gif', 'webp']:
-                ext = 'png'
-            filename = f"{name}.{ext}"
-            github_url = await upload_image_to_github(image_data, filename)
+            github_url = await uploader.upload(image.data, f"{name}.{image.ext}", image.encoded)
             if not github_url:
                 await interaction.followup.send("❌ Échec de l'upload de l'image sur GitHub.", ephemeral=True)
                 return
             image_url_final = github_url
 
-        async with aiosqlite.connect("db.sqlite") as db:
-            await db.execute(
-                "INSERT INTO cards (name, rarity, image_url, power, protection) VALUES (?, ?, ?, ?, ?)",
-                (name, rarity.value, image_url_final, power, protection)
-            )
-            await db.commit()
+        image_hash, thumb_url = await publish_thumbnail(image.data) if image else (None, "")
 
-            global cards_cache
-            async with db.execute("SELECT id, name, rarity, image_url, power, protection FROM cards") as cursor:
-                rows = await cursor.fetchall()
-            cards_cache = [{"id": r[0], "name": r[1], "rarity": r[2], "image_url": r[3], "power": r[4], "protection": r[5]} for r in rows]
+        async with store.write() as db:
+            cursor = await db.execute(
+                "INSERT INTO cards (name, name_key, rarity, image_url, power, protection, image_hash, thumb_url) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, card_key(name), rarity.value, image_url_final, power, protection, image_hash, thumb_url)
+            )
+            card_id = cursor.lastrowid
+        catalog.add(Card(card_id, name, card_key(name), rarity.value, image_url_final, power, protection, thumb_url))
 
         await interaction.followup.send(
             f"✅ Carte **{name}** ajoutée ({rarity.value}) - ⚔️ {power}/6 | 🛡️ {protection}/6",
@@ -920,6 +963,67 @@ async def addcard(
 addcard.error(admin_error)
 
 
+@bot.tree.command(name="importcards", description="Importer des cartes depuis un manifeste CSV ou JSON")
+@app_commands.checks.has_permissions(administrator=True)
+@app_commands.describe(
+    manifest="Fichier CSV ou JSON : name, rarity, power, protection, image (URL)",
+    dry_run="Valider le manifeste sans rien importer"
+)
+async def importcards(interaction: discord.Interaction, manifest: discord.Attachment, dry_run: bool = False):
+    await interaction.response.defer(ephemeral=True)
+
+    if manifest.size > 1024 * 1024:
+        await interaction.followup.send("❌ Manifeste trop lourd (1 Mo maximum).", ephemeral=True)
+        return
+    try:
+        records = importer.parse_manifest(await manifest.read(), manifest.filename)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        await interaction.followup.send(f"❌ Manifeste illisible : {e}", ephemeral=True)
+        return
+    if not records:
+        await interaction.followup.send("❌ Le manifeste ne contient aucune carte.", ephemeral=True)
+        return
+
+    rows = importer.validate(records, catalog)
+
+    async def load_image(source: str):
+        if not source.startswith(("http://", "https://")):
+            raise IngestError("une URL http(s) est attendue")
+        return await ingestor.fetch(source)
+
+    try:
+        if not dry_run:
+            await importer.import_cards(
+                rows, store.write, catalog,
+                load_image=load_image,
+                upload=uploader.upload,
+                thumbnail=publish_thumbnail,
+            )
+    except Exception as e:
+        await interaction.followup.send(f"❌ Erreur : {str(e)}", ephemeral=True)
+        return
+
+    if dry_run:
+        valid = sum(1 for row in rows if not row.error)
+        summary = f"🧪 Simulation : **{valid}/{len(rows)}** lignes valides."
+    else:
+        imported = sum(1 for row in rows if row.card)
+        summary = f"📦 **{imported}/{len(rows)}** cartes importées."
+    report = importer.format_report(rows)
+
+    if len(summary) + len(report) + 2 <= 2000:
+        await interaction.followup.send(f"{summary}\n\n{report}", ephemeral=True)
+    else:
+        # Rapport complet en pièce jointe quand il dépasse la limite d'un message
+        await interaction.followup.send(
+            summary,
+            file=discord.File(io.BytesIO(report.encode("utf-8")), filename="import.txt"),
+            ephemeral=True
+        )
+
+importcards.error(admin_error)
+
+
 @bot.tree.command(name="fixcardimage", description="Réparer l'image d'une carte existante")
 @app_commands.checks.has_permissions(administrator=True)
 @app_commands.describe(
@@ -929,27 +1033,28 @@ addcard.error(admin_error)
 async def fixcardimage(interaction: discord.Interaction, card_name: str, new_image: discord.Attachment):
     await interaction.response.defer(ephemeral=True)
 
+    card = catalog.find(card_name)
+    if not card:
+        await interaction.followup.send(f"❌ Carte **{card_name}** introuvable", ephemeral=True)
+        return
+
     try:
-        image_data = await new_image.read()
-        ext = new_image.filename.split('.')[-1]
-        filename = f"{card_name}.{ext}"
+        try:
+            image = await ingestor.attachment(new_image)
+        except IngestError as e:
+            await interaction.followup.send(f"❌ Image refusée : {e}", ephemeral=True)
+            return
 
-        github_url = await upload_image_to_github(image_data, filename)
+        github_url = await uploader.upload(image.data, f"{card_name}.{image.ext}", image.encoded)
         if not github_url:
             await interaction.followup.send("❌ Échec de l'upload sur GitHub.", ephemeral=True)
             return
 
-        async with aiosqlite.connect("db.sqlite") as db:
-            await db.execute(
-                "UPDATE cards SET image_url = ? WHERE LOWER(name) = LOWER(?)",
-                (github_url, card_name)
-            )
-            await db.commit()
+        image_hash, thumb_url = await publish_thumbnail(image.data)
 
-            global cards_cache
-            async with db.execute("SELECT id, name, rarity, image_url, power, protection FROM cards") as cursor:
-                rows = await cursor.fetchall()
-            cards_cache = [{"id": r[0], "name": r[1], "rarity": r[2], "image_url": r[3], "power": r[4], "protection": r[5]} for r in rows]
+        async with store.write() as db:
+            await db.execute(SET_IMAGE_QUERY, (github_url, image_hash, thumb_url, card.id))
+        catalog.update(card.with_image(github_url, thumb_url))
 
         await interaction.followup.send(f"✅ Image mise à jour pour **{card_name}**\n🔗 {github_url}", ephemeral=True)
 
@@ -960,85 +1065,135 @@ fixcardimage.error(admin_error)
 
 @fixcardimage.autocomplete('card_name')
 async def fixcardimage_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute("SELECT name, rarity FROM cards ORDER BY name ASC") as cursor:
-            rows = await cursor.fetchall()
-    matches = [(n, r) for n, r in rows if current.lower() in n.lower()]
-    return [app_commands.Choice(name=f"{n} ({r})", value=n) for n, r in matches[:25]]
+    return [app_commands.Choice(name=f"{card.name} ({card.rarity})", value=card.name) for card in card_search.search(current)]
 
 
-@bot.tree.command(name="refreshallimages", description="Rafraîchir toutes les URLs d'images de cartes (fix Discord cache)")
+@bot.tree.command(name="refreshallimages", description="Vérifier les URLs d'images et les rafraîchir (fix Discord cache)")
 @app_commands.checks.has_permissions(administrator=True)
-async def refreshallimages(interaction: discord.Interaction):
+@app_commands.describe(
+    dry_run="Vérifier seulement, sans modifier les URLs",
+    slow="Temps de réponse (en secondes) au-delà duquel une URL est signalée comme lente"
+)
+async def refreshallimages(interaction: discord.Interaction, dry_run: bool = False, slow: float = 2.0):
     await interaction.response.defer(ephemeral=True)
-    
+
+    cards = [card for card in catalog if card.image_url]
+    if not cards:
+        await interaction.followup.send("❌ Aucune carte avec image trouvée.", ephemeral=True)
+        return
+
+    total = sum(1 for card in cards for url in (card.image_url, card.thumb_url) if url)
+    progress_message = await interaction.followup.send(f"🔎 Vérification des images : 0/{total}", ephemeral=True, wait=True)
+    last_edit = time.monotonic()
+
+    async def progress(done: int, total: int):
+        nonlocal last_edit
+        # Une modification toutes les 2 s au plus pour rester sous la limite de Discord
+        if done < total and time.monotonic() - last_edit >= 2:
+            last_edit = time.monotonic()
+            await progress_message.edit(content=f"🔎 Vérification des images : {done}/{total}")
+
     try:
-        async with aiosqlite.connect("db.sqlite") as db:
-            async with db.execute("SELECT id, name, image_url FROM cards WHERE image_url != ''") as cursor:
-                cards = await cursor.fetchall()
-        
-        if not cards:
-            await interaction.followup.send("❌ Aucune carte avec image trouvée.", ephemeral=True)
-            return
-        
-        updated = 0
-        failed = []
-        
-        for card_id, name, old_url in cards:
-            if not old_url or "raw.githubusercontent.com" not in old_url:
-                continue
-            
-            import re
-            match = re.search(r'github\.com/[^/]+/[^/]+/[^/]+/(.+)$', old_url)
-            if match:
-                file_path = match.group(1)
-                new_url = f"https://raw.githubusercontent.com/{GITHUB_REPO}/{GITHUB_BRANCH}/{file_path}?v={int(datetime.now(timezone.utc).timestamp())}"
-                
-                async with aiosqlite.connect("db.sqlite") as db:
-                    await db.execute("UPDATE cards SET image_url = ? WHERE id = ?", (new_url, card_id))
-                    await db.commit()
-                
-                updated += 1
-            else:
-                failed.append(name)
-        
-        async with aiosqlite.connect("db.sqlite") as db:
-            async with db.execute("SELECT id, name, rarity, image_url, power, protection FROM cards") as cursor:
-                rows = await cursor.fetchall()
-        global cards_cache
-        cards_cache = [{"id": r[0], "name": r[1], "rarity": r[2], "image_url": r[3], "power": r[4], "protection": r[5]} for r in rows]
-        
-        result_msg = f"✅ **{updated}** URLs d'images rafraîchies avec succès!"
-        if failed:
-            result_msg += f"\n⚠️ Impossible de rafraîchir: {', '.join(failed)}"
-        
-        await interaction.followup.send(result_msg, ephemeral=True)
-        
+        results = await image_audit.audit(cards, progress=progress)
+        images_checked = [result for result in results if not result.thumb]
+        thumbs_checked = [result for result in results if result.thumb]
+        broken = [result for result in images_checked if not result.ok]
+        broken_thumbs = [result for result in thumbs_checked if not result.ok]
+        slow_urls = [result for result in results if result.ok and result.elapsed >= slow]
+
+        # L'image et la miniature d'une carte sont réécrites ensemble : l'embed affiche la miniature
+        stamp = int(datetime.now(timezone.utc).timestamp())
+        refreshed = {}
+        for result in results:
+            new_url = image_audit.refreshed_url(result.url, GITHUB_REPO, GITHUB_BRANCH, stamp) if result.ok else None
+            if new_url:
+                refreshed[result.card_id, result.thumb] = new_url
+        rewrites = []
+        for card in cards:
+            if (card.id, False) in refreshed or (card.id, True) in refreshed:
+                rewrites.append(card.with_image(refreshed.get((card.id, False), card.image_url),
+                                                refreshed.get((card.id, True), card.thumb_url)))
+
+        if rewrites and not dry_run:
+            async with store.write() as db:
+                await db.executemany(SET_IMAGE_URLS_QUERY, [(card.image_url, card.thumb_url, card.id) for card in rewrites])
+            for card in rewrites:
+                if catalog.get(card.id) is not None:
+                    catalog.update(card)
+
+        lines = [
+            f"{'🧪 Simulation : ' if dry_run else ''}✅ **{len(images_checked) - len(broken)}/{len(images_checked)}** images et "
+            f"**{len(thumbs_checked) - len(broken_thumbs)}/{len(thumbs_checked)}** miniatures accessibles, "
+            f"**{len(refreshed)}** URLs {'à rafraîchir' if dry_run else 'rafraîchies'}."
+        ]
+        if broken:
+            lines.append("❌ Cassées : " + ", ".join(f"{result.name} ({result.status or result.error})" for result in broken))
+        if broken_thumbs:
+            lines.append("❌ Miniatures cassées : " + ", ".join(f"{result.name} ({result.status or result.error})" for result in broken_thumbs))
+        if slow_urls:
+            lines.append("🐢 Lentes : " + ", ".join(
+                f"{result.name}{' (miniature)' if result.thumb else ''} ({result.elapsed:.1f} s)" for result in slow_urls
+            ))
+        await progress_message.edit(content="\n".join(lines)[:2000])
     except Exception as e:
-        await interaction.followup.send(f"❌ Erreur: {str(e)}", ephemeral=True)
+        await progress_message.edit(content=f"❌ Erreur : {str(e)}")
 
 refreshallimages.error(admin_error)
 
 
+@bot.tree.command(name="backfillthumbs", description="Générer les miniatures des cartes qui n'en ont pas")
+@app_commands.checks.has_permissions(administrator=True)
+async def backfillthumbs(interaction: discord.Interaction):
+    await interaction.response.defer(ephemeral=True)
+
+    cards = [card for card in catalog if card.image_url and not card.thumb_url]
+    if not cards:
+        await interaction.followup.send("✅ Toutes les cartes ont déjà une miniature.", ephemeral=True)
+        return
+
+    limit = asyncio.Semaphore(images.workers)
+    failed = []
+
+    async def backfill(card: Card):
+        async with limit:
+            try:
+                image = await ingestor.fetch(card.image_url)
+                image_hash, thumb_url = await publish_thumbnail(image.data)
+                if not thumb_url:
+                    raise RuntimeError("miniature non générée")
+            except Exception as e:
+                failed.append(f"{card.name} ({e})")
+                return
+        async with store.write() as db:
+            await db.execute(SET_THUMB_QUERY, (image_hash, thumb_url, card.id))
+        current = catalog.get(card.id)
+        if current is not None:
+            catalog.update(current.with_image(current.image_url, thumb_url))
+
+    await asyncio.gather(*(backfill(card) for card in cards))
+
+    message = f"🖼️ **{len(cards) - len(failed)}/{len(cards)}** miniatures générées ({images.processed} traitées, {images.cached} depuis le cache)."
+    if failed:
+        message += f"\n⚠️ Échecs : {', '.join(failed)}"
+    await interaction.followup.send(message[:2000], ephemeral=True)
+
+backfillthumbs.error(admin_error)
+
+
 @bot.tree.command(name="delcard", description="Supprimer une carte de la base de données")
 @app_commands.checks.has_permissions(administrator=True)
 @app_commands.describe(name="Nom de la carte (utilise l'autocomplétion)")
 async def delcard(interaction: discord.Interaction, name: str):
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute("SELECT id, rarity FROM cards WHERE LOWER(name) = LOWER(?)", (name,)) as cursor:
-            card = await cursor.fetchone()
-        if not card:
-            await interaction.response.send_message(f"❌ Aucune carte trouvée avec le nom **{name}**", ephemeral=True)
-            return
-        card_id, rarity = card
-        await db.execute("DELETE FROM user_cards WHERE card_id = ?", (card_id,))
-        await db.execute("DELETE FROM cards WHERE id = ?", (card_id,))
-        await db.commit()
-
-        global cards_cache
-        async with db.execute("SELECT id, name, rarity, image_url, power, protection FROM cards") as cursor:
-            rows = await cursor.fetchall()
-        cards_cache = [{"id": r[0], "name": r[1], "rarity": r[2], "image_url": r[3], "power": r[4], "protection": r[5]} for r in rows]
+    card = catalog.find(name)
+    if not card:
+        await interaction.response.send_message(f"❌ Aucune carte trouvée avec le nom **{name}**", ephemeral=True)
+        return
+    card_id, rarity = card.id, card.rarity
+    holders = await writes.submit("delete_card", card_id)
+    inventories.drop_card(card_id)
+    for holder_id in holders:
+        leaderboards.record_cards(holder_id, -1)
+    catalog.remove(card_id)
 
     await interaction.response.send_message(f"🗑️ Carte supprimée : **{name}** ({rarity})")
 
@@ -1046,11 +1201,7 @@ delcard.error(admin_error)
 
 @delcard.autocomplete('name')
 async def delcard_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute("SELECT name, rarity FROM cards ORDER BY name ASC") as cursor:
-            rows = await cursor.fetchall()
-    matches = [(n, r) for n, r in rows if current.lower() in n.lower()]
-    return [app_commands.Choice(name=f"{n} ({r})", value=n) for n, r in matches[:25]]
+    return [app_commands.Choice(name=f"{card.name} ({card.rarity})", value=card.name) for card in card_search.search(current)]
 
 
 @bot.tree.command(name="givecard", description="Donner une carte à votre inventaire (admin)")
@@ -1058,60 +1209,104 @@ async def delcard_autocomplete(interaction: discord.Interaction, current: str) -
 @app_commands.describe(name="Nom de la carte (utilise l'autocomplétion)")
 async def givecard(interaction: discord.Interaction, name: str):
     user_id = interaction.user.id
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute("SELECT id, name, rarity FROM cards WHERE LOWER(name) = LOWER(?)", (name,)) as cursor:
-            card = await cursor.fetchone()
-        if not card:
-            await interaction.response.send_message(f"❌ Carte **{name}** introuvable", ephemeral=True)
-            return
-        card_id, actual_name, rarity = card
-        await db.execute("INSERT INTO user_cards (user_id, card_id, quantity) VALUES (?, ?, 1) ON CONFLICT(user_id, card_id) DO UPDATE SET quantity = quantity + 1", (user_id, card_id))
-        await db.commit()
+    card = catalog.find(name)
+    if not card:
+        await interaction.response.send_message(f"❌ Carte **{name}** introuvable", ephemeral=True)
+        return
+    card_id, actual_name, rarity = card.id, card.name, card.rarity
+    async with user_locks.hold(user_id):
+        new_card = await writes.submit("grant", user_id, card_id)
+        inventories.add(user_id, card_id, 1)
+        leaderboards.record_cards(user_id, int(new_card))
     await interaction.response.send_message(f"🎁 **{interaction.user.display_name}** a reçu **{actual_name}** ({rarity})")
 
 givecard.error(admin_error)
 
 @givecard.autocomplete('name')
 async def givecard_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
-    async with aiosqlite.connect("db.sqlite") as db:
-        async with db.execute("SELECT name, rarity FROM cards ORDER BY name ASC") as cursor:
-            rows = await cursor.fetchall()
-    matches = [(n, r) for n, r in rows if current.lower() in n.lower()]
-    return [app_commands.Choice(name=f"{n} ({r})", value=n) for n, r in matches[:25]]
+    return [app_commands.Choice(name=f"{card.name} ({card.rarity})", value=card.name) for card in card_search.search(current)]
 
 
-@bot.tree.command(name="backup", description="Créer une sauvegarde de la base de données")
+@bot.tree.command(name="compactduels", description="Regrouper les anciens duels détaillés dans l'historique par paire de joueurs")
 @app_commands.checks.has_permissions(administrator=True)
-async def backup(interaction: discord.Interaction):
+@app_commands.describe(days="Âge (en jours) à partir duquel un duel est compacté (par défaut : 90)")
+async def compactduels(interaction: discord.Interaction, days: int = 90):
+    if days < 1:
+        await interaction.response.send_message("❌ Le nombre de jours doit être positif", ephemeral=True)
+        return
     await interaction.response.defer(ephemeral=True)
+    before = int(datetime.now(timezone.utc).timestamp()) - days * 86400
+    async with store.write() as db:
+        events, pairs = await duels.compact(db, before)
+    await interaction.followup.send(f"🗜️ **{events}** duels de plus de {days} jours regroupés dans **{pairs}** paires de joueurs.", ephemeral=True)
+
+compactduels.error(admin_error)
 
-    import shutil
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    backup_filename = f"backup_db_{timestamp}.sqlite"
-    backup_path = f"/tmp/{backup_filename}"
+
+@bot.tree.command(name="syncstats", description="Vérifier les statistiques des profils et les reconstruire si besoin")
+@app_commands.checks.has_permissions(administrator=True)
+@app_commands.describe(rebuild="Reconstruire la table si des écarts sont trouvés (par défaut : non)")
+async def syncstats(interaction: discord.Interaction, rebuild: bool = False):
+    await interaction.response.defer(ephemeral=True)
+
+    async with store.read() as db:
+        drift = await stats.verify(db)
+    lines = [f"• <@{user_id}> {column} : {stored} au lieu de {expected}" for user_id, column, stored, expected in drift[:10]]
+    if len(drift) > 10:
+        lines.append(f"… et {len(drift) - 10} autres écarts")
+
+    if not drift:
+        message = "✅ Les statistiques des profils sont à jour."
+    elif rebuild:
+        async with store.write() as db:
+            count = await stats.rebuild(db)
+            await leaderboards.load(db)
+        message = f"🔧 **{len(drift)}** écarts corrigés, statistiques reconstruites pour **{count}** joueurs.\n" + "\n".join(lines)
+    else:
+        message = f"⚠️ **{len(drift)}** écarts trouvés (relance avec `rebuild` pour corriger).\n" + "\n".join(lines)
+    await interaction.followup.send(message[:2000], ephemeral=True)
+
+syncstats.error(admin_error)
+
+
+@bot.tree.command(name="backup", description="Créer une sauvegarde de la base de données")
+@app_commands.checks.has_permissions(administrator=True)
+@app_commands.describe(attach="Joindre l'archive au message (par défaut : oui)")
+async def backup(interaction: discord.Interaction, attach: bool = True):
+    await interaction.response.defer(ephemeral=True)
 
     try:
-        shutil.copy2("db.sqlite", backup_path)
-        file = discord.File(backup_path, filename=backup_filename)
+        result = await run_backup(store.path, BACKUP_DIR, BACKUP_KEEP)
 
-        async with aiosqlite.connect("db.sqlite") as db:
-            async with db.execute("SELECT COUNT(*) FROM cards") as cursor:
-                card_count = (await cursor.fetchone())[0]
+        card_count = len(catalog)
+        async with store.read() as db:
             async with db.execute("SELECT COUNT(*) FROM users") as cursor:
                 user_count = (await cursor.fetchone())[0]
             async with db.execute("SELECT COUNT(*) FROM duel_history") as cursor:
                 duel_count = (await cursor.fetchone())[0]
-
-        embed = discord.Embed(title="💾 Sauvegarde de la base de données", description=f"Sauvegarde créée avec succès !\n**Fichier :** {backup_filename}", color=0x2ecc71, timestamp=datetime.now(timezone.utc))
-        embed.add_field(name="📊 Statistiques", value=f"**Cartes :** {card_count}\n**Utilisateurs :** {user_count}\n**Historique de duels :** {duel_count}", inline=False)
+            async with db.execute("SELECT COUNT(*) FROM duel_events") as cursor:
+                event_count = (await cursor.fetchone())[0]
+
+        embed = discord.Embed(title="💾 Sauvegarde de la base de données", description=f"Sauvegarde créée avec succès !\n**Fichier :** {result.filename}", color=0x2ecc71, timestamp=datetime.now(timezone.utc))
+        embed.add_field(name="📊 Statistiques", value=f"**Cartes :** {card_count}\n**Utilisateurs :** {user_count}\n**Historique de duels :** {duel_count} paires • {event_count} duels détaillés", inline=False)
+        embed.add_field(name="⏱️ Durée", value=f"{result.duration:.2f} s", inline=True)
+        embed.add_field(name="📦 Taille", value=f"{format_size(result.size)} (base : {format_size(result.raw_size)})", inline=True)
+        embed.add_field(name="🗄️ Rotation", value=f"{BACKUP_KEEP} sauvegardes conservées dans `{BACKUP_DIR}/`", inline=False)
         embed.set_footer(text=f"Sauvegarde créée par {interaction.user.display_name}")
 
-        await interaction.followup.send(embed=embed, file=file, ephemeral=True)
-        os.remove(backup_path)
+        filesize_limit = interaction.guild.filesize_limit if interaction.guild else 10 * 1024 * 1024
+        if attach and result.size <= filesize_limit:
+            await interaction.followup.send(embed=embed, file=discord.File(result.path, filename=result.filename), ephemeral=True)
+        else:
+            if attach:
+                embed.add_field(name="⚠️ Pièce jointe", value="Archive trop volumineuse pour Discord, conservée localement uniquement", inline=False)
+            await interaction.followup.send(embed=embed, ephemeral=True)
 
     except Exception as e:
         await interaction.followup.send(f"❌ Erreur lors de la création de la sauvegarde : {str(e)}", ephemeral=True)
 
 backup.error(admin_error)
 
-bot.run(TOKEN)
\ No newline at end of file
+# Les workers des miniatures (spawn) réimportent ce fichier : le bot ne doit démarrer qu'ici
+if __name__ == "__main__":
+    bot.run(TOKEN)
\ No newline at end of file
@@ -0,0 +1,136 @@
+from bisect import bisect_left, insort
+from dataclasses import dataclass, replace
+
+from schema import card_key
+
+RARITY_ORDER = ["???", "LR", "UR", "SSR", "SR", "R", "C"]
+RARITY_RANK = {rarity: rank for rank, rarity in enumerate(RARITY_ORDER)}
+
+
+SET_IMAGE_QUERY = "UPDATE cards SET image_url = ?, image_hash = ?, thumb_url = ? WHERE id = ?"
+SET_IMAGE_URLS_QUERY = "UPDATE cards SET image_url = ?, thumb_url = ? WHERE id = ?"
+SET_THUMB_QUERY = "UPDATE cards SET image_hash = ?, thumb_url = ? WHERE id = ?"
+
+
+def rarity_rank(rarity: str) -> int:
+    return RARITY_RANK.get(rarity, len(RARITY_ORDER))
+
+
+@dataclass(frozen=True, slots=True)
+class Card:
+    id: int
+    name: str
+    key: str
+    rarity: str
+    image_url: str
+    power: int
+    protection: int
+    thumb_url: str = ""
+
+    @property
+    def sort_key(self):
+        return rarity_rank(self.rarity), self.key, self.id
+
+    @property
+    def display_url(self) -> str:
+        """Thumbnail when one was generated, full image otherwise."""
+        return self.thumb_url or self.image_url
+
+    def with_image(self, image_url: str, thumb_url: str | None = None) -> "Card":
+        return replace(self, image_url=image_url, thumb_url=self.thumb_url if thumb_url is None else thumb_url)
+
+
+class CardCatalog:
+    """
+    In-memory card catalog indexed by id, by normalized name and by rarity.
+    Loaded once, then kept in sync with add/update/remove; every change bumps
+    `version` and is forwarded to the subscribed indexes (loot engine, search...).
+    """
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_key = {}
+        self.by_rarity = {rarity: [] for rarity in RARITY_ORDER}
+        self.version = 0
+        self._listeners = []
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        """Cards in display order: rarest first, then by name."""
+        for rarity in sorted(self.by_rarity, key=rarity_rank):
+            yield from self.by_rarity[rarity]
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+        for card in self.by_id.values():
+            listener.add(card)
+
+    def get(self, card_id: int) -> Card | None:
+        return self.by_id.get(card_id)
+
+    def find(self, name: str) -> Card | None:
+        return self.by_key.get(card_key(name))
+
+    async def load(self, db):
+        async with db.execute("SELECT id, name, name_key, rarity, image_url, power, protection, thumb_url FROM cards") as cursor:
+            rows = await cursor.fetchall()
+        for card_id in list(self.by_id):
+            self.remove(card_id)
+        for card_id, name, key, rarity, image_url, power, protection, thumb_url in rows:
+            self.add(Card(card_id, name, key or card_key(name), rarity, image_url or "", power, protection, thumb_url or ""))
+
+    def _index(self, card: Card):
+        self.by_id[card.id] = card
+        self.by_key[card.key] = card
+        insort(self.by_rarity.setdefault(card.rarity, []), card, key=lambda c: c.sort_key)
+
+    def _unindex(self, card: Card):
+        del self.by_id[card.id]
+        if self.by_key.get(card.key) is card:
+            del self.by_key[card.key]
+        cards = self.by_rarity[card.rarity]
+        del cards[bisect_left(cards, card.sort_key, key=lambda c: c.sort_key)]
+
+    def add(self, card: Card):
+        if card.id in self.by_id:
+            self.update(card)
+            return
+        self._index(card)
+        self.version += 1
+        for listener in self._listeners:
+            listener.add(card)
+
+    def add_many(self, cards: list[Card]):
+        """Adds a batch of new cards with a single version bump."""
+        cards = [card for card in cards if card.id not in self.by_id]
+        if not cards:
+            return
+        for card in cards:
+            self._index(card)
+        self.version += 1
+        for listener in self._listeners:
+            for card in cards:
+                listener.add(card)
+
+    def update(self, card: Card):
+        old = self.by_id.get(card.id)
+        if old is None:
+            self.add(card)
+            return
+        self._unindex(old)
+        self._index(card)
+        self.version += 1
+        for listener in self._listeners:
+            listener.update(card)
+
+    def remove(self, card_id: int) -> Card | None:
+        card = self.by_id.get(card_id)
+        if card is None:
+            return None
+        self._unindex(card)
+        self.version += 1
+        for listener in self._listeners:
+            listener.remove(card_id)
+        return card
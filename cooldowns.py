@@ -0,0 +1,40 @@
+from datetime import datetime
+
+
+class CooldownLedger:
+    """
+    Process-wide loot cooldowns keyed by user id, as epoch timestamps.
+    Entries are loaded lazily from the users table and written through
+    by /loot and /refresh, so rejected loots never reach the database.
+    """
+
+    def __init__(self, hours: float):
+        self.seconds = hours * 3600
+        self._last_loot = {}
+
+    async def _load(self, store, user_id: int) -> float:
+        async with store.read() as db:
+            async with db.execute("SELECT last_loot FROM users WHERE user_id = ?", (user_id,)) as cursor:
+                row = await cursor.fetchone()
+        last_loot = datetime.fromisoformat(row[0]).timestamp() if row and row[0] else 0.0
+        return self._last_loot.setdefault(user_id, last_loot)
+
+    async def claim(self, store, user_id: int, now: float) -> float:
+        """
+        Returns the remaining cooldown in seconds, or 0 if the loot is allowed.
+        An allowed loot is recorded immediately so concurrent calls are rejected.
+        """
+        last_loot = self._last_loot.get(user_id)
+        if last_loot is None:
+            last_loot = await self._load(store, user_id)
+        remaining = last_loot + self.seconds - now
+        if remaining > 0:
+            return remaining
+        self._last_loot[user_id] = now
+        return 0
+
+    def set(self, user_id: int, timestamp: float):
+        self._last_loot[user_id] = timestamp
+
+    def forget(self, user_id: int):
+        self._last_loot.pop(user_id, None)
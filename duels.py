@@ -0,0 +1,331 @@
+import random
+
+COLUMNS = "player1_id, player2_id, card1_id, card2_id, rounds, winner, at"
+
+# Index couvrants : l'historique d'un joueur et le bilan d'une carte se lisent sans toucher la table
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_duel_events_player1 ON duel_events(player1_id, at, player2_id, winner, card1_id, card2_id, rounds)",
+    "CREATE INDEX IF NOT EXISTS idx_duel_events_player2 ON duel_events(player2_id, at, player1_id, winner, card1_id, card2_id, rounds)",
+    "CREATE INDEX IF NOT EXISTS idx_duel_events_card1 ON duel_events(card1_id, winner)",
+    "CREATE INDEX IF NOT EXISTS idx_duel_events_card2 ON duel_events(card2_id, winner)",
+    "CREATE INDEX IF NOT EXISTS idx_duel_events_at ON duel_events(at)",
+)
+
+# Bits de `rounds` : 2 bits par manche (0 égalité, 1 ou 2 pour le joueur gagnant),
+# puis un bit par tirage au sort (égalité au total, égalité au score final)
+ROUND_BITS = 2
+TOTAL_COIN = 1 << 6
+OVERALL_COIN = 1 << 7
+
+
+def pack_rounds(winners: list[int], total_coin: bool, overall_coin: bool) -> int:
+    packed = 0
+    for i, winner in enumerate(winners):
+        packed |= winner << (ROUND_BITS * i)
+    return packed | (TOTAL_COIN if total_coin else 0) | (OVERALL_COIN if overall_coin else 0)
+
+
+def unpack_rounds(packed: int) -> tuple[list[int], bool, bool]:
+    winners = [(packed >> (ROUND_BITS * i)) & 0b11 for i in range(3)]
+    return winners, bool(packed & TOTAL_COIN), bool(packed & OVERALL_COIN)
+
+
+def calculate_duel_winner(card1, card2):
+    rounds = []
+    card1_wins = 0
+    card2_wins = 0
+    
+    if card1.power > card2.power:
+        rounds.append({'round': 1, 'type': 'Power', 'winner': 1, 'card1_stat': card1.power, 'card2_stat': card2.power})
+        card1_wins += 1
+    elif card2.power > card1.power:
+        rounds.append({'round': 1, 'type': 'Power', 'winner': 2, 'card1_stat': card1.power, 'card2_stat': card2.power})
+        card2_wins += 1
+    else:
+        rounds.append({'round': 1, 'type': 'Power', 'winner': 0, 'card1_stat': card1.power, 'card2_stat': card2.power})
+    
+    if card1.protection > card2.protection:
+        rounds.append({'round': 2, 'type': 'Protection', 'winner': 1, 'card1_stat': card1.protection, 'card2_stat': card2.protection})
+        card1_wins += 1
+    elif card2.protection > card1.protection:
+        rounds.append({'round': 2, 'type': 'Protection', 'winner': 2, 'card1_stat': card1.protection, 'card2_stat': card2.protection})
+        card2_wins += 1
+    else:
+        rounds.append({'round': 2, 'type': 'Protection', 'winner': 0, 'card1_stat': card1.protection, 'card2_stat': card2.protection})
+    
+    total1 = card1.power + card1.protection
+    total2 = card2.power + card2.protection
+    
+    if total1 > total2:
+        rounds.append({'round': 3, 'type': 'Total', 'winner': 1, 'card1_stat': total1, 'card2_stat': total2})
+        card1_wins += 1
+    elif total2 > total1:
+        rounds.append({'round': 3, 'type': 'Total', 'winner': 2, 'card1_stat': total1, 'card2_stat': total2})
+        card2_wins += 1
+    else:
+        tiebreaker = random.choice([1, 2])
+        rounds.append({'round': 3, 'type': 'Total (Égalité - Tirage au sort)', 'winner': tiebreaker, 'card1_stat': total1, 'card2_stat': total2})
+        if tiebreaker == 1:
+            card1_wins += 1
+        else:
+            card2_wins += 1
+    
+    if card1_wins > card2_wins:
+        overall_winner = 1
+    elif card2_wins > card1_wins:
+        overall_winner = 2
+    else:
+        overall_winner = random.choice([1, 2])
+    
+    return overall_winner, rounds, card1_wins, card2_wins
+
+
+def pack_result(rounds: list[dict], card1_wins: int, card2_wins: int) -> int:
+    """Packs the rounds returned by calculate_duel_winner."""
+    return pack_rounds(
+        [round_info['winner'] for round_info in rounds],
+        total_coin=rounds[2]['card1_stat'] == rounds[2]['card2_stat'],
+        overall_coin=card1_wins == card2_wins,
+    )
+
+
+async def create_table(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS duel_events (
+            id INTEGER PRIMARY KEY,
+            player1_id INT NOT NULL,
+            player2_id INT NOT NULL,
+            card1_id INT NOT NULL,
+            card2_id INT NOT NULL,
+            rounds INT NOT NULL,
+            winner INT NOT NULL,
+            at INT NOT NULL
+        )
+    """)
+    for index in INDEXES:
+        await db.execute(index)
+
+
+async def record(db, events: list[tuple]):
+    """Appends duels given as (player1, player2, card1, card2, rounds, winner, at); player1 is the challenger."""
+    await db.executemany(f"INSERT INTO duel_events ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", events)
+
+
+# Duels d'un joueur vus de son côté : (adversaire, victoire, sa carte, carte adverse, manches, date)
+PLAYER_EVENTS = """
+    SELECT player2_id AS opponent_id, winner = 1 AS won, card1_id AS own_card, card2_id AS other_card, rounds, at, 1 AS side
+    FROM duel_events WHERE player1_id = :user
+    UNION ALL
+    SELECT player1_id, winner = 2, card2_id, card1_id, rounds, at, 2
+    FROM duel_events WHERE player2_id = :user
+"""
+
+PAIR_TOTALS_QUERY = "SELECT player1_wins, player2_wins FROM duel_history WHERE player1_id = ? AND player2_id = ?"
+PAIR_EVENTS_QUERY = f"SELECT COALESCE(SUM(won), 0), COUNT(*) FROM ({PLAYER_EVENTS}) WHERE opponent_id = :other"
+
+OPPONENTS_QUERY = f"""
+    SELECT opponent_id, SUM(wins), SUM(losses), SUM(total) FROM (
+        SELECT player2_id AS opponent_id, player1_wins AS wins, player2_wins AS losses, total_duels AS total
+        FROM duel_history WHERE player1_id = :user
+        UNION ALL
+        SELECT player1_id, player2_wins, player1_wins, total_duels FROM duel_history WHERE player2_id = :user
+        UNION ALL
+        SELECT opponent_id, won, 1 - won, 1 FROM ({PLAYER_EVENTS})
+    ) GROUP BY opponent_id
+"""
+
+HISTORY_QUERY = f"{PLAYER_EVENTS} ORDER BY at DESC LIMIT :limit"
+
+# Même vue, limitée aux duels joués avec :card (colonnes couvertes par les index des joueurs)
+CARD_HISTORY_QUERY = """
+    SELECT player2_id AS opponent_id, winner = 1 AS won, card1_id AS own_card, card2_id AS other_card, rounds, at, 1 AS side
+    FROM duel_events WHERE player1_id = :user AND card1_id = :card
+    UNION ALL
+    SELECT player1_id, winner = 2, card2_id, card1_id, rounds, at, 2
+    FROM duel_events WHERE player2_id = :user AND card2_id = :card
+    ORDER BY at DESC LIMIT :limit
+"""
+
+CARD_RECORD_QUERY = """
+    SELECT COALESCE(SUM(won), 0), COUNT(*) FROM (
+        SELECT winner = 1 AS won FROM duel_events WHERE card1_id = :card
+        UNION ALL
+        SELECT winner = 2 FROM duel_events WHERE card2_id = :card
+    )
+"""
+
+# Duels d'un joueur depuis :since, éventuellement avec une seule de ses cartes
+PLAYER_RECENT_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM duel_events
+         WHERE player1_id = :user AND at >= :since AND (:card IS NULL OR card1_id = :card))
+      + (SELECT COUNT(*) FROM duel_events
+         WHERE player2_id = :user AND at >= :since AND (:card IS NULL OR card2_id = :card))
+"""
+
+
+async def head_to_head(db, user_id: int, opponent_id: int) -> tuple[int, int, int]:
+    """(wins of user_id, wins of opponent_id, total) between two players, compacted duels included."""
+    low, high = min(user_id, opponent_id), max(user_id, opponent_id)
+    async with db.execute(PAIR_TOTALS_QUERY, (low, high)) as cursor:
+        row = await cursor.fetchone()
+    low_wins, high_wins = row if row else (0, 0)
+    async with db.execute(PAIR_EVENTS_QUERY, {"user": low, "other": high}) as cursor:
+        won, total = await cursor.fetchone()
+    low_wins, high_wins = low_wins + won, high_wins + total - won
+    wins = (low_wins, high_wins) if user_id == low else (high_wins, low_wins)
+    return wins[0], wins[1], low_wins + high_wins
+
+
+async def opponents(db, user_id: int) -> list[tuple[int, int, int, int]]:
+    """(opponent, wins, losses, total) for every opponent of user_id, compacted duels included."""
+    async with db.execute(OPPONENTS_QUERY, {"user": user_id}) as cursor:
+        return await cursor.fetchall()
+
+
+async def player_totals(db) -> list[tuple[int, int, int]]:
+    """(user, wins, total) for every player who ever dueled."""
+    async with db.execute("""
+        SELECT user_id, SUM(wins), SUM(total) FROM (
+            SELECT player1_id AS user_id, player1_wins AS wins, total_duels AS total FROM duel_history
+            UNION ALL
+            SELECT player2_id, player2_wins, total_duels FROM duel_history
+            UNION ALL
+            SELECT player1_id, winner = 1, 1 FROM duel_events
+            UNION ALL
+            SELECT player2_id, winner = 2, 1 FROM duel_events
+        ) GROUP BY user_id
+    """) as cursor:
+        return await cursor.fetchall()
+
+
+async def history(db, user_id: int, limit: int = 500, card_id: int | None = None) -> list[tuple]:
+    """
+    Latest duels of a player, most recent first, from their side (see PLAYER_EVENTS);
+    only those they played with card_id when it is given.
+    """
+    if card_id is None:
+        query, params = HISTORY_QUERY, {"user": user_id, "limit": limit}
+    else:
+        query, params = CARD_HISTORY_QUERY, {"user": user_id, "card": card_id, "limit": limit}
+    async with db.execute(query, params) as cursor:
+        return await cursor.fetchall()
+
+
+async def card_record(db, card_id: int) -> tuple[int, int]:
+    """(wins, duels) of a card over the events not compacted yet."""
+    async with db.execute(CARD_RECORD_QUERY, {"card": card_id}) as cursor:
+        return await cursor.fetchone()
+
+
+async def count_since(db, user_id: int, since: int, card_id: int | None = None) -> int:
+    """Duels of a player since `since` (not compacted yet), optionally only those played with card_id."""
+    async with db.execute(PLAYER_RECENT_QUERY, {"user": user_id, "since": since, "card": card_id}) as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def compact(db, before: int) -> tuple[int, int]:
+    """
+    Rolls the events older than `before` into the per-pair totals of
+    duel_history, then deletes them. Returns (events compacted, pairs updated).
+    Must run in a single transaction so no duel is counted twice or lost.
+    """
+    cursor = await db.execute("""
+        INSERT INTO duel_history (player1_id, player2_id, player1_wins, player2_wins, total_duels, last_duel)
+        SELECT low, high, SUM(low_won), COUNT(*) - SUM(low_won), COUNT(*),
+               strftime('%Y-%m-%dT%H:%M:%S+00:00', MAX(at), 'unixepoch')
+        FROM (
+            SELECT MIN(player1_id, player2_id) AS low, MAX(player1_id, player2_id) AS high,
+                   (winner = 1) = (player1_id < player2_id) AS low_won, at
+            FROM duel_events WHERE at < ?
+        )
+        GROUP BY low, high
+        ON CONFLICT(player1_id, player2_id) DO UPDATE SET
+            player1_wins = player1_wins + excluded.player1_wins,
+            player2_wins = player2_wins + excluded.player2_wins,
+            total_duels = total_duels + excluded.total_duels,
+            last_duel = MAX(COALESCE(last_duel, ''), excluded.last_duel)
+    """, (before,))
+    pairs = cursor.rowcount
+    cursor = await db.execute("DELETE FROM duel_events WHERE at < ?", (before,))
+    return cursor.rowcount, pairs
+
+
+async def _compact_cli(path: str, days: int) -> int:
+    import time
+
+    import aiosqlite
+
+    async with aiosqlite.connect(path) as db:
+        events, pairs = await compact(db, int(time.time()) - days * 86400)
+        await db.commit()
+    print(f"✅ {events} duels de plus de {days} jours compactés dans {pairs} paires")
+    return 0
+
+
+async def _bench_cli(count: int) -> int:
+    """Batched inserts, indexed reads and a compaction on a synthetic in-memory log."""
+    import random
+    import time
+
+    import aiosqlite
+
+    rng = random.Random(7)
+    now = int(time.time())
+    events = [
+        (rng.randrange(500), rng.randrange(500, 1000), rng.randrange(300), rng.randrange(300),
+         pack_rounds([rng.randrange(3), rng.randrange(3), rng.randrange(1, 3)], False, False), rng.randrange(1, 3),
+         now - rng.randrange(365 * 86400))
+        for _ in range(count)
+    ]
+    async with aiosqlite.connect(":memory:") as db:
+        await db.execute("""
+            CREATE TABLE duel_history (
+                player1_id INT, player2_id INT, player1_wins INT DEFAULT 0, player2_wins INT DEFAULT 0,
+                total_duels INT DEFAULT 0, last_duel TEXT, PRIMARY KEY (player1_id, player2_id)
+            )
+        """)
+        await create_table(db)
+        start = time.perf_counter()
+        for i in range(0, len(events), 256):
+            await record(db, events[i:i + 256])
+        await db.commit()
+        insert = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for user_id in range(100):
+            await history(db, user_id, 20)
+        last = (time.perf_counter() - start) * 10
+        start = time.perf_counter()
+        for card_id in range(100):
+            await card_record(db, card_id)
+        cards = (time.perf_counter() - start) * 10
+
+        before = sorted(await player_totals(db))
+        start = time.perf_counter()
+        compacted, pairs = await compact(db, now - 90 * 86400)
+        await db.commit()
+        compaction = time.perf_counter() - start
+        same = sorted(await player_totals(db)) == before
+
+    print(f"{count:,} duels insérés par lots de 256 en {insert:.2f} s ({count / insert:,.0f}/s)")
+    print(f"20 derniers duels d'un joueur : {last:.2f} ms • bilan d'une carte : {cards:.2f} ms")
+    print(f"Compaction : {compacted:,} duels de plus de 90 jours → {pairs:,} paires en {compaction:.2f} s")
+    print(f"{'✅' if same else '❌'} bilans des joueurs identiques après compaction")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    import sys
+
+    parser = argparse.ArgumentParser(description="Journal des duels (duel_events)")
+    parser.add_argument("command", choices=["compact", "bench"])
+    parser.add_argument("path", nargs="?", default="db.sqlite")
+    parser.add_argument("--days", type=int, default=90, help="Âge (en jours) à partir duquel un duel est compacté")
+    parser.add_argument("--count", type=int, default=200_000, help="Nombre de duels du banc d'essai (bench)")
+    args = parser.parse_args()
+    if args.command == "compact":
+        sys.exit(asyncio.run(_compact_cli(args.path, args.days)))
+    sys.exit(asyncio.run(_bench_cli(args.count)))
@@ -0,0 +1,242 @@
+import asyncio
+import base64
+import hashlib
+import random
+import time
+
+import aiohttp
+
+RETRY_STATUSES = {403, 429, 500, 502, 503, 504}
+
+
+def blob_sha(data: bytes) -> str:
+    """SHA-1 of a git blob, as reported by the contents API for an existing file."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class GitHubUploader:
+    """
+    Uploads card images to the repository through the contents API.
+    One shared session, a bounded number of uploads in flight, no PUT when the
+    file already holds the same bytes, and retries with backoff on 5xx and
+    rate limits. base_url can point at a local stand-in of the API.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        repo: str,
+        branch: str = "main",
+        folder: str = "cards",
+        base_url: str = "https://api.github.com",
+        raw_url: str = "https://raw.githubusercontent.com",
+        concurrency: int = 4,
+        retries: int = 4,
+        timeout: float = 30,
+        backoff: float = 1.0,
+    ):
+        self.token = token
+        self.repo = repo
+        self.branch = branch
+        self.folder = folder
+        self.base_url = base_url.rstrip("/")
+        self.raw_url = raw_url.rstrip("/")
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.uploads = 0
+        self.skipped = 0
+        self.retried = 0
+        self._concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session = None
+        self._known = {}  # path -> (blob sha, URL) des fichiers envoyés
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.token}",
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+        }
+
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self._concurrency * 2),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _delay(self, attempt: int, resp: aiohttp.ClientResponse | None) -> float:
+        if resp is not None:
+            retry_after = resp.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+            if resp.headers.get("X-RateLimit-Remaining") == "0" and resp.headers.get("X-RateLimit-Reset", "").isdigit():
+                return max(float(resp.headers["X-RateLimit-Reset"]) - time.time(), 0) + 1
+        return self.backoff * 2 ** attempt + random.uniform(0, self.backoff)
+
+    async def _request(self, method: str, url: str, **kwargs) -> tuple[int, dict | str]:
+        attempt = 0
+        while True:
+            resp = None
+            try:
+                async with self.session().request(method, url, **kwargs) as resp:
+                    if resp.status not in RETRY_STATUSES or attempt == self.retries:
+                        body = await resp.json() if resp.content_type == "application/json" else await resp.text()
+                        return resp.status, body
+                    # Un 403 sans limite atteinte est un vrai refus : inutile de réessayer
+                    if resp.status == 403 and "Retry-After" not in resp.headers and resp.headers.get("X-RateLimit-Remaining") != "0":
+                        return resp.status, await resp.text()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+            self.retried += 1
+            await asyncio.sleep(self._delay(attempt, resp))
+            attempt += 1
+
+    def raw(self, path: str) -> str:
+        return f"{self.raw_url}/{self.repo}/{self.branch}/{path}"
+
+    async def upload(self, data: bytes, filename: str, encoded: str | None = None) -> str | None:
+        """
+        Uploads `data` to <folder>/<filename>; returns the raw download URL,
+        or None on failure. Identical content is not uploaded again.
+        `encoded` is the base64 form of `data` when the caller already has it.
+        """
+        safe_name = filename.replace(" ", "_")
+        path = f"{self.folder}/{safe_name}"
+        api_url = f"{self.base_url}/repos/{self.repo}/contents/{path}"
+        local_sha = blob_sha(data)
+
+        # Contenu déjà envoyé par ce processus : pas même un GET
+        known = self._known.get(path)
+        if known and known[0] == local_sha:
+            self.skipped += 1
+            return known[1]
+
+        try:
+            async with self._semaphore:
+                status, existing = await self._request("GET", api_url, params={"ref": self.branch})
+                remote_sha = existing.get("sha") if status == 200 and isinstance(existing, dict) else None
+                if remote_sha == local_sha:
+                    self.skipped += 1
+                    self._known[path] = (local_sha, existing.get("download_url") or self.raw(path))
+                    return self._known[path][1]
+
+                payload = {
+                    "message": f"Add card image: {safe_name}",
+                    "content": encoded or base64.b64encode(data).decode("ascii"),
+                    "branch": self.branch,
+                }
+                if remote_sha:
+                    payload["sha"] = remote_sha
+                status, result = await self._request("PUT", api_url, json=payload)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Plus de tentatives possibles : même contrat qu'une réponse en erreur
+            print(f"[GitHub Upload Error] {type(e).__name__}: {e}")
+            return None
+
+        if status in (200, 201):
+            self.uploads += 1
+            download_url = result.get("content", {}).get("download_url") if isinstance(result, dict) else None
+            self._known[path] = (local_sha, download_url or self.raw(path))
+            return self._known[path][1]
+        print(f"[GitHub Upload Error] {status}: {result}")
+        return None
+
+
+def stand_in_app(failures: list[int] | None = None):
+    """
+    Minimal local stand-in for the contents API, for tests and the self-check.
+    `failures` is a list of statuses returned (once each) before serving requests.
+    """
+    from aiohttp import web
+
+    files = {}
+    failures = list(failures or [])
+    stats = {"get": 0, "put": 0}
+
+    async def contents(request: web.Request):
+        if failures:
+            status = failures.pop(0)
+            headers = {"Retry-After": "0"} if status in (403, 429) else {}
+            return web.json_response({"message": "stand-in failure"}, status=status, headers=headers)
+        path = request.match_info["path"]
+        if request.method == "GET":
+            stats["get"] += 1
+            if path not in files:
+                return web.json_response({"message": "Not Found"}, status=404)
+            return web.json_response({"sha": blob_sha(files[path]), "download_url": f"http://raw/{path}"})
+        stats["put"] += 1
+        body = await request.json()
+        if path in files and body.get("sha") != blob_sha(files[path]):
+            return web.json_response({"message": "sha mismatch"}, status=409)
+        created = path not in files
+        files[path] = base64.b64decode(body["content"])
+        return web.json_response({"content": {"download_url": f"http://raw/{path}"}}, status=201 if created else 200)
+
+    app = web.Application()
+    app.router.add_route("*", "/repos/{owner}/{repo}/contents/{path:.+}", contents)
+    app["files"] = files
+    app["stats"] = stats
+    return app
+
+
+async def _self_check() -> int:
+    from aiohttp import web
+
+    app = stand_in_app(failures=[502, 403])
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    uploader = GitHubUploader("token", "owner/repo", base_url=f"http://127.0.0.1:{port}", backoff=0.01)
+    try:
+        first = await uploader.upload(b"image-a", "carte.png")
+        again = await uploader.upload(b"image-a", "carte.png")
+        uploader._known.clear()
+        remote = await uploader.upload(b"image-a", "carte.png")
+        changed = await uploader.upload(b"image-b", "carte.png")
+        start = time.perf_counter()
+        many = await asyncio.gather(*(uploader.upload(bytes([i]) * 1024, f"lot {i}.png") for i in range(20)))
+        elapsed = time.perf_counter() - start
+    finally:
+        await uploader.close()
+        await runner.cleanup()
+
+    # Serveur arrêté : les reprises s'épuisent et upload renvoie None au lieu de lever
+    offline = GitHubUploader("token", "owner/repo", base_url=f"http://127.0.0.1:{port}", retries=1, backoff=0.01)
+    try:
+        unreachable = await offline.upload(b"image-c", "hors-ligne.png")
+    finally:
+        await offline.close()
+
+    checks = {
+        "URL renvoyée": first == "http://raw/cards/carte.png",
+        "contenu identique non renvoyé": again == first and remote == first and uploader.skipped == 2 and app["stats"]["put"] == 1 + 1 + 20,
+        "contenu modifié renvoyé": changed == first and app["files"]["cards/carte.png"] == b"image-b",
+        "502 et 403 réessayés": uploader.retried == 2,
+        "lot complet": all(many) and len(app["files"]) == 21,
+        "serveur injoignable : None": unreachable is None,
+    }
+    for label, ok in checks.items():
+        print(f"{'✅' if ok else '❌'} {label}")
+    print(f"{uploader.uploads} envois, {uploader.skipped} ignorés, {uploader.retried} reprises, "
+          f"{app['stats']['put']} PUT • lot de 20 en {elapsed * 1000:.0f} ms")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(asyncio.run(_self_check()))
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+# Affiché quand Discord ne répond pas : le compte existe peut-être encore
+UNAVAILABLE = "Joueur indisponible"
+
+
+class UserResolver:
+    """
+    Resolves user ids to display names for embeds.
+    Guild members come from the gateway cache, other names from a bounded
+    LRU with a TTL; only the remaining misses hit the REST API, concurrently
+    but bounded.
+    """
+
+    def __init__(self, bot, ttl: float = 3600, concurrency: int = 4, unknown_ttl: float = 300, capacity: int = 5000):
+        self.bot = bot
+        self.ttl = ttl
+        self.unknown_ttl = unknown_ttl
+        self.capacity = capacity
+        self.fetches = 0
+        self._names = OrderedDict()
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def _cached(self, user_id: int):
+        entry = self._names.get(user_id)
+        if entry is None:
+            return False, None
+        name, expires = entry
+        if expires < time.monotonic():
+            del self._names[user_id]
+            return False, None
+        self._names.move_to_end(user_id)
+        return True, name
+
+    def _remember(self, user_id: int, name: str | None):
+        ttl = self.ttl if name is not None else self.unknown_ttl
+        self._names[user_id] = (name, time.monotonic() + ttl)
+        self._names.move_to_end(user_id)
+        if len(self._names) > self.capacity:
+            self._names.popitem(last=False)
+
+    async def _fetch(self, user_id: int) -> str | None:
+        """None only for a deleted account (404); other errors give UNAVAILABLE, not cached."""
+        async with self._semaphore:
+            self.fetches += 1
+            try:
+                user = await self.bot.fetch_user(user_id)
+            except discord.NotFound:
+                name = None
+            except discord.HTTPException:
+                # Erreur passagère : on ne la garde pas en cache
+                return UNAVAILABLE
+            else:
+                name = user.display_name
+        self._remember(user_id, name)
+        return name
+
+    async def resolve(self, user_ids, guild: discord.Guild | None = None) -> dict[int, str | None]:
+        """Names by id, in the order given; None for deleted accounts, UNAVAILABLE when Discord failed."""
+        names = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            member = guild.get_member(user_id) if guild is not None else None
+            if member is not None:
+                names[user_id] = member.display_name
+                continue
+            found, name = self._cached(user_id)
+            if not found:
+                user = self.bot.get_user(user_id)
+                if user is not None:
+                    found, name = True, user.display_name
+                    self._remember(user_id, name)
+            if found:
+                names[user_id] = name
+            else:
+                names[user_id] = None
+                missing.append(user_id)
+
+        if missing:
+            fetched = await asyncio.gather(*(self._fetch(user_id) for user_id in missing))
+            names.update(zip(missing, fetched))
+        return names
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit, urlunsplit
+
+import aiohttp
+
+RAW_HOST = "raw.githubusercontent.com"
+
+
+@dataclass(frozen=True, slots=True)
+class UrlCheck:
+    card_id: int
+    name: str
+    url: str
+    status: int | None
+    elapsed: float
+    error: str = ""
+    thumb: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and 200 <= self.status < 400
+
+
+async def check_url(session: aiohttp.ClientSession, card_id: int, name: str, url: str, thumb: bool = False) -> UrlCheck:
+    start = time.perf_counter()
+    try:
+        async with session.head(url, allow_redirects=True) as resp:
+            status = resp.status
+        if status in (403, 405, 501):
+            # Certains hébergeurs refusent HEAD : un GET dont on ne lit que les en-têtes suffit
+            async with session.get(url, allow_redirects=True) as resp:
+                status = resp.status
+        return UrlCheck(card_id, name, url, status, time.perf_counter() - start, thumb=thumb)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return UrlCheck(card_id, name, url, None, time.perf_counter() - start, type(e).__name__, thumb)
+
+
+async def audit(cards, concurrency: int = 16, timeout: float = 10, progress=None) -> list[UrlCheck]:
+    """
+    HEADs the image and thumbnail URLs of every card, at most `concurrency`
+    at a time. `progress(done, total)` is awaited after each check; results
+    keep the card order, a card's thumbnail right after its image.
+    """
+    urls = [
+        (card, url, thumb)
+        for card in cards
+        for url, thumb in ((card.image_url, False), (card.thumb_url, True)) if url
+    ]
+    limit = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def run(session: aiohttp.ClientSession, card, url: str, thumb: bool) -> UrlCheck:
+        nonlocal done
+        async with limit:
+            result = await check_url(session, card.id, card.name, url, thumb)
+        done += 1
+        if progress is not None:
+            await progress(done, len(urls))
+        return result
+
+    async with aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=timeout),
+        connector=aiohttp.TCPConnector(limit=concurrency),
+    ) as session:
+        return await asyncio.gather(*(run(session, card, url, thumb) for card, url, thumb in urls))
+
+
+def refreshed_url(url: str, repo: str, branch: str, stamp: int) -> str | None:
+    """
+    Same file on raw.githubusercontent.com with a new ?v= cache buster,
+    or None for an image hosted elsewhere.
+    """
+    parts = urlsplit(url)
+    if parts.netloc != RAW_HOST:
+        return None
+    segments = parts.path.lstrip("/").split("/", 3)
+    if len(segments) < 4 or not segments[3]:
+        return None
+    # L'ancien paramètre ?v= est remplacé plutôt qu'empilé
+    return urlunsplit(("https", RAW_HOST, f"/{repo}/{branch}/{segments[3]}", f"v={stamp}", ""))
+
+
+if __name__ == "__main__":
+    import sqlite3
+    import sys
+
+    from catalog import Card
+
+    async def main(path: str) -> int:
+        with sqlite3.connect(path) as conn:
+            rows = conn.execute(
+                "SELECT id, name, image_url, thumb_url FROM cards WHERE image_url IS NOT NULL AND image_url != ''"
+            ).fetchall()
+        cards = [Card(card_id, name, "", "", image_url, 0, 0, thumb_url or "") for card_id, name, image_url, thumb_url in rows]
+        start = time.perf_counter()
+        results = await audit(cards)
+        for result in results:
+            if not result.ok:
+                print(f"❌ {result.name}{' (miniature)' if result.thumb else ''} : {result.status or result.error} ({result.url})")
+        broken = sum(not result.ok for result in results)
+        print(f"✅ {len(results) - broken}/{len(results)} URLs valides en {time.perf_counter() - start:.2f} s")
+        return 1 if broken else 0
+
+    sys.exit(asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "db.sqlite")))
@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image, ImageSequence
+
+# Dérivés produits pour chaque image : nom -> plus grand côté en pixels
+SIZES = {"thumb": 512}
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def render_derivatives(data: bytes, sizes: dict[str, int]) -> dict[str, tuple[bytes, str]]:
+    """
+    Decodes an image and returns {name: (encoded bytes, extension)} for each size.
+    WebP when the build supports it, PNG otherwise. Runs in a worker process.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        # Pour un GIF animé, seule la première image est gardée
+        frame = next(ImageSequence.Iterator(source)).copy()
+    frame = frame.convert("RGBA" if frame.mode in ("RGBA", "LA", "P") else "RGB")
+    Image.init()
+    webp = "WEBP" in Image.SAVE
+
+    results = {}
+    for name, bound in sizes.items():
+        image = frame.copy()
+        image.thumbnail((bound, bound), Image.LANCZOS)
+        out = io.BytesIO()
+        if webp:
+            image.save(out, "WEBP", quality=82, method=4)
+            results[name] = (out.getvalue(), "webp")
+        else:
+            image.save(out, "PNG", optimize=True)
+            results[name] = (out.getvalue(), "png")
+    return results
+
+
+class ImagePipeline:
+    """
+    Builds size-bounded derivatives of card art in a process pool and keeps
+    them in a content-addressed cache: <cache_dir>/<sha[:2]>/<sha>_<name>.<ext>.
+    An image already processed is served from disk without decoding it again.
+    """
+
+    def __init__(self, cache_dir: str = "image_cache", workers: int = 2, sizes: dict[str, int] = SIZES):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.sizes = sizes
+        self.processed = 0
+        self.cached = 0
+        self._pool = None
+
+    def _paths(self, key: str) -> dict[str, str | None]:
+        folder = os.path.join(self.cache_dir, key[:2])
+        found = {}
+        for name in self.sizes:
+            for ext in ("webp", "png"):
+                path = os.path.join(folder, f"{key}_{name}.{ext}")
+                if os.path.exists(path):
+                    found[name] = path
+                    break
+            else:
+                found[name] = None
+        return found
+
+    def _store(self, key: str, derivatives: dict[str, tuple[bytes, str]]) -> dict[str, str]:
+        folder = os.path.join(self.cache_dir, key[:2])
+        os.makedirs(folder, exist_ok=True)
+        paths = {}
+        for name, (data, ext) in derivatives.items():
+            path = os.path.join(folder, f"{key}_{name}.{ext}")
+            partial = f"{path}.part"
+            with open(partial, "wb") as f:
+                f.write(data)
+            os.replace(partial, path)
+            paths[name] = path
+        return paths
+
+    async def process(self, data: bytes) -> tuple[str, dict[str, str]]:
+        """Returns the source digest and the cached derivative path for each size."""
+        key = digest(data)
+        paths = self._paths(key)
+        if all(paths.values()):
+            self.cached += 1
+            return key, paths
+
+        if self._pool is None:
+            # spawn : forker un processus qui fait déjà tourner aiosqlite et des threads peut se bloquer
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        loop = asyncio.get_running_loop()
+        try:
+            derivatives = await loop.run_in_executor(self._pool, render_derivatives, data, self.sizes)
+        except BrokenProcessPool:
+            # Un worker mort rend le pool inutilisable : le suivant en recrée un
+            self._pool.shutdown(wait=False)
+            self._pool = None
+            raise
+        paths = await asyncio.to_thread(self._store, key, derivatives)
+        self.processed += 1
+        return key, paths
+
+    async def publish(self, data: bytes, upload) -> tuple[str | None, str]:
+        """
+        Builds the thumbnail and uploads it with `upload(data, filename)`.
+        Returns (source digest, thumbnail URL); the URL is empty when the image
+        could not be processed or uploaded, embeds then use the full image.
+        """
+        try:
+            key, paths = await self.process(data)
+            path = paths["thumb"]
+            with open(path, "rb") as f:
+                thumb_data = f.read()
+        except Exception as e:
+            print(f"[Miniature] {e}")
+            return None, ""
+        try:
+            thumb_url = await upload(thumb_data, f"thumbs/{key[:24]}.{path.rsplit('.', 1)[-1]}")
+        except Exception as e:
+            # L'image complète est déjà envoyée : la carte est créée sans miniature
+            print(f"[Miniature] {e}")
+            return key, ""
+        return key, thumb_url or ""
+
+    def close(self):
+        if self._pool is not None:
+            # Sans attendre les workers : close est appelé depuis la boucle asyncio
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    async def main(folder: str, cache_dir: str) -> int:
+        pipeline = ImagePipeline(cache_dir)
+        total_in = total_out = 0
+        start = time.perf_counter()
+        try:
+            for name in sorted(os.listdir(folder)):
+                with open(os.path.join(folder, name), "rb") as f:
+                    data = f.read()
+                try:
+                    _, paths = await pipeline.process(data)
+                except Exception as e:
+                    print(f"⚠️ {name} : {e}")
+                    continue
+                size = sum(os.path.getsize(path) for path in paths.values())
+                total_in += len(data)
+                total_out += size
+                print(f"{name} : {len(data) / 1024:,.0f} Ko → {size / 1024:,.0f} Ko")
+        finally:
+            pipeline.close()
+        print(f"✅ {total_in / 1024:,.0f} Ko → {total_out / 1024:,.0f} Ko en {time.perf_counter() - start:.2f} s "
+              f"({pipeline.processed} traitées, {pipeline.cached} déjà en cache)")
+        return 0
+
+    sys.exit(asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "cards", sys.argv[2] if len(sys.argv) > 2 else "image_cache")))
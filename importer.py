@@ -0,0 +1,243 @@
+import asyncio
+import csv
+import io
+import json
+from dataclasses import dataclass
+
+import aiohttp
+
+from catalog import RARITY_ORDER, Card
+from ingest import IngestError
+from schema import card_key
+
+COLUMNS = ("name", "rarity", "power", "protection", "image")
+
+
+@dataclass(slots=True)
+class ImportRow:
+    line: int
+    name: str
+    rarity: str = ""
+    power: int = 0
+    protection: int = 0
+    image: str = ""
+    error: str = ""
+    card: Card | None = None
+    image_url: str = ""
+    image_hash: str | None = None
+    thumb_url: str = ""
+
+    @property
+    def label(self) -> str:
+        return f"l.{self.line} {self.name or '(sans nom)'}"
+
+
+def parse_manifest(data: bytes, filename: str) -> list[tuple[int, dict]]:
+    """
+    Reads a CSV (comma or semicolon separated, with a header) or JSON manifest
+    (a list of objects, or {"cards": [...]}). Returns (line, fields) pairs;
+    for JSON the line is the position in the list, starting at 1.
+    """
+    text = data.decode("utf-8-sig")
+    if filename.lower().endswith(".json"):
+        records = json.loads(text)
+        if isinstance(records, dict):
+            records = records.get("cards", [])
+        if not isinstance(records, list):
+            raise ValueError("le JSON doit être une liste de cartes")
+        return [(i, record if isinstance(record, dict) else {}) for i, record in enumerate(records, start=1)]
+
+    dialect = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=",;")
+    reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+    missing = [column for column in COLUMNS[:4] if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"colonnes manquantes : {', '.join(missing)}")
+    # Ligne 1 = en-tête
+    return [(i, record) for i, record in enumerate(reader, start=2)]
+
+
+def validate(records: list[tuple[int, dict]], catalog) -> list[ImportRow]:
+    """Checks every row before anything is uploaded; invalid rows get an error."""
+    rows = []
+    seen = {}
+    for line, record in records:
+        fields = {key.strip().lower(): str(value).strip() for key, value in record.items() if key and value is not None}
+        row = ImportRow(line, fields.get("name", ""), fields.get("rarity", "").upper(),
+                        image=fields.get("image") or fields.get("image_url", ""))
+        rows.append(row)
+        if not row.name:
+            row.error = "nom manquant"
+            continue
+        try:
+            row.power, row.protection = int(fields.get("power", "")), int(fields.get("protection", ""))
+        except ValueError:
+            row.error = "power et protection doivent être des nombres"
+            continue
+        key = card_key(row.name)
+        if row.rarity not in RARITY_ORDER:
+            row.error = f"rareté inconnue « {row.rarity} »"
+        elif not (1 <= row.power <= 6 and 1 <= row.protection <= 6):
+            row.error = "power et protection doivent être entre 1 et 6"
+        elif catalog.find(row.name):
+            row.error = "existe déjà"
+        elif key in seen:
+            row.error = f"doublon de la ligne {seen[key]}"
+        else:
+            seen[key] = line
+    return rows
+
+
+async def import_cards(rows: list[ImportRow], write, catalog, *, load_image, upload, thumbnail, concurrency: int = 4) -> list[ImportRow]:
+    """
+    Imports the valid rows: images are loaded, uploaded and thumbnailed with
+    at most `concurrency` rows in flight, then every card whose image went
+    through is inserted in one transaction and the catalog is updated once.
+    `write` is Storage.write; `load_image(source)` returns an IngestedImage.
+    """
+    limit = asyncio.Semaphore(concurrency)
+
+    async def prepare(row: ImportRow):
+        if not row.image:
+            return
+        async with limit:
+            try:
+                image = await load_image(row.image)
+            except IngestError as e:
+                row.error = f"image refusée : {e}"
+                return
+            except OSError as e:
+                row.error = f"image illisible : {e.strerror or e}"
+                return
+            try:
+                row.image_url = await upload(image.data, f"{row.name}.{image.ext}", image.encoded) or ""
+                if not row.image_url:
+                    row.error = "échec de l'upload de l'image"
+                    return
+                row.image_hash, row.thumb_url = await thumbnail(image.data)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Une ligne en échec ne doit pas interrompre tout l'import
+                row.error = f"échec de l'upload : {type(e).__name__}"
+
+    pending = [row for row in rows if not row.error]
+    await asyncio.gather(*(prepare(row) for row in pending))
+
+    pending = [row for row in pending if not row.error]
+    if not pending:
+        return rows
+    async with write() as db:
+        for row in pending:
+            key = card_key(row.name)
+            async with db.execute("""
+                INSERT INTO cards (name, name_key, rarity, image_url, power, protection, image_hash, thumb_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name_key) DO NOTHING
+                RETURNING id
+            """, (row.name, key, row.rarity, row.image_url, row.power, row.protection, row.image_hash, row.thumb_url)) as cursor:
+                inserted = await cursor.fetchone()
+            if inserted is None:
+                # Ajoutée entre la validation et l'écriture (par /addcard par exemple)
+                row.error = "existe déjà"
+                continue
+            row.card = Card(inserted[0], row.name, key, row.rarity, row.image_url, row.power, row.protection, row.thumb_url)
+    catalog.add_many([row.card for row in pending if row.card])
+    return rows
+
+
+def format_report(rows: list[ImportRow]) -> str:
+    """One line per row; rows never imported (dry run) show as valid when they have no error."""
+    lines = []
+    for row in rows:
+        if row.error:
+            lines.append(f"❌ {row.label} : {row.error}")
+        elif row.card is None:
+            lines.append(f"✅ {row.label} ({row.rarity}) — valide")
+        else:
+            lines.append(f"✅ {row.label} ({row.rarity}){'' if row.image_url else ' — sans image'}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import sys
+    import time
+
+    from dotenv import load_dotenv
+
+    from catalog import CardCatalog
+    from github import GitHubUploader
+    from images import ImagePipeline
+    from ingest import ImageIngestor
+    from schema import migrate
+    from storage import Storage
+
+    parser = argparse.ArgumentParser(description="Importe des cartes depuis un manifeste CSV ou JSON")
+    parser.add_argument("folder", nargs="?", default="cards", help="Dossier des images (chemins du manifeste relatifs à ce dossier)")
+    parser.add_argument("--manifest", help="Manifeste à utiliser (par défaut : manifest.csv ou manifest.json du dossier)")
+    parser.add_argument("--db", default="db.sqlite")
+    parser.add_argument("--dry-run", action="store_true", help="Valide le manifeste sans rien envoyer ni écrire")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    async def main() -> int:
+        load_dotenv()
+        manifest = args.manifest or next(
+            (os.path.join(args.folder, name) for name in ("manifest.csv", "manifest.json") if os.path.exists(os.path.join(args.folder, name))),
+            None,
+        )
+        if manifest is None:
+            print(f"❌ Aucun manifest.csv ou manifest.json dans {args.folder}")
+            return 1
+        with open(manifest, "rb") as f:
+            data = f.read()
+        try:
+            records = parse_manifest(data, manifest)
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            print(f"❌ Manifeste illisible : {e}")
+            return 2
+
+        store = Storage(args.db)
+        await store.open()
+        ingestor = ImageIngestor(int(os.getenv("IMAGE_MAX_BYTES", 8 * 1024 * 1024)))
+        uploader = GitHubUploader(
+            os.getenv("GITHUB_TOKEN", ""), os.getenv("GITHUB_REPO", ""),
+            os.getenv("GITHUB_BRANCH", "main"), base_url=os.getenv("GITHUB_API_URL", "https://api.github.com"),
+        )
+        pipeline = ImagePipeline(os.getenv("IMAGE_CACHE_DIR", "image_cache"))
+        try:
+            async with store.write() as db:
+                await migrate(db)
+            catalog = CardCatalog()
+            async with store.read() as db:
+                await catalog.load(db)
+            rows = validate(records, catalog)
+
+            if args.dry_run:
+                print(format_report(rows))
+                return 1 if any(row.error for row in rows) else 0
+
+            async def load_image(source: str):
+                if source.startswith(("http://", "https://")):
+                    return await ingestor.fetch(source)
+                return await ingestor.file(os.path.join(args.folder, source))
+
+            start = time.perf_counter()
+            await import_cards(
+                rows, store.write, catalog,
+                load_image=load_image,
+                upload=uploader.upload,
+                thumbnail=lambda data: pipeline.publish(data, uploader.upload),
+                concurrency=args.concurrency,
+            )
+            print(format_report(rows))
+            imported = sum(1 for row in rows if row.card)
+            print(f"📦 {imported}/{len(rows)} cartes importées en {time.perf_counter() - start:.2f} s "
+                  f"({uploader.uploads} envois, {uploader.skipped} déjà présents)")
+            return 0 if imported == len(rows) else 1
+        finally:
+            pipeline.close()
+            await uploader.close()
+            await ingestor.close()
+            await store.close()
+
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,132 @@
+import asyncio
+import base64
+import os
+from dataclasses import dataclass
+
+import aiohttp
+
+MAX_IMAGE_BYTES = 8 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# Signatures des formats acceptés : extension -> préfixes possibles
+SIGNATURES = {
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpg": (b"\xff\xd8\xff",),
+    "gif": (b"GIF87a", b"GIF89a"),
+}
+
+
+class IngestError(Exception):
+    """Raised when an image cannot be ingested; the message is shown to the admin."""
+
+
+def sniff(head: bytes) -> str | None:
+    """Real image format from its first bytes, whatever the URL or filename says."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for ext, prefixes in SIGNATURES.items():
+        if head.startswith(prefixes):
+            return ext
+    return None
+
+
+@dataclass(frozen=True, slots=True)
+class IngestedImage:
+    data: bytes
+    ext: str
+    encoded: str  # base64 du contenu, prêt pour l'API GitHub
+
+
+class ImageIngestor:
+    """
+    Downloads card art in chunks through one shared session.
+    The download is aborted as soon as it exceeds max_bytes or the deadline,
+    the format is checked from the magic bytes of the first chunk and the
+    base64 form is built chunk by chunk instead of in one pass at the end.
+    """
+
+    def __init__(self, max_bytes: int = MAX_IMAGE_BYTES, deadline: float = 20, chunk_size: int = CHUNK_SIZE):
+        self.max_bytes = max_bytes
+        self.deadline = deadline
+        self.chunk_size = chunk_size
+        self.rejected = 0
+        self._session = None
+
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=10))
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _limit(self) -> str:
+        return f"{self.max_bytes / 1024 / 1024:.3g} Mo"
+
+    async def fetch(self, url: str) -> IngestedImage:
+        try:
+            return await asyncio.wait_for(self._download(url), self.deadline)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise IngestError(f"téléchargement trop long (plus de {self.deadline:g} s)") from None
+        except aiohttp.ClientError as e:
+            self.rejected += 1
+            raise IngestError(f"téléchargement impossible ({type(e).__name__})") from None
+        except IngestError:
+            self.rejected += 1
+            raise
+
+    async def _download(self, url: str) -> IngestedImage:
+        async with self.session().get(url) as resp:
+            if resp.status != 200:
+                raise IngestError(f"impossible de télécharger l'image (Status: {resp.status})")
+            if resp.content_length is not None and resp.content_length > self.max_bytes:
+                raise IngestError(f"image trop lourde ({resp.content_length / 1024 / 1024:.1f} Mo, max {self._limit()})")
+
+            data = bytearray()
+            encoded = []
+            done = 0
+            ext = None
+            async for chunk in resp.content.iter_chunked(self.chunk_size):
+                data += chunk
+                if len(data) > self.max_bytes:
+                    raise IngestError(f"image trop lourde (plus de {self._limit()})")
+                if ext is None and len(data) >= 12:
+                    ext = sniff(bytes(data[:12]))
+                    if ext is None:
+                        raise IngestError("ce fichier n'est pas une image PNG, JPEG, GIF ou WebP")
+                # Seuls des blocs de 3 octets s'encodent sans padding : le reste attend le morceau suivant
+                aligned = done + (len(data) - done) // 3 * 3
+                if aligned > done:
+                    encoded.append(base64.b64encode(data[done:aligned]).decode("ascii"))
+                    done = aligned
+
+        if ext is None:
+            ext = sniff(bytes(data[:12]))
+            if ext is None:
+                raise IngestError("ce fichier n'est pas une image PNG, JPEG, GIF ou WebP")
+        encoded.append(base64.b64encode(data[done:]).decode("ascii"))
+        return IngestedImage(bytes(data), ext, "".join(encoded))
+
+    async def attachment(self, attachment) -> IngestedImage:
+        """Discord attachments go through the same capped download, from their CDN URL."""
+        if attachment.size > self.max_bytes:
+            self.rejected += 1
+            raise IngestError(f"image trop lourde ({attachment.size / 1024 / 1024:.1f} Mo, max {self._limit()})")
+        return await self.fetch(attachment.url)
+
+    async def file(self, path: str) -> IngestedImage:
+        """Local image (offline import), with the same size and format checks."""
+        size = os.path.getsize(path)
+        if size > self.max_bytes:
+            self.rejected += 1
+            raise IngestError(f"image trop lourde ({size / 1024 / 1024:.1f} Mo, max {self._limit()})")
+        with open(path, "rb") as f:
+            data = f.read()
+        ext = sniff(data[:12])
+        if ext is None:
+            self.rejected += 1
+            raise IngestError("ce fichier n'est pas une image PNG, JPEG, GIF ou WebP")
+        return IngestedImage(data, ext, base64.b64encode(data).decode("ascii"))
@@ -0,0 +1,87 @@
+import itertools
+from collections import OrderedDict
+
+INVENTORY_QUERY = "SELECT card_id, quantity FROM user_cards WHERE user_id = ? AND quantity > 0"
+
+
+class InventoryCache:
+    """
+    Bounded LRU of per-user inventories held as {card_id: quantity}.
+    Mutations are applied write-through once committed; a load that races
+    with a mutation for the same user is served but not kept.
+    version(user_id) changes with every mutation of that inventory; versions
+    are only kept for cached users and are never reused, so an evicted and
+    reloaded inventory cannot match a listing rendered before.
+    """
+
+    def __init__(self, store, capacity: int = 1000):
+        self.store = store
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._stale = set()
+        self._generation = 0
+        self._versions = {}
+        self._clock = itertools.count(1)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total * 100 if total else 0.0
+
+    async def get(self, user_id: int) -> dict[int, int]:
+        inventory = self._entries.get(user_id)
+        if inventory is not None:
+            self.hits += 1
+            self._entries.move_to_end(user_id)
+            return inventory
+
+        self.misses += 1
+        self._loading[user_id] = self._loading.get(user_id, 0) + 1
+        try:
+            async with self.store.read() as db:
+                async with db.execute(INVENTORY_QUERY, (user_id,)) as cursor:
+                    inventory = {card_id: quantity for card_id, quantity in await cursor.fetchall()}
+        finally:
+            self._loading[user_id] -= 1
+            stale = user_id in self._stale
+            if not self._loading[user_id]:
+                del self._loading[user_id]
+                self._stale.discard(user_id)
+
+        if not stale and user_id not in self._entries:
+            self._entries[user_id] = inventory
+            self._versions[user_id] = next(self._clock)
+            if len(self._entries) > self.capacity:
+                evicted, _ = self._entries.popitem(last=False)
+                del self._versions[evicted]
+        return self._entries.get(user_id, inventory)
+
+    def version(self, user_id: int) -> tuple[int, int]:
+        # Inventaire hors cache : une version neuve, qui ne correspond à aucun rendu
+        version = self._versions.get(user_id)
+        return self._generation, version if version is not None else next(self._clock)
+
+    def add(self, user_id: int, card_id: int, delta: int):
+        if user_id in self._loading:
+            self._stale.add(user_id)
+        inventory = self._entries.get(user_id)
+        if inventory is None:
+            return
+        self._versions[user_id] = next(self._clock)
+        quantity = inventory.get(card_id, 0) + delta
+        if quantity > 0:
+            inventory[card_id] = quantity
+        else:
+            inventory.pop(card_id, None)
+
+    def drop_card(self, card_id: int):
+        self._generation += 1
+        self._stale.update(self._loading)
+        for inventory in self._entries.values():
+            inventory.pop(card_id, None)
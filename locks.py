@@ -0,0 +1,123 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+STRIPES = 4096
+
+
+class UserLocks:
+    """
+    Fixed set of asyncio locks shared by all users, a user id always mapping
+    to the same stripe. Mutations of one user are serialized while other
+    users keep running in parallel; operations touching several users take
+    their stripes in ascending order, so two of them can never deadlock.
+    """
+
+    def __init__(self, stripes: int = STRIPES):
+        self._locks = [asyncio.Lock() for _ in range(stripes)]
+        self.acquired = 0
+        self.contended = 0
+
+    def stripe(self, user_id: int) -> int:
+        # Les bits de poids faible d'un snowflake Discord varient peu : on mélange avant le modulo
+        return (((user_id * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> 32) % len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, *user_ids: int):
+        stripes = sorted({self.stripe(user_id) for user_id in user_ids})
+        held = []
+        try:
+            for stripe in stripes:
+                lock = self._locks[stripe]
+                if lock.locked():
+                    self.contended += 1
+                await lock.acquire()
+                held.append(lock)
+            self.acquired += 1
+            yield
+        finally:
+            for lock in reversed(held):
+                lock.release()
+
+
+if __name__ == "__main__":
+    import os
+    import random
+    import sys
+    import tempfile
+    import time
+
+    from inventory import InventoryCache
+    from schema import migrate
+    from storage import Storage
+    from writer import WriteQueue
+
+    gives = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    players, cards, copies = 1000, 20, 2
+
+    async def stress() -> bool:
+        path = os.path.join(tempfile.mkdtemp(), "stress.sqlite")
+        store = Storage(path)
+        await store.open()
+        async with store.write() as db:
+            await migrate(db)
+            await db.executemany(
+                "INSERT INTO cards (name, name_key, rarity, image_url, power, protection) VALUES (?, ?, 'C', '', 1, 1)",
+                [(f"Carte {i}", f"carte {i}") for i in range(cards)]
+            )
+            await db.executemany(
+                "INSERT INTO user_cards (user_id, card_id, quantity) VALUES (?, ?, ?)",
+                [(user_id, card_id, copies) for user_id in range(1, players + 1) for card_id in range(1, cards + 1)]
+            )
+        writes = WriteQueue(store)
+        writes.start()
+        inventories = InventoryCache(store)
+        locks = UserLocks()
+        rng = random.Random(7)
+        moved = rejected = 0
+
+        async def give(giver_id: int, receiver_id: int, card_id: int):
+            # Même déroulé que /give : vérification, écriture, puis cache, sous les verrous des deux joueurs
+            nonlocal moved, rejected
+            async with locks.hold(giver_id, receiver_id):
+                if card_id not in await inventories.get(giver_id):
+                    rejected += 1
+                    return
+                if await writes.submit("give", giver_id, receiver_id, card_id) is None:
+                    raise AssertionError(f"le cache de {giver_id} annonçait la carte {card_id}")
+                inventories.add(giver_id, card_id, -1)
+                inventories.add(receiver_id, card_id, 1)
+                moved += 1
+
+        tasks = []
+        for _ in range(gives):
+            giver_id, receiver_id = rng.sample(range(1, players + 1), 2)
+            tasks.append(give(giver_id, receiver_id, rng.randint(1, cards)))
+        # Une paire très active qui s'échange la même carte dans les deux sens en même temps
+        for i in range(40):
+            tasks.append(give(1, 2, 1) if i % 2 else give(2, 1, 1))
+        start = time.perf_counter()
+        await asyncio.wait_for(asyncio.gather(*tasks), 60)
+        elapsed = time.perf_counter() - start
+        await writes.close()
+
+        async with store.read() as db:
+            async with db.execute("SELECT card_id, SUM(quantity), MIN(quantity) FROM user_cards GROUP BY card_id") as cursor:
+                totals = await cursor.fetchall()
+            async with db.execute("SELECT user_id, card_id, quantity FROM user_cards WHERE quantity > 0") as cursor:
+                rows = await cursor.fetchall()
+        expected = {}
+        for user_id, card_id, quantity in rows:
+            expected.setdefault(user_id, {})[card_id] = quantity
+        conserved = len(totals) == cards and all(total == players * copies and low >= 0 for _, total, low in totals)
+        cached = True
+        for user_id in range(1, players + 1):
+            cached &= await inventories.get(user_id) == expected.get(user_id, {})
+        await store.close()
+
+        print(f"{'✅' if conserved else '❌'} totaux conservés : {players * copies} exemplaires de chacune des {cards} cartes")
+        print(f"{'✅' if cached else '❌'} inventaires en cache identiques à la base")
+        print(f"{len(tasks):,} dons concurrents en {elapsed:.2f} s • {moved:,} effectués, {rejected:,} refusés • "
+              f"{locks.contended:,} attentes de verrou")
+        return conserved and cached
+
+    sys.exit(0 if asyncio.run(stress()) else 1)
@@ -0,0 +1,136 @@
+import random
+import time
+
+from catalog import Card
+
+RATES = {
+    "C": 0.35,
+    "R": 0.30,
+    "SR": 0.20,
+    "SSR": 0.10,
+    "UR": 0.04,
+    "LR": 0.009,
+    "???": 0.001
+}
+
+
+class LootEngine:
+    """
+    Draws cards in O(1): a Walker/Vose alias table picks the rarity, then a
+    card is taken from that rarity's pre-bucketed id list.
+    Buckets are updated in place with swap-remove when the catalog changes.
+    """
+
+    def __init__(self, cards=(), rates=RATES, rng=None):
+        self.rng = rng or random.Random()
+        self.cards = {}
+        self.buckets = {rarity: [] for rarity in rates}
+        self.all_ids = []
+        self._positions = {}
+        self._build_alias(rates)
+        for card in cards:
+            self.add(card)
+
+    def _build_alias(self, rates):
+        self.rarities = list(rates)
+        n = len(self.rarities)
+        total = sum(rates.values())
+        scaled = [rates[r] * n / total for r in self.rarities]
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def _push(self, ids, key, card_id):
+        self._positions[key] = len(ids)
+        ids.append(card_id)
+
+    def _pop(self, ids, key, card_id):
+        index = self._positions.pop(key)
+        last = ids.pop()
+        if last != card_id:
+            ids[index] = last
+            self._positions[(key[0], last)] = index
+
+    def add(self, card):
+        card_id = card.id
+        if card_id in self.cards:
+            self.remove(card_id)
+        self.cards[card_id] = card
+        self._push(self.all_ids, (None, card_id), card_id)
+        bucket = self.buckets.get(card.rarity)
+        if bucket is not None:
+            self._push(bucket, (card.rarity, card_id), card_id)
+
+    def update(self, card):
+        old = self.cards.get(card.id)
+        if old is not None and old.rarity == card.rarity:
+            self.cards[card.id] = card
+        else:
+            self.add(card)
+
+    def remove(self, card_id):
+        card = self.cards.pop(card_id, None)
+        if card is None:
+            return
+        self._pop(self.all_ids, (None, card_id), card_id)
+        bucket = self.buckets.get(card.rarity)
+        if bucket is not None:
+            self._pop(bucket, (card.rarity, card_id), card_id)
+
+    def draw_rarity(self):
+        i = int(self.rng.random() * len(self.rarities))
+        return self.rarities[i] if self.rng.random() < self.prob[i] else self.rarities[self.alias[i]]
+
+    def draw(self):
+        if not self.all_ids:
+            return None
+        bucket = self.buckets[self.draw_rarity()]
+        ids = bucket if bucket else self.all_ids
+        return self.cards[ids[int(self.rng.random() * len(ids))]]
+
+
+def benchmark(draws: int = 1_000_000, seed: int = 42, cards_per_rarity: int = 20):
+    """
+    Seeded Monte Carlo run over a synthetic catalog.
+    Prints observed vs expected drop rates and draws per second.
+    """
+    cards = [
+        Card(i * 1000 + j, f"{rarity} #{j}", f"{rarity} #{j}", rarity, "", 1, 1)
+        for i, rarity in enumerate(RATES)
+        for j in range(cards_per_rarity)
+    ]
+    engine = LootEngine(cards, rng=random.Random(seed))
+
+    counts = dict.fromkeys(RATES, 0)
+    start = time.perf_counter()
+    for _ in range(draws):
+        counts[engine.draw().rarity] += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"{'Rareté':<8}{'Attendu':>10}{'Observé':>10}{'Écart':>10}")
+    worst = 0.0
+    for rarity, rate in RATES.items():
+        observed = counts[rarity] / draws
+        # Écart exprimé en écarts-types de la loi binomiale
+        sigma = (rate * (1 - rate) / draws) ** 0.5
+        deviation = (observed - rate) / sigma
+        worst = max(worst, abs(deviation))
+        print(f"{rarity:<8}{rate:>10.4%}{observed:>10.4%}{deviation:>9.2f}σ")
+    print(f"{draws / elapsed:,.0f} tirages/s ({draws:,} tirages, graine {seed})")
+    return worst
+
+
+if __name__ == "__main__":
+    import sys
+
+    worst = benchmark(*(int(arg) for arg in sys.argv[1:3]))
+    sys.exit(0 if worst < 5 else 1)
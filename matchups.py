@@ -0,0 +1,163 @@
+import numpy as np
+
+from catalog import rarity_rank
+
+
+def round_signs(power_a, protection_a, power_b, protection_b):
+    """Sign of each of the three duel rounds (power, protection, total) from A's side."""
+    return (
+        np.sign(power_a - power_b),
+        np.sign(protection_a - protection_b),
+        np.sign((power_a + protection_a) - (power_b + protection_b)),
+    )
+
+
+def duel_probabilities(power_a, protection_a, power_b, protection_b):
+    """
+    Exact odds of calculate_duel_winner, broadcast over arrays of stats.
+    Rounds 1 and 2 can be drawn; a drawn total (round 3) and a drawn overall
+    score are each settled by a fair coin. Returns (P(A wins), P(a coin decides)).
+    """
+    power_sign, protection_sign, total_sign = round_signs(power_a, protection_a, power_b, protection_b)
+    lead = power_sign + protection_sign
+
+    def settle(score):
+        # Score final : victoire nette, défaite nette, ou pile ou face
+        return np.where(score > 0, 1.0, np.where(score < 0, 0.0, 0.5))
+
+    win = np.where(total_sign != 0, settle(lead + total_sign), (settle(lead + 1) + settle(lead - 1)) / 2)
+    coin = np.where(total_sign == 0, 1.0, (lead + total_sign == 0).astype(float))
+    return win, coin
+
+
+class MatchupTable:
+    """
+    Duel odds for a catalog snapshot. Cards are reduced to their distinct
+    (power, protection) profiles, so the profile × profile matrices stay tiny
+    whatever the catalog size; card-level values are gathered by indexing.
+    """
+
+    def __init__(self, cards, version: int = 0):
+        self.version = version
+        self.cards = list(cards)
+        self.index = {card.id: i for i, card in enumerate(self.cards)}
+        stats = np.array([(card.power, card.protection) for card in self.cards], dtype=np.int64).reshape(-1, 2)
+        self.profiles, self.profile_of, counts = np.unique(stats, axis=0, return_inverse=True, return_counts=True)
+        self.profile_of = self.profile_of.reshape(-1)
+        self.ranks = np.array([rarity_rank(card.rarity) for card in self.cards], dtype=np.int64)
+
+        power, protection = self.profiles[:, 0], self.profiles[:, 1]
+        self.win, self.coin = duel_probabilities(power[:, None], protection[:, None], power[None, :], protection[None, :])
+
+        n = len(self.cards)
+        if n > 1:
+            # Espérance contre toutes les autres cartes, un tirage uniforme de l'adversaire
+            per_profile = (self.win @ counts - 0.5) / (n - 1)
+            self.expected = per_profile[self.profile_of]
+        else:
+            self.expected = np.full(n, 0.5)
+
+        # Profil i dominé par j : j fait au moins aussi bien contre chaque profil présent, et mieux contre un
+        at_least = (self.win[None, :, :] >= self.win[:, None, :]).all(axis=2)
+        better = (self.win[None, :, :] > self.win[:, None, :]).any(axis=2)
+        self.dominates = at_least & better  # [i, j] : j domine i
+
+    def __len__(self):
+        return len(self.cards)
+
+    def odds(self, card_a, card_b) -> tuple[float, float]:
+        """(P(card_a wins), P(a coin decides)) for a duel between two catalog cards."""
+        a = self.profile_of[self.index[card_a.id]]
+        b = self.profile_of[self.index[card_b.id]]
+        return float(self.win[a, b]), float(self.coin[a, b])
+
+    def matrix(self) -> np.ndarray:
+        """Full card × card win probability matrix (n² floats, built on demand)."""
+        return self.win[np.ix_(self.profile_of, self.profile_of)]
+
+    def dominated(self) -> list[tuple[int, int]]:
+        """
+        (card index, index of a card dominating it) for every card dominated by
+        a card of the same rarity or a more common one: its rarity buys nothing.
+        """
+        strength = self.win.mean(axis=1)
+        result = []
+        for rank in np.unique(self.ranks):
+            # Cartes au moins aussi communes que ce rang : premier représentant de chaque profil
+            candidates = np.flatnonzero(self.ranks >= rank)
+            owner = np.full(len(self.profiles), -1, dtype=np.int64)
+            owner[self.profile_of[candidates[::-1]]] = candidates[::-1]
+            allowed = self.dominates & (owner >= 0)[None, :]
+            best = np.where(allowed, strength[None, :], -1.0).argmax(axis=1)
+            cards = np.flatnonzero((self.ranks == rank) & allowed.any(axis=1)[self.profile_of])
+            result.extend(zip(cards.tolist(), owner[best[self.profile_of[cards]]].tolist()))
+        result.sort()
+        return result
+
+
+class Matchups:
+    """Matchup table of the live catalog, rebuilt only when the catalog version changes."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.builds = 0
+        self._table = None
+
+    def table(self) -> MatchupTable:
+        if self._table is None or self._table.version != self.catalog.version:
+            self._table = MatchupTable(self.catalog, self.catalog.version)
+            self.builds += 1
+        return self._table
+
+
+def _reference_odds(power_a, protection_a, power_b, protection_b) -> tuple[float, float]:
+    """Enumerates the coin flips of the duel rules one pairing at a time."""
+    def sign(x):
+        return (x > 0) - (x < 0)
+
+    lead = sign(power_a - power_b) + sign(protection_a - protection_b)
+    total = sign(power_a + protection_a - power_b - protection_b)
+    outcomes = [(lead + total, 1.0)] if total else [(lead + 1, 0.5), (lead - 1, 0.5)]
+    win = coin = 0.0
+    for score, weight in outcomes:
+        win += weight * (1.0 if score > 0 else 0.5 if score == 0 else 0.0)
+        coin += weight * (1.0 if score == 0 or not total else 0.0)
+    return win, coin
+
+
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+
+    from catalog import RARITY_ORDER, Card
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(7)
+    cards = [Card(i, f"Carte {i}", f"carte {i}", rng.choice(RARITY_ORDER), "", rng.randint(1, 6), rng.randint(1, 6)) for i in range(size)]
+
+    MatchupTable(cards[:10]).dominated()
+    start = time.perf_counter()
+    table = MatchupTable(cards)
+    dominated = table.dominated()
+    elapsed = (time.perf_counter() - start) * 1000
+
+    ok = True
+    for p1 in range(1, 7):
+        for d1 in range(1, 7):
+            for p2 in range(1, 7):
+                for d2 in range(1, 7):
+                    win, coin = duel_probabilities(np.int64(p1), np.int64(d1), np.int64(p2), np.int64(d2))
+                    ok &= (float(win), float(coin)) == _reference_odds(p1, d1, p2, d2)
+    sample = min(size, 300)
+    full = table.matrix()[:sample, :sample]
+    ok &= bool(np.allclose(full + full.T, 1.0))
+    ok &= all(
+        (table.win[table.profile_of[j]] >= table.win[table.profile_of[i]]).all() and table.ranks[j] >= table.ranks[i]
+        for i, j in dominated
+    )
+
+    print(f"{'✅' if ok else '❌'} probabilités identiques à l'énumération des règles")
+    print(f"{size:,} cartes, {len(table.profiles)} profils • rapport (espérances + dominées) en {elapsed:.1f} ms")
+    print(f"{len(dominated):,} cartes dominées • meilleure espérance {table.expected.max():.1%}, pire {table.expected.min():.1%}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,261 @@
+import contextvars
+import functools
+import time
+from collections import defaultdict
+
+import aiohttp
+
+# Bornes des histogrammes, en secondes
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# [temps base de données, temps API Discord] de la commande en cours
+_spent = contextvars.ContextVar("metrics_spent", default=None)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; quantiles are interpolated inside a bucket."""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                low = BUCKETS[i - 1] if i else 0.0
+                high = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return low + (high - low) * (rank - seen) / n
+            seen += n
+        return BUCKETS[-1]
+
+    def cumulative(self) -> list[int]:
+        result, running = [], 0
+        for n in self.counts:
+            running += n
+            result.append(running)
+        return result
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+class Metrics:
+    """
+    Process-wide latency counters. Commands and autocompletes are timed by
+    wrapping their callbacks when they are defined (timed), database time is reported by
+    Storage and the write queue (observe_db), Discord API time by an aiohttp
+    trace on the client session (trace_config). Time spent inside a command
+    is also charged to that command, through a context variable.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.commands = defaultdict(Histogram)  # (nom, type) -> histogramme
+        self.errors = defaultdict(int)
+        self.command_db = defaultdict(float)
+        self.command_discord = defaultdict(float)
+        self.db = defaultdict(Histogram)  # read / write / queue
+        self.discord = defaultdict(Histogram)  # méthode HTTP
+        self.discord_errors = 0
+
+    def timed(self, name: str, kind: str = "command"):
+        """Decorator recording the latency, errors and DB/Discord share of a coroutine."""
+        key = (name, kind)
+
+        def decorate(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                spent = [0.0, 0.0]
+                token = _spent.set(spent)
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    self.errors[key] += 1
+                    raise
+                finally:
+                    self.commands[key].observe(time.perf_counter() - start)
+                    self.command_db[key] += spent[0]
+                    self.command_discord[key] += spent[1]
+                    _spent.reset(token)
+            return wrapper
+        return decorate
+
+    def observe_db(self, operation: str, seconds: float):
+        self.db[operation].observe(seconds)
+        spent = _spent.get()
+        if spent is not None:
+            spent[0] += seconds
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Trace to pass as http_trace to the discord.py client."""
+        trace = aiohttp.TraceConfig()
+
+        async def on_start(session, ctx, params):
+            ctx.start = time.perf_counter()
+
+        async def on_end(session, ctx, params):
+            elapsed = time.perf_counter() - ctx.start
+            self.discord[params.method].observe(elapsed)
+            spent = _spent.get()
+            if spent is not None:
+                spent[1] += elapsed
+
+        async def on_exception(session, ctx, params):
+            self.discord_errors += 1
+            await on_end(session, ctx, params)
+
+        trace.on_request_start.append(on_start)
+        trace.on_request_end.append(on_end)
+        trace.on_request_exception.append(on_exception)
+        return trace
+
+    @staticmethod
+    def merged(histograms) -> Histogram:
+        result = Histogram()
+        for histogram in histograms:
+            result.count += histogram.count
+            result.total += histogram.total
+            result.counts = [a + b for a, b in zip(result.counts, histogram.counts)]
+        return result
+
+    def slowest(self, limit: int = 5) -> list[tuple[str, Histogram, int, float, float]]:
+        """(name, histogram, errors, DB seconds, Discord seconds) of the commands with the worst p99."""
+        rows = [
+            (name if kind == "command" else f"{name} (autocomplétion)", histogram, self.errors[(name, kind)],
+             self.command_db[(name, kind)], self.command_discord[(name, kind)])
+            for (name, kind), histogram in self.commands.items() if histogram.count
+        ]
+        rows.sort(key=lambda row: row[1].quantile(0.99), reverse=True)
+        return rows[:limit]
+
+    def prometheus(self) -> str:
+        """Text exposition format (version 0.0.4)."""
+        lines = []
+
+        def histogram(metric: str, help: str, series):
+            lines.append(f"# HELP {metric} {help}")
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, h in series:
+                for bound, total in zip((*BUCKETS, "+Inf"), h.cumulative()):
+                    lines.append(f"{metric}_bucket{{{_labels(**labels, le=bound)}}} {total}")
+                lines.append(f"{metric}_sum{{{_labels(**labels)}}} {h.total:.6f}")
+                lines.append(f"{metric}_count{{{_labels(**labels)}}} {h.count}")
+
+        def counter(metric: str, help: str, series):
+            lines.append(f"# HELP {metric} {help}")
+            lines.append(f"# TYPE {metric} counter")
+            for labels, value in series:
+                lines.append(f"{metric}{{{_labels(**labels)}}} {value:g}" if labels else f"{metric} {value:g}")
+
+        commands = sorted(self.commands.items())
+        histogram("cardbot_command_seconds", "Latency of slash commands and autocompletes.",
+                  [({"command": name, "kind": kind}, h) for (name, kind), h in commands])
+        counter("cardbot_command_errors_total", "Commands that raised an exception.",
+                [({"command": name, "kind": kind}, self.errors[(name, kind)]) for (name, kind), _ in commands])
+        counter("cardbot_command_db_seconds_total", "Database time spent inside commands.",
+                [({"command": name, "kind": kind}, self.command_db[(name, kind)]) for (name, kind), _ in commands])
+        counter("cardbot_command_discord_seconds_total", "Discord API time spent inside commands.",
+                [({"command": name, "kind": kind}, self.command_discord[(name, kind)]) for (name, kind), _ in commands])
+        histogram("cardbot_db_seconds", "Database reads, write transactions and write queue waits.",
+                  [({"operation": operation}, h) for operation, h in sorted(self.db.items())])
+        histogram("cardbot_discord_request_seconds", "Discord HTTP API requests.",
+                  [({"method": method}, h) for method, h in sorted(self.discord.items())])
+        counter("cardbot_discord_request_errors_total", "Discord HTTP requests that failed before a response.",
+                [({}, self.discord_errors)])
+        lines.append("# HELP cardbot_start_time_seconds Start time of the bot since the epoch.")
+        lines.append("# TYPE cardbot_start_time_seconds gauge")
+        lines.append(f"cardbot_start_time_seconds {self.started:.0f}")
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, port: int, host: str = "127.0.0.1"):
+        """Starts a local /metrics endpoint; returns the runner to clean up on shutdown."""
+        from aiohttp import web
+
+        async def handler(request: web.Request):
+            return web.Response(text=self.prometheus(), content_type="text/plain", charset="utf-8",
+                                headers={"X-Content-Type-Options": "nosniff"})
+
+        app = web.Application()
+        app.router.add_get("/metrics", handler)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+if __name__ == "__main__":
+    import asyncio
+    import random
+    import sys
+
+    async def self_check() -> bool:
+        metrics = Metrics()
+        rng = random.Random(7)
+
+        @metrics.timed("fake")
+        async def fake(delay: float):
+            metrics.observe_db("read", delay / 2)
+            await asyncio.sleep(delay)
+
+        @metrics.timed("broken")
+        async def broken():
+            raise ValueError
+
+        samples = [rng.expovariate(1 / 0.02) for _ in range(2000)]
+        synthetic = metrics.commands[("synthetic", "command")]
+        for delay in samples:
+            synthetic.observe(delay)
+        await asyncio.gather(*(fake(0.01) for _ in range(20)))
+        try:
+            await broken()
+        except ValueError:
+            pass
+
+        ok = True
+        samples.sort()
+        for q in (0.5, 0.9, 0.99):
+            exact = samples[int(q * len(samples)) - 1]
+            estimate = synthetic.quantile(q)
+            # L'estimation reste dans le même intervalle de l'histogramme que la vraie valeur
+            bucket = next((b for b in BUCKETS if exact <= b), BUCKETS[-1])
+            low = max((b for b in BUCKETS if b < bucket), default=0.0)
+            ok &= low <= estimate <= bucket
+            print(f"p{int(q * 100)} : estimé {estimate * 1000:.1f} ms, exact {exact * 1000:.1f} ms")
+        ok &= metrics.commands[("fake", "command")].count == 20 and abs(metrics.command_db[("fake", "command")] - 0.1) < 1e-9
+        ok &= metrics.errors[("broken", "command")] == 1
+
+        runner = await metrics.serve(0)
+        port = runner.addresses[0][1]
+        async with aiohttp.ClientSession(trace_configs=[metrics.trace_config()]) as session:
+            async with session.get(f"http://127.0.0.1:{port}/metrics") as resp:
+                text = await resp.text()
+        await runner.cleanup()
+        ok &= 'cardbot_command_errors_total{command="broken",kind="command"} 1' in text
+        ok &= metrics.discord["GET"].count == 1
+        for line in text.splitlines():
+            ok &= line.startswith("#") or len(line.rsplit(" ", 1)) == 2
+        print(f"{'✅' if ok else '❌'} histogrammes, erreurs, temps base de données et export Prometheus ({len(text.splitlines())} lignes)")
+        return ok
+
+    sys.exit(0 if asyncio.run(self_check()) else 1)
@@ -0,0 +1,166 @@
+import discord
+
+ALL_GROUPS = "*"
+
+
+class JumpModal(discord.ui.Modal, title="Aller à la page"):
+    page = discord.ui.TextInput(label="Numéro de page", max_length=6)
+
+    def __init__(self, paginator: "Paginator"):
+        super().__init__()
+        self.paginator = paginator
+
+    async def on_submit(self, interaction: discord.Interaction):
+        try:
+            page = int(self.page.value)
+        except ValueError:
+            await interaction.response.send_message("❌ Numéro de page invalide", ephemeral=True)
+            return
+        self.paginator.page = page - 1
+        await self.paginator.refresh(interaction)
+
+
+class Paginator(discord.ui.View):
+    """
+    Shared paginated embed for list-style commands.
+    Items are kept as given and only the visible slice is rendered, with a
+    section title whenever the group changes. A select filters on one group;
+    the view disables itself and drops its items when it times out.
+    """
+
+    def __init__(
+        self,
+        owner_id: int,
+        title: str,
+        items: list,
+        *,
+        render,
+        group=None,
+        section=None,
+        group_label=None,
+        footer: str = "",
+        color: int = 0x7289da,
+        page_size: int = 20,
+        timeout: float = 180,
+    ):
+        super().__init__(timeout=timeout)
+        self.owner_id = owner_id
+        self.title = title
+        self.items = items
+        self.visible = items
+        self.render_item = render
+        self.group = group
+        self.section = section
+        self.footer = footer
+        self.color = color
+        self.page_size = page_size
+        self.page = 0
+        self.message = None
+
+        groups = list(dict.fromkeys(group(item) for item in items)) if group else []
+        if len(groups) > 1:
+            label = group_label or str
+            self.filter_select.options = [discord.SelectOption(label="Toutes", value=ALL_GROUPS, default=True)] + [
+                discord.SelectOption(label=label(g), value=str(g)) for g in groups[:24]
+            ]
+        else:
+            self.remove_item(self.filter_select)
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-len(self.visible) // self.page_size))
+
+    def render(self) -> discord.Embed:
+        self.page = min(max(self.page, 0), self.pages - 1)
+        start = self.page * self.page_size
+        lines = []
+        current = object()
+        for item in self.visible[start:start + self.page_size]:
+            if self.section is not None and self.group(item) != current:
+                current = self.group(item)
+                if lines:
+                    lines.append("")
+                lines.append(self.section(current))
+                lines.append("═══════════════════╢")
+            lines.append(self.render_item(item))
+
+        self.first.disabled = self.previous.disabled = self.page == 0
+        self.next.disabled = self.last.disabled = self.page >= self.pages - 1
+        self.jump.disabled = self.pages == 1
+
+        embed = discord.Embed(title=self.title, description="\n".join(lines) or "Aucun élément", color=self.color)
+        footer = f"Page {self.page + 1}/{self.pages}"
+        embed.set_footer(text=f"{footer} • {self.footer}" if self.footer else footer)
+        return embed
+
+    async def send(self, interaction: discord.Interaction, ephemeral: bool = False):
+        embed = self.render()
+        static = self.pages == 1 and self.filter_select not in self.children
+        if static:
+            # Une seule page et rien à filtrer : pas besoin de boutons
+            self.stop()
+        if interaction.response.is_done():
+            # Réponse déjà utilisée (bouton d'une autre vue) : nouveau message de suivi
+            if static:
+                await interaction.followup.send(embed=embed, ephemeral=ephemeral)
+            else:
+                self.message = await interaction.followup.send(embed=embed, view=self, ephemeral=ephemeral, wait=True)
+            return
+        if static:
+            await interaction.response.send_message(embed=embed, ephemeral=ephemeral)
+            return
+        await interaction.response.send_message(embed=embed, view=self, ephemeral=ephemeral)
+        self.message = await interaction.original_response()
+
+    async def refresh(self, interaction: discord.Interaction):
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("❌ Ce menu ne t'appartient pas", ephemeral=True)
+            return False
+        return True
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        self.items = self.visible = []
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+            self.message = None
+
+    @discord.ui.button(label="⏮", style=discord.ButtonStyle.secondary)
+    async def first(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = 0
+        await self.refresh(interaction)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.primary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page -= 1
+        await self.refresh(interaction)
+
+    @discord.ui.button(label="Page…", style=discord.ButtonStyle.secondary)
+    async def jump(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(JumpModal(self))
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.primary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        await self.refresh(interaction)
+
+    @discord.ui.button(label="⏭", style=discord.ButtonStyle.secondary)
+    async def last(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = self.pages - 1
+        await self.refresh(interaction)
+
+    @discord.ui.select(placeholder="Filtrer par rareté", row=1)
+    async def filter_select(self, interaction: discord.Interaction, select: discord.ui.Select):
+        value = select.values[0]
+        self.visible = self.items if value == ALL_GROUPS else [item for item in self.items if str(self.group(item)) == value]
+        for option in select.options:
+            option.default = option.value == value
+        self.page = 0
+        await self.refresh(interaction)
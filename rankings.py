@@ -0,0 +1,179 @@
+from bisect import bisect_left, insort
+
+import duels
+
+CATEGORIES = {
+    "collection": "📚 Collection",
+    "loots": "🎰 Loots",
+    "duels": "⚔️ Duels",
+}
+
+
+class Ranking:
+    """
+    Players sorted by descending score, kept as a sorted array of
+    (negated score, user_id). Rank and page lookups are binary searches;
+    an update is a removal plus an insertion in the array.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def fill(self, scores):
+        """Replaces every entry from (user_id, score) pairs with a single sort."""
+        self._keys = {
+            user_id: (tuple(-value for value in score), user_id)
+            for user_id, score in scores if score is not None
+        }
+        self._entries = sorted(self._keys.values())
+
+    def set(self, user_id: int, score: tuple | None):
+        old = self._keys.pop(user_id, None)
+        if old is not None:
+            del self._entries[bisect_left(self._entries, old)]
+        if score is not None:
+            key = (tuple(-value for value in score), user_id)
+            self._keys[user_id] = key
+            insort(self._entries, key)
+
+    def score(self, user_id: int) -> tuple | None:
+        key = self._keys.get(user_id)
+        return tuple(-value for value in key[0]) if key else None
+
+    def rank(self, user_id: int) -> int | None:
+        """1-based rank; tied players share the best rank of their score."""
+        key = self._keys.get(user_id)
+        if key is None:
+            return None
+        return bisect_left(self._entries, (key[0],)) + 1
+
+    def page(self, offset: int, limit: int) -> list[tuple[int, int, tuple]]:
+        """(rank, user_id, score) for the players at positions offset..offset+limit."""
+        rows = []
+        for negated, user_id in self._entries[offset:offset + limit]:
+            rank = bisect_left(self._entries, (negated,)) + 1
+            rows.append((rank, user_id, tuple(-value for value in negated)))
+        return rows
+
+
+class Leaderboards:
+    """
+    Server-wide rankings by unique cards owned, loot count and duel win rate.
+    Loaded once from user_stats and the duel log, then updated by the loot,
+    give, delcard and duel handlers after their writes are committed.
+    """
+
+    def __init__(self, min_duels: int = 5):
+        self.min_duels = min_duels
+        self.rankings = {category: Ranking() for category in CATEGORIES}
+        self._unique = {}
+        self._loots = {}
+        self._duels = {}
+
+    async def load(self, db):
+        self._unique.clear()
+        self._loots.clear()
+        self._duels.clear()
+        async with db.execute("SELECT user_id, unique_cards, loot_count FROM user_stats") as cursor:
+            for user_id, unique_cards, loot_count in await cursor.fetchall():
+                self._unique[user_id] = unique_cards
+                self._loots[user_id] = loot_count
+        for user_id, wins, total in await duels.player_totals(db):
+            self._duels[user_id] = [wins or 0, total or 0]
+        self.rebuild()
+
+    def rebuild(self):
+        self.rankings["collection"].fill((user_id, self._cards_score(user_id)) for user_id in self._unique)
+        self.rankings["loots"].fill((user_id, self._loots_score(user_id)) for user_id in self._loots)
+        self.rankings["duels"].fill((user_id, self._duels_score(user_id)) for user_id in self._duels)
+
+    def _cards_score(self, user_id: int) -> tuple | None:
+        unique = self._unique.get(user_id, 0)
+        return (unique,) if unique > 0 else None
+
+    def _loots_score(self, user_id: int) -> tuple | None:
+        loots = self._loots.get(user_id, 0)
+        return (loots,) if loots > 0 else None
+
+    def _duels_score(self, user_id: int) -> tuple | None:
+        wins, total = self._duels.get(user_id, (0, 0))
+        # Un minimum de duels évite qu'une seule victoire place un joueur en tête
+        return (round(wins / total, 6), wins) if total >= self.min_duels else None
+
+    def record_cards(self, user_id: int, delta_unique: int):
+        if delta_unique:
+            self._unique[user_id] = max(self._unique.get(user_id, 0) + delta_unique, 0)
+            self.rankings["collection"].set(user_id, self._cards_score(user_id))
+
+    def record_loot(self, user_id: int, new_card: bool):
+        self._loots[user_id] = self._loots.get(user_id, 0) + 1
+        self.rankings["loots"].set(user_id, self._loots_score(user_id))
+        self.record_cards(user_id, int(new_card))
+
+    def record_duel(self, winner_id: int, loser_id: int):
+        for user_id, won in ((winner_id, 1), (loser_id, 0)):
+            stats = self._duels.setdefault(user_id, [0, 0])
+            stats[0] += won
+            stats[1] += 1
+            self.rankings["duels"].set(user_id, self._duels_score(user_id))
+
+    def duel_record(self, user_id: int) -> tuple[int, int]:
+        wins, total = self._duels.get(user_id, (0, 0))
+        return wins, total
+
+
+def benchmark(users: int = 100_000, updates: int = 100_000, seed: int = 7):
+    """Builds the rankings for synthetic players, then times updates and lookups."""
+    import random
+    import time
+
+    rng = random.Random(seed)
+    boards = Leaderboards()
+
+    start = time.perf_counter()
+    for user_id in range(users):
+        boards._unique[user_id] = rng.randint(1, 300)
+        boards._loots[user_id] = rng.randint(1, 2000)
+        total = rng.randint(0, 200)
+        boards._duels[user_id] = [rng.randint(0, total), total]
+    boards.rebuild()
+    build = time.perf_counter() - start
+    print(f"Construction : {users:,} joueurs en {build:.2f} s")
+
+    start = time.perf_counter()
+    for _ in range(updates):
+        boards.record_loot(rng.randrange(users), rng.random() < 0.3)
+    elapsed = time.perf_counter() - start
+    print(f"Loots : {updates / elapsed:,.0f} mises à jour/s")
+
+    start = time.perf_counter()
+    for _ in range(updates):
+        winner, loser = rng.sample(range(users), 2)
+        boards.record_duel(winner, loser)
+    elapsed = time.perf_counter() - start
+    print(f"Duels : {updates / elapsed:,.0f} duels/s")
+
+    for category, ranking in boards.rankings.items():
+        start = time.perf_counter()
+        for _ in range(updates):
+            ranking.rank(rng.randrange(users))
+        rank_time = (time.perf_counter() - start) / updates * 1e6
+        start = time.perf_counter()
+        for _ in range(1000):
+            ranking.page(rng.randrange(len(ranking) // 10) * 10, 10)
+        page_time = (time.perf_counter() - start) / 1000 * 1e6
+        # Référence : tri complet, ce que coûterait un classement recalculé à chaque appel
+        start = time.perf_counter()
+        sorted(ranking._entries, key=lambda entry: entry[0])
+        sort_time = (time.perf_counter() - start) * 1e6
+        print(f"{category:<11} rang {rank_time:.2f} µs • page {page_time:.1f} µs • tri complet {sort_time:,.0f} µs")
+
+
+if __name__ == "__main__":
+    import sys
+
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,38 @@
+from collections import OrderedDict
+
+
+class RenderCache:
+    """
+    Bounded LRU of pre-formatted listing payloads.
+    Keys embed the catalog version (and the inventory version for per-user
+    listings), so a mutation makes old entries unreachable instead of
+    expiring them; they simply age out of the LRU.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total * 100 if total else 0.0
+
+    def get(self, key, build):
+        payload = self._entries.get(key)
+        if payload is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return payload
+
+        self.misses += 1
+        payload = build()
+        self._entries[key] = payload
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        return payload
@@ -0,0 +1,272 @@
+import re
+import unicodedata
+
+import duels
+
+
+def card_key(name: str) -> str:
+    """Case- and accent-insensitive lookup key for a card name."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+
+INDEXES = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_cards_name_key ON cards(name_key)",
+    "CREATE INDEX IF NOT EXISTS idx_user_cards_card ON user_cards(card_id)",
+    "CREATE INDEX IF NOT EXISTS idx_duel_history_player2 ON duel_history(player2_id)",
+)
+
+def hot_queries() -> dict[str, str]:
+    """
+    Statements of the commands that must never scan a whole table. These are
+    the constants the code itself executes, imported here lazily since their
+    modules depend on this one.
+    """
+    import stats
+    import writer
+    from catalog import SET_IMAGE_QUERY, SET_IMAGE_URLS_QUERY, SET_THUMB_QUERY
+    from inventory import INVENTORY_QUERY
+
+    return {
+        "inventaire": INVENTORY_QUERY,
+        "profile": stats.PROFILE_QUERY,
+        "fixcardimage": SET_IMAGE_QUERY,
+        "refreshallimages": SET_IMAGE_URLS_QUERY,
+        "backfillthumbs": SET_THUMB_QUERY,
+        "delcard (détenteurs)": writer.CARD_HOLDERS_QUERY,
+        "delcard (inventaires)": writer.DELETE_CARD_COPIES_QUERY,
+        "duel (historique de la paire)": duels.PAIR_TOTALS_QUERY,
+        "duel (duels de la paire)": duels.PAIR_EVENTS_QUERY,
+        "duelstats": duels.OPPONENTS_QUERY,
+        "duellog": duels.HISTORY_QUERY,
+        "duellog (une carte)": duels.CARD_HISTORY_QUERY,
+        "bilan d'une carte": duels.CARD_RECORD_QUERY,
+        "duellog (cette semaine)": duels.PLAYER_RECENT_QUERY,
+    }
+
+
+async def _columns(db, table: str) -> set[str]:
+    async with db.execute(f"PRAGMA table_info({table})") as cursor:
+        return {row[1] for row in await cursor.fetchall()}
+
+
+async def _add_column(db, table: str, column: str, definition: str):
+    if column not in await _columns(db, table):
+        await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+async def _initial_tables(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INT PRIMARY KEY,
+            last_loot TEXT,
+            loot_count INT DEFAULT 0,
+            favorite_card INT
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS cards (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            rarity TEXT,
+            image_url TEXT,
+            power INT DEFAULT 1,
+            protection INT DEFAULT 1
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS user_cards (
+            user_id INT,
+            card_id INT,
+            quantity INT,
+            PRIMARY KEY (user_id, card_id)
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS duel_history (
+            player1_id INT,
+            player2_id INT,
+            player1_wins INT DEFAULT 0,
+            player2_wins INT DEFAULT 0,
+            total_duels INT DEFAULT 0,
+            last_duel TEXT,
+            PRIMARY KEY (player1_id, player2_id)
+        )
+    """)
+    # Bases créées avant l'ajout des favoris et des statistiques de combat
+    await _add_column(db, "users", "loot_count", "INT DEFAULT 0")
+    await _add_column(db, "users", "favorite_card", "INT")
+    await _add_column(db, "cards", "power", "INT DEFAULT 1")
+    await _add_column(db, "cards", "protection", "INT DEFAULT 1")
+
+
+async def _card_name_keys(db):
+    await _add_column(db, "cards", "name_key", "TEXT COLLATE NOCASE")
+    await backfill_name_keys(db)
+    for index in INDEXES:
+        await db.execute(index)
+
+
+async def _user_stats(db):
+    # Import local : stats dépend de catalog, qui importe ce module
+    import stats
+
+    await stats.create_table(db)
+    await stats.rebuild(db)
+
+
+async def _card_thumbnails(db):
+    await _add_column(db, "cards", "image_hash", "TEXT")
+    await _add_column(db, "cards", "thumb_url", "TEXT")
+
+
+async def _duel_events(db):
+    await duels.create_table(db)
+
+
+# La position d'une étape dans la liste est son numéro de version : ne jamais réordonner
+MIGRATIONS = [
+    _initial_tables,
+    _card_name_keys,
+    _user_stats,
+    _card_thumbnails,
+    _duel_events,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+async def schema_version(db) -> int:
+    async with db.execute("PRAGMA user_version") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def migrate(db) -> list[int]:
+    """
+    Applies every pending migration, each in its own transaction.
+    Returns the applied version numbers; a current schema costs a single PRAGMA read.
+    """
+    version = await schema_version(db)
+    if version == SCHEMA_VERSION:
+        return []
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"Base en version {version}, plus récente que le bot ({SCHEMA_VERSION})")
+
+    applied = []
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        await db.commit()
+        await db.execute("BEGIN")
+        try:
+            await MIGRATIONS[number - 1](db)
+            await db.execute(f"PRAGMA user_version = {number}")
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+        applied.append(number)
+    return applied
+
+
+async def backfill_name_keys(db):
+    async with db.execute("SELECT name_key FROM cards WHERE name_key IS NOT NULL") as cursor:
+        taken = {row[0] for row in await cursor.fetchall()}
+    async with db.execute("SELECT id, name FROM cards WHERE name_key IS NULL ORDER BY id") as cursor:
+        rows = await cursor.fetchall()
+    for card_id, name in rows:
+        key = card_key(name or "")
+        # Deux anciennes cartes peuvent avoir le même nom normalisé
+        if key in taken:
+            key = f"{key}#{card_id}"
+        taken.add(key)
+        await db.execute("UPDATE cards SET name_key = ? WHERE id = ?", (key, card_id))
+
+
+async def check_query_plans(db) -> list[str]:
+    """Returns a description of every hot query whose plan falls back to a table scan."""
+    failures = []
+    for label, query in hot_queries().items():
+        names = re.findall(r":(\w+)", query)
+        params = dict.fromkeys(names) if names else (None,) * query.count("?")
+        async with db.execute(f"EXPLAIN QUERY PLAN {query}", params) as cursor:
+            plan = [row[3] for row in await cursor.fetchall()]
+        # Parcourir le résultat d'une sous-requête est normal, pas une table
+        scans = [step for step in plan if step.startswith("SCAN") and not step.startswith(("SCAN (subquery", "SCAN CONSTANT"))]
+        if scans:
+            failures.append(f"{label}: {'; '.join(scans)}")
+    return failures
+
+
+def _is_sqlite_file(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(16) == b"SQLite format 3\x00"
+
+
+async def _migrate_cli(source: str, output: str | None) -> int:
+    import os
+    import sqlite3
+
+    import aiosqlite
+
+    target = source
+    if os.path.exists(source) and not _is_sqlite_file(source):
+        # Ancien export SQL (ex : db.sql.bak) rejoué dans une nouvelle base
+        if not output:
+            print("❌ --output est requis pour migrer un export SQL")
+            return 2
+        if os.path.exists(output):
+            print(f"❌ {output} existe déjà")
+            return 2
+        with open(source, encoding="utf-8") as f:
+            script = f.read()
+        with sqlite3.connect(output) as conn:
+            conn.executescript(script)
+        conn.close()
+        target = output
+
+    async with aiosqlite.connect(target) as db:
+        before = await schema_version(db)
+        applied = await migrate(db)
+    if applied:
+        print(f"✅ {target} : version {before} → {SCHEMA_VERSION} (migrations {', '.join(map(str, applied))})")
+    else:
+        print(f"✅ {target} : déjà en version {SCHEMA_VERSION}")
+    return 0
+
+
+async def _verify_cli(path: str) -> int:
+    import aiosqlite
+
+    async with aiosqlite.connect(f"file:{path}?mode=ro", uri=True) as db:
+        version = await schema_version(db)
+        if version != SCHEMA_VERSION:
+            print(f"❌ {path} : version {version}, attendue {SCHEMA_VERSION} (lance : python schema.py migrate {path})")
+            return 1
+        async with db.execute("PRAGMA quick_check") as cursor:
+            integrity = (await cursor.fetchone())[0]
+        failures = await check_query_plans(db)
+    if integrity != "ok":
+        failures.append(f"intégrité : {integrity}")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print(f"✅ {path} : version {version}, {len(hot_queries())} requêtes indexées")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    import sys
+
+    parser = argparse.ArgumentParser(description="Migrations du schéma de la base des cartes")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = commands.add_parser("migrate", help="Applique les migrations en attente")
+    migrate_parser.add_argument("path", nargs="?", default="db.sqlite", help="Base SQLite ou ancien export SQL")
+    migrate_parser.add_argument("--output", help="Nouvelle base à créer depuis un export SQL")
+    verify_parser = commands.add_parser("verify", help="Vérifie la version, l'intégrité et les index sans rien modifier")
+    verify_parser.add_argument("path", nargs="?", default="db.sqlite")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        sys.exit(asyncio.run(_migrate_cli(args.path, args.output)))
+    sys.exit(asyncio.run(_verify_cli(args.path)))
@@ -0,0 +1,128 @@
+import heapq
+import re
+from bisect import bisect_left, insort
+
+from catalog import RARITY_ORDER, Card, rarity_rank
+from schema import card_key
+
+WORD_SPLIT = re.compile(r"[^\w]+")
+
+
+def trigrams(key: str) -> set[str]:
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+class CatalogSearch:
+    """
+    Accent-insensitive name search over the card catalog.
+    Sorted key and word arrays answer prefix queries, trigram postings narrow
+    substring queries, and results are ranked prefix > word prefix > substring,
+    then rarity, then name. Lower tiers are only computed when the limit is not reached.
+    """
+
+    def __init__(self, cards=()):
+        self.cards = {}
+        self._keys = {}
+        self._order = {}
+        self._postings = {}
+        self._prefix = []
+        self._words = []
+        for card in cards:
+            self.add(card)
+
+    def __len__(self):
+        return len(self.cards)
+
+    @staticmethod
+    def _word_entries(key: str, card_id: int) -> set[tuple[str, int]]:
+        return {(word, card_id) for word in WORD_SPLIT.split(key)[1:] if word}
+
+    def add(self, card):
+        card_id = card.id
+        if card_id in self.cards:
+            self.remove(card_id)
+        key = card.key
+        self.cards[card_id] = card
+        self._keys[card_id] = key
+        self._order[card_id] = (rarity_rank(card.rarity), key)
+        for gram in trigrams(key):
+            self._postings.setdefault(gram, set()).add(card_id)
+        insort(self._prefix, (key, card_id))
+        for entry in self._word_entries(key, card_id):
+            insort(self._words, entry)
+
+    def update(self, card):
+        old = self.cards.get(card.id)
+        if old is not None and old.key == card.key and old.rarity == card.rarity:
+            self.cards[card.id] = card
+        else:
+            self.add(card)
+
+    def remove(self, card_id: int):
+        if self.cards.pop(card_id, None) is None:
+            return
+        key = self._keys.pop(card_id)
+        del self._order[card_id]
+        for gram in trigrams(key):
+            ids = self._postings[gram]
+            ids.discard(card_id)
+            if not ids:
+                del self._postings[gram]
+        del self._prefix[bisect_left(self._prefix, (key, card_id))]
+        for entry in self._word_entries(key, card_id):
+            del self._words[bisect_left(self._words, entry)]
+
+    @staticmethod
+    def _starting_with(entries: list, query: str) -> set[int]:
+        ids = set()
+        index = bisect_left(entries, (query,))
+        while index < len(entries) and entries[index][0].startswith(query):
+            ids.add(entries[index][1])
+            index += 1
+        return ids
+
+    def _substring_ids(self, query: str) -> set[int]:
+        grams = sorted((self._postings.get(gram, set()) for gram in trigrams(query)), key=len)
+        if not grams:
+            # Moins de trois caractères : pas de trigramme, on vérifie chaque clé
+            return {card_id for card_id, key in self._keys.items() if query in key}
+        candidates = set.intersection(*grams)
+        return {card_id for card_id in candidates if query in self._keys[card_id]}
+
+    def search(self, query: str, limit: int = 25) -> list:
+        query = card_key(query)
+        if not query:
+            return [self.cards[card_id] for card_id in heapq.nsmallest(limit, self._order, key=self._order.__getitem__)]
+
+        tiers = (
+            lambda: self._starting_with(self._prefix, query),
+            lambda: self._starting_with(self._words, query),
+            lambda: self._substring_ids(query),
+        )
+        results = []
+        seen = set()
+        for tier in tiers:
+            if len(results) >= limit:
+                break
+            ids = tier() - seen
+            seen |= ids
+            results += heapq.nsmallest(limit - len(results), ids, key=self._order.__getitem__)
+        return [self.cards[card_id] for card_id in results]
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    rng = random.Random(1)
+    syllables = ["ba", "al", "ja", "dra", "dé", "es", "se", "fla", "mme", "ly", "ca", "vi", "cop", "dra", "go", "nne"]
+    names = [" ".join("".join(rng.choices(syllables, k=3)).capitalize() for _ in range(3)) for _ in range(5000)]
+    names.append("Be'Baal Jadra, Déesse des Flammes")
+    cards = [Card(i, name, card_key(name), rng.choice(RARITY_ORDER), "", 1, 1) for i, name in enumerate(names)]
+    index = CatalogSearch(cards)
+    for query in ("deesse", "be", "fla", "dra", "x"):
+        start = time.perf_counter()
+        for _ in range(100):
+            results = index.search(query)
+        elapsed = (time.perf_counter() - start) / 100 * 1000
+        print(f"{query!r:10} {len(results):>3} résultats en {elapsed:.3f} ms • {results[0].name if results else '-'}")
@@ -0,0 +1,159 @@
+from catalog import RARITY_ORDER
+
+# Rang de rareté calculé en SQL, aligné sur catalog.rarity_rank (0 = la plus rare)
+RARITY_RANK_SQL = "CASE rarity {} ELSE {} END".format(
+    " ".join(f"WHEN '{rarity}' THEN {rank}" for rank, rarity in enumerate(RARITY_ORDER)),
+    len(RARITY_ORDER),
+)
+
+COMPARED = ("total_cards", "unique_cards", "best_rarity", "best_card", "loot_count")
+
+PROFILE_QUERY = """
+    SELECT s.total_cards, s.unique_cards, s.best_card, s.loot_count, u.favorite_card
+    FROM user_stats s LEFT JOIN users u ON u.user_id = s.user_id
+    WHERE s.user_id = ?
+"""
+
+_EXPECTED = f"""
+    WITH holdings AS (
+        SELECT uc.user_id, uc.card_id, uc.quantity, c.name_key,
+               {RARITY_RANK_SQL.replace("rarity", "c.rarity")} AS rank
+        FROM user_cards uc JOIN cards c ON c.id = uc.card_id
+        WHERE uc.quantity > 0
+    ),
+    ranked AS (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY rank, name_key) AS position FROM holdings
+    ),
+    players AS (
+        SELECT user_id FROM users UNION SELECT user_id FROM holdings
+    )
+    SELECT p.user_id,
+           COALESCE((SELECT SUM(quantity) FROM holdings h WHERE h.user_id = p.user_id), 0),
+           (SELECT COUNT(*) FROM holdings h WHERE h.user_id = p.user_id),
+           r.rank,
+           r.card_id,
+           COALESCE(u.loot_count, 0)
+    FROM players p
+    LEFT JOIN ranked r ON r.user_id = p.user_id AND r.position = 1
+    LEFT JOIN users u ON u.user_id = p.user_id
+"""
+
+
+async def create_table(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user_id INTEGER PRIMARY KEY,
+            total_cards INT NOT NULL DEFAULT 0,
+            unique_cards INT NOT NULL DEFAULT 0,
+            best_rarity INT,
+            best_card INT,
+            loot_count INT NOT NULL DEFAULT 0
+        )
+    """)
+
+
+async def record_loot(db, user_id: int):
+    await db.execute("""
+        INSERT INTO user_stats(user_id, loot_count) VALUES (?, 1)
+        ON CONFLICT(user_id) DO UPDATE SET loot_count = loot_count + 1
+    """, (user_id,))
+
+
+# Carte gagnée plus rare que la meilleure enregistrée, à rareté égale départagée par nom comme _EXPECTED
+_BETTER = """
+    best_rarity IS NULL
+    OR (excluded.best_rarity, (SELECT name_key FROM cards WHERE id = excluded.best_card))
+     < (best_rarity, (SELECT name_key FROM cards WHERE id = user_stats.best_card))
+"""
+
+
+async def record_gain(db, user_id: int, card_id: int, new_card: bool):
+    # Dans un UPDATE, toutes les expressions voient les anciennes valeurs de la ligne
+    await db.execute(f"""
+        INSERT INTO user_stats(user_id, total_cards, unique_cards, best_rarity, best_card)
+        VALUES (?, 1, 1, (SELECT {RARITY_RANK_SQL} FROM cards WHERE id = ?), ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            total_cards = total_cards + 1,
+            unique_cards = unique_cards + ?,
+            best_rarity = CASE WHEN {_BETTER} THEN excluded.best_rarity ELSE best_rarity END,
+            best_card = CASE WHEN {_BETTER} THEN excluded.best_card ELSE best_card END
+    """, (user_id, card_id, card_id, int(new_card)))
+
+
+async def record_loss(db, user_id: int, card_id: int, quantity: int, card_gone: bool):
+    await db.execute(
+        "UPDATE user_stats SET total_cards = MAX(total_cards - ?, 0), unique_cards = MAX(unique_cards - ?, 0) WHERE user_id = ?",
+        (quantity, int(card_gone), user_id)
+    )
+    if card_gone:
+        await refresh_best(db, user_id, card_id)
+
+
+async def refresh_best(db, user_id: int, lost_card_id: int):
+    """Recomputes the rarest held card, only if the lost card was the recorded one."""
+    await db.execute(f"""
+        UPDATE user_stats SET (best_rarity, best_card) = (
+            SELECT {RARITY_RANK_SQL.replace("rarity", "c.rarity")}, c.id
+            FROM user_cards uc JOIN cards c ON c.id = uc.card_id
+            WHERE uc.user_id = user_stats.user_id AND uc.quantity > 0
+            ORDER BY 1, c.name_key LIMIT 1
+        )
+        WHERE user_id = ? AND best_card = ?
+    """, (user_id, lost_card_id))
+
+
+async def rebuild(db) -> int:
+    await db.execute("DELETE FROM user_stats")
+    cursor = await db.execute(
+        f"INSERT INTO user_stats(user_id, total_cards, unique_cards, best_rarity, best_card, loot_count) {_EXPECTED}"
+    )
+    return cursor.rowcount
+
+
+async def verify(db) -> list[tuple]:
+    """
+    Compares user_stats with a recomputation from user_cards and users.
+    Returns (user_id, column, stored, expected) for every drifted value.
+    """
+    async with db.execute(_EXPECTED) as cursor:
+        expected = {row[0]: dict(zip(COMPARED, row[1:])) for row in await cursor.fetchall()}
+    async with db.execute(f"SELECT user_id, {', '.join(COMPARED)} FROM user_stats") as cursor:
+        stored = {row[0]: dict(zip(COMPARED, row[1:])) for row in await cursor.fetchall()}
+
+    empty = {"total_cards": 0, "unique_cards": 0, "best_rarity": None, "best_card": None, "loot_count": 0}
+    drift = []
+    for user_id in sorted(expected.keys() | stored.keys()):
+        have = stored.get(user_id, empty)
+        want = expected.get(user_id, empty)
+        drift += [(user_id, column, have[column], want[column]) for column in COMPARED if have[column] != want[column]]
+    return drift
+
+
+async def _cli(command: str, path: str) -> int:
+    import aiosqlite
+
+    async with aiosqlite.connect(path) as db:
+        drift = await verify(db)
+        for user_id, column, stored, expected in drift[:20]:
+            print(f"⚠️ {user_id} {column} : {stored} au lieu de {expected}")
+        if len(drift) > 20:
+            print(f"… et {len(drift) - 20} autres écarts")
+        if command == "rebuild":
+            count = await rebuild(db)
+            await db.commit()
+            print(f"✅ user_stats reconstruite ({count} joueurs)")
+            return 0
+    print("✅ user_stats à jour" if not drift else f"❌ {len(drift)} écarts (lance : python stats.py rebuild {path})")
+    return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    import sys
+
+    parser = argparse.ArgumentParser(description="Statistiques matérialisées des joueurs (user_stats)")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("path", nargs="?", default="db.sqlite")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_cli(args.command, args.path)))
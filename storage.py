@@ -0,0 +1,95 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA mmap_size = 67108864",
+)
+
+
+class Storage:
+    """
+    Long-lived aiosqlite connections shared by every command.
+    Readers are borrowed from a small pool, writes go through a single
+    dedicated connection so WAL readers never wait on a writer.
+    """
+
+    def __init__(self, path: str, readers: int = 4):
+        self.path = path
+        self.readers = readers
+        self._pool: asyncio.Queue | None = None
+        self._reader_conns = []
+        self._writer = None
+        self._write_lock = asyncio.Lock()
+        # observer(operation, seconds) : durée de chaque lecture / transaction, attente comprise
+        self.observer = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self, read_only: bool):
+        conn = await aiosqlite.connect(self.path)
+        for pragma in PRAGMAS:
+            await conn.execute(pragma)
+        if read_only:
+            await conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    async def open(self):
+        if self.is_open:
+            return
+        self._writer = await self._connect(read_only=False)
+        self._pool = asyncio.Queue()
+        for _ in range(self.readers):
+            conn = await self._connect(read_only=True)
+            self._reader_conns.append(conn)
+            self._pool.put_nowait(conn)
+
+    async def close(self):
+        if not self.is_open:
+            return
+        async with self._write_lock:
+            for conn in self._reader_conns:
+                await conn.close()
+            self._reader_conns.clear()
+            await self._writer.close()
+            self._writer = None
+            self._pool = None
+
+    @asynccontextmanager
+    async def read(self):
+        start = time.perf_counter()
+        conn = await self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put_nowait(conn)
+            if self.observer is not None:
+                self.observer("read", time.perf_counter() - start)
+
+    @asynccontextmanager
+    async def write(self):
+        """
+        Borrow the writer connection for one transaction.
+        Commits when the block exits normally, rolls back on error.
+        """
+        start = time.perf_counter()
+        async with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            else:
+                await self._writer.commit()
+            finally:
+                if self.observer is not None:
+                    self.observer("write", time.perf_counter() - start)
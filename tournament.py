@@ -0,0 +1,254 @@
+import random
+from dataclasses import dataclass
+
+import discord
+
+import duels
+from catalog import Card
+
+FORMATS = {
+    "roundrobin": "🔁 Toutes rondes",
+    "bracket": "🌳 Élimination directe",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Entry:
+    user_id: int
+    name: str
+    card: Card
+
+
+@dataclass(frozen=True, slots=True)
+class Match:
+    round: int
+    player1: Entry
+    player2: Entry
+    winner: int  # 1 ou 2
+    rounds: int  # manches compactées (duels.pack_rounds)
+    score: tuple[int, int]
+
+    @property
+    def winner_entry(self) -> Entry:
+        return self.player1 if self.winner == 1 else self.player2
+
+    @property
+    def loser_entry(self) -> Entry:
+        return self.player2 if self.winner == 1 else self.player1
+
+
+def play(round_number: int, player1: Entry, player2: Entry) -> Match:
+    winner, rounds, card1_wins, card2_wins = duels.calculate_duel_winner(player1.card, player2.card)
+    return Match(round_number, player1, player2, winner, duels.pack_result(rounds, card1_wins, card2_wins), (card1_wins, card2_wins))
+
+
+def round_robin(entries: list[Entry]) -> list[Match]:
+    """
+    Every player meets every other one once, scheduled with the circle method
+    so that each round has everyone play at most once.
+    """
+    players = list(entries)
+    if len(players) % 2:
+        players.append(None)  # exempt de la ronde
+    matches = []
+    for round_number in range(1, len(players)):
+        for i in range(len(players) // 2):
+            player1, player2 = players[i], players[-1 - i]
+            if player1 is not None and player2 is not None:
+                matches.append(play(round_number, player1, player2))
+        players.insert(1, players.pop())
+    return matches
+
+
+def bracket(entries: list[Entry]) -> list[Match]:
+    """
+    Single elimination in the given seed order. The bracket is padded to a
+    power of two and the top seeds get the byes of the first round.
+    """
+    size = 1
+    while size < len(entries):
+        size *= 2
+    seeds = list(entries) + [None] * (size - len(entries))
+    # Tête de série 1 contre la dernière, 2 contre l'avant-dernière…
+    alive = [(seeds[i], seeds[size - 1 - i]) for i in range(size // 2)]
+    matches = []
+    round_number = 1
+    while True:
+        winners = []
+        for player1, player2 in alive:
+            if player2 is None:
+                winners.append(player1)
+                continue
+            match = play(round_number, player1, player2)
+            matches.append(match)
+            winners.append(match.winner_entry)
+        if len(winners) == 1:
+            return matches
+        alive = [(winners[i], winners[i + 1]) for i in range(0, len(winners), 2)]
+        round_number += 1
+
+
+def run(format: str, entries: list[Entry], rng: random.Random | None = None) -> list[Match]:
+    """Plays the whole tournament in one pass; the seed order is shuffled first."""
+    entries = list(entries)
+    (rng or random).shuffle(entries)
+    return round_robin(entries) if format == "roundrobin" else bracket(entries)
+
+
+def standings(matches: list[Match]) -> list[tuple[Entry, int, int, int]]:
+    """(entry, wins, losses, rounds won - rounds lost), best first."""
+    table = {}
+    for match in matches:
+        for entry, won, diff in (
+            (match.player1, match.winner == 1, match.score[0] - match.score[1]),
+            (match.player2, match.winner == 2, match.score[1] - match.score[0]),
+        ):
+            wins, losses, total = table.get(entry.user_id, (entry, 0, 0, 0))[1:]
+            table[entry.user_id] = (entry, wins + won, losses + (not won), total + diff)
+    return sorted(table.values(), key=lambda row: (-row[1], -row[3], row[0].name.casefold()))
+
+
+def round_label(format: str, round_number: int, last_round: int) -> str:
+    if format == "bracket":
+        remaining = last_round - round_number
+        if remaining == 0:
+            return "🏆 Finale"
+        if remaining == 1:
+            return "⚔️ Demi-finales"
+        if remaining == 2:
+            return "⚔️ Quarts de finale"
+    return f"⚔️ Ronde {round_number}"
+
+
+def events(matches: list[Match], at: int) -> list[tuple]:
+    """Rows for duels.record, player1 of each match standing as the challenger."""
+    return [
+        (m.player1.user_id, m.player2.user_id, m.player1.card.id, m.player2.card.id, m.rounds, m.winner, at)
+        for m in matches
+    ]
+
+
+class JoinModal(discord.ui.Modal, title="Rejoindre le tournoi"):
+    card = discord.ui.TextInput(label="Carte jouée (nom exact)", max_length=100)
+
+    def __init__(self, lobby: "TournamentLobby"):
+        super().__init__()
+        self.lobby = lobby
+
+    async def on_submit(self, interaction: discord.Interaction):
+        # Modale ouverte avant le lancement : le tournoi s'est joué sans ce joueur
+        if self.lobby.is_finished():
+            await interaction.response.send_message("❌ Les inscriptions sont closes", ephemeral=True)
+            return
+        card = await self.lobby.find_card(interaction.user.id, self.card.value)
+        if card is None:
+            await interaction.response.send_message(f"❌ Tu ne possèdes pas la carte **{self.card.value}**", ephemeral=True)
+            return
+        if self.lobby.is_finished():
+            await interaction.response.send_message("❌ Les inscriptions sont closes", ephemeral=True)
+            return
+        if len(self.lobby.entries) >= self.lobby.max_players and interaction.user.id not in self.lobby.entries:
+            await interaction.response.send_message("❌ Le tournoi est complet", ephemeral=True)
+            return
+        self.lobby.entries[interaction.user.id] = Entry(interaction.user.id, interaction.user.display_name, card)
+        await interaction.response.edit_message(embed=self.lobby.render(), view=self.lobby)
+
+
+class TournamentLobby(discord.ui.View):
+    """
+    Registration message of a tournament: players join with one of their
+    cards, the organizer starts it. `find_card(user_id, name)` checks the
+    card is owned; `start(interaction, entries)` runs the tournament.
+    """
+
+    def __init__(self, organizer_id: int, format: str, *, find_card, start, max_players: int = 64, timeout: float = 900):
+        super().__init__(timeout=timeout)
+        self.organizer_id = organizer_id
+        self.format = format
+        self.find_card = find_card
+        self.start = start
+        self.max_players = max_players
+        self.entries = {}
+        self.message = None
+
+    def render(self) -> discord.Embed:
+        lines = [f"• **{entry.name}** — {entry.card.name} ({entry.card.rarity})" for entry in self.entries.values()]
+        embed = discord.Embed(
+            title=f"🏟️ Tournoi — {FORMATS[self.format]}",
+            description="\n".join(lines) or "Aucun inscrit pour l'instant. Clique sur **Rejoindre** et choisis ta carte !",
+            color=0xe67e22
+        )
+        embed.set_footer(text=f"{len(self.entries)}/{self.max_players} joueurs • l'organisateur lance le tournoi")
+        return embed
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(content="⌛ Inscriptions expirées.", view=self)
+            except discord.HTTPException:
+                pass
+
+    async def _organizer_only(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.organizer_id:
+            await interaction.response.send_message("❌ Seul l'organisateur peut faire ça", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="Rejoindre", emoji="⚔️", style=discord.ButtonStyle.success)
+    async def join(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(JoinModal(self))
+
+    @discord.ui.button(label="Quitter", emoji="🚪", style=discord.ButtonStyle.secondary)
+    async def leave(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.entries.pop(interaction.user.id, None) is None:
+            await interaction.response.send_message("❌ Tu n'es pas inscrit", ephemeral=True)
+            return
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @discord.ui.button(label="Lancer", emoji="▶️", style=discord.ButtonStyle.primary)
+    async def launch(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if not await self._organizer_only(interaction):
+            return
+        if len(self.entries) < 2:
+            await interaction.response.send_message("❌ Il faut au moins 2 joueurs", ephemeral=True)
+            return
+        self.stop()
+        for item in self.children:
+            item.disabled = True
+        await interaction.response.edit_message(embed=self.render(), view=self)
+        await self.start(interaction, list(self.entries.values()))
+
+    @discord.ui.button(label="Annuler", emoji="✖️", style=discord.ButtonStyle.danger)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if not await self._organizer_only(interaction):
+            return
+        self.stop()
+        await interaction.response.edit_message(content="✖️ Tournoi annulé.", embed=None, view=None)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from catalog import RARITY_ORDER
+
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    rng = random.Random(7)
+    entries = [
+        Entry(i, f"Joueur {i}", Card(i, f"Carte {i}", f"carte {i}", rng.choice(RARITY_ORDER), "", rng.randint(1, 6), rng.randint(1, 6)))
+        for i in range(players)
+    ]
+    for format in FORMATS:
+        start = time.perf_counter()
+        matches = run(format, entries, random.Random(1))
+        rows = events(matches, 0)
+        table = standings(matches)
+        elapsed = (time.perf_counter() - start) * 1000
+        if format == "roundrobin":
+            ok = len(matches) == players * (players - 1) // 2 and all(wins + losses == players - 1 for _, wins, losses, _ in table)
+        else:
+            ok = len(matches) == players - 1 and sum(1 for _, _, losses, _ in table if losses == 0) == 1
+        print(f"{'✅' if ok else '❌'} {FORMATS[format]} : {players} joueurs, {len(rows)} duels en {elapsed:.1f} ms "
+              f"• vainqueur {table[0][0].name} ({table[0][1]} victoires)")
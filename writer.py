@@ -0,0 +1,178 @@
+import asyncio
+import time
+
+import duels
+import stats
+
+
+CARD_HOLDERS_QUERY = "SELECT user_id, quantity FROM user_cards WHERE card_id = ? AND quantity > 0"
+DELETE_CARD_COPIES_QUERY = "DELETE FROM user_cards WHERE card_id = ?"
+
+
+async def apply_loot(db, user_id: int, card_id: int, looted_at: str):
+    await db.execute("""
+        INSERT INTO users(user_id, last_loot, loot_count)
+        VALUES (?, ?, 1)
+        ON CONFLICT(user_id)
+        DO UPDATE SET last_loot = excluded.last_loot, loot_count = COALESCE(loot_count, 0) + 1
+    """, (user_id, looted_at))
+    await stats.record_loot(db, user_id)
+    return await apply_grant(db, user_id, card_id)
+
+
+async def apply_grant(db, user_id: int, card_id: int) -> bool:
+    """Adds one copy; returns True when it is the player's first copy of the card."""
+    async with db.execute("""
+        INSERT INTO user_cards(user_id, card_id, quantity)
+        VALUES (?, ?, 1)
+        ON CONFLICT(user_id, card_id)
+        DO UPDATE SET quantity = quantity + 1
+        RETURNING quantity
+    """, (user_id, card_id)) as cursor:
+        quantity = (await cursor.fetchone())[0]
+    await stats.record_gain(db, user_id, card_id, new_card=quantity == 1)
+    return quantity == 1
+
+
+async def apply_give(db, giver_id: int, receiver_id: int, card_id: int) -> tuple[bool, bool] | None:
+    """
+    Moves one copy; returns None if the giver has none, otherwise whether the
+    giver lost their last copy and whether the receiver got their first one.
+    """
+    async with db.execute(
+        "UPDATE user_cards SET quantity = quantity - 1 WHERE user_id = ? AND card_id = ? AND quantity > 0",
+        (giver_id, card_id)
+    ) as cursor:
+        if cursor.rowcount == 0:
+            return None
+    async with db.execute("DELETE FROM user_cards WHERE user_id = ? AND card_id = ? AND quantity <= 0", (giver_id, card_id)) as cursor:
+        card_gone = cursor.rowcount > 0
+    await stats.record_loss(db, giver_id, card_id, 1, card_gone=card_gone)
+    return card_gone, await apply_grant(db, receiver_id, card_id)
+
+
+async def apply_delete_card(db, card_id: int) -> list[int]:
+    """Deletes the card and every copy of it; returns the ids of its former holders."""
+    async with db.execute(CARD_HOLDERS_QUERY, (card_id,)) as cursor:
+        holders = await cursor.fetchall()
+    await db.execute(DELETE_CARD_COPIES_QUERY, (card_id,))
+    await db.execute("DELETE FROM cards WHERE id = ?", (card_id,))
+    for user_id, quantity in holders:
+        await stats.record_loss(db, user_id, card_id, quantity, card_gone=True)
+    return [user_id for user_id, _ in holders]
+
+
+async def apply_duel(db, player1_id: int, player2_id: int, card1_id: int, card2_id: int, rounds: int, winner: int, at: int):
+    await duels.record(db, [(player1_id, player2_id, card1_id, card2_id, rounds, winner, at)])
+
+
+async def apply_duels(db, events: list[tuple]):
+    """Every duel of a tournament as one queued record, so they commit together."""
+    await duels.record(db, events)
+
+
+OPERATIONS = {
+    "loot": apply_loot,
+    "grant": apply_grant,
+    "give": apply_give,
+    "delete_card": apply_delete_card,
+    "duel": apply_duel,
+    "duels": apply_duels,
+}
+
+
+class WriteQueue:
+    """
+    Single writer task applying queued mutations in batched transactions.
+    A batch is flushed once it reaches max_batch records or max_delay seconds,
+    and each caller awaits the result of its own record once the batch is committed.
+    """
+
+    def __init__(self, store, max_batch: int = 256, max_delay: float = 0.02):
+        self.store = store
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.records = 0
+        self._queue = None
+        self._full = None
+        self._task = None
+        # observer(operation, seconds) : attente d'un appelant jusqu'au commit de son enregistrement
+        self.observer = None
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._full = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Flushes everything already queued, then stops the writer task."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        self._full.set()
+        await self._task
+        self._task = None
+
+    async def submit(self, operation: str, *args):
+        if self._task is None:
+            raise RuntimeError("La file d'écriture n'est pas démarrée")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((OPERATIONS[operation], args, future))
+        if self._queue.qsize() >= self.max_batch:
+            self._full.set()
+        if self.observer is None:
+            return await future
+        start = time.perf_counter()
+        try:
+            return await future
+        finally:
+            self.observer("queue", time.perf_counter() - start)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [await self._queue.get()]
+            if batch[0] is not None:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            while not self._queue.empty() and len(batch) < self.max_batch:
+                batch.append(self._queue.get_nowait())
+            # Encore un lot complet en attente : le suivant part sans attendre max_delay
+            if self._queue.qsize() < self.max_batch:
+                self._full.clear()
+            if None in batch:
+                stopping = True
+                batch = [record for record in batch if record is not None]
+            if batch:
+                await self._flush(batch)
+            if stopping and not self._queue.empty():
+                stopping = False
+                self._queue.put_nowait(None)
+
+    async def _flush(self, batch):
+        try:
+            async with self.store.write() as db:
+                results = [await apply(db, *args) for apply, args, _ in batch]
+        except Exception:
+            # Un enregistrement invalide ne doit pas faire échouer tout le lot
+            for apply, args, future in batch:
+                try:
+                    async with self.store.write() as db:
+                        result = await apply(db, *args)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+        else:
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        self.batches += 1
+        self.records += len(batch)